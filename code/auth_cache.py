@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import tempfile
+
+from retry import get_status_code
+
+
+# Tokens are not reused if they expire within this number of seconds
+TOKEN_EXPIRY_MARGIN_SECONDS = 5 * 60
+
+
+def find_workspace_config(path, file_name):
+    # Looking for the workspace config in the same locations in which the aml-workspace action writes it
+    for config_file_path in [os.path.join(path, file_name), os.path.join(path, ".azureml", file_name)]:
+        try:
+            with open(config_file_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+    return None
+
+
+def get_cache_key(azure_credentials, workspace_config):
+    key = json.dumps({
+        "tenantId": azure_credentials.get("tenantId", ""),
+        "clientId": azure_credentials.get("clientId", ""),
+        "subscriptionId": azure_credentials.get("subscriptionId", ""),
+        "workspace": workspace_config
+    }, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def get_cache_file_path(cache_key):
+    # RUNNER_TEMP is emptied at the end of every job, which scopes the cache to the runner and job
+    cache_directory = os.path.join(os.environ.get("RUNNER_TEMP", tempfile.gettempdir()), "aml-compute-cache")
+    return os.path.join(cache_directory, f"{cache_key}.bin")
+
+
+def get_cipher(azure_credentials, cache_key):
+    from cryptography.fernet import Fernet
+
+    # Deriving the encryption key from the client secret, so only steps with the same secret can read the cache
+    key = hashlib.pbkdf2_hmac(
+        hash_name="sha256",
+        password=azure_credentials.get("clientSecret", "").encode("utf-8"),
+        salt=cache_key.encode("utf-8"),
+        iterations=100000
+    )
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def get_token_expiry(token):
+    # Reading the expiry from the unverified JWT payload
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0
+
+
+def load_cache(azure_credentials, workspace_config):
+    cache_key = get_cache_key(azure_credentials=azure_credentials, workspace_config=workspace_config)
+    cache_file_path = get_cache_file_path(cache_key=cache_key)
+    try:
+        from cryptography.fernet import InvalidToken
+
+        with open(cache_file_path, "rb") as f:
+            encrypted_cache = f.read()
+        cache = json.loads(get_cipher(azure_credentials=azure_credentials, cache_key=cache_key).decrypt(encrypted_cache))
+    except ImportError:
+        print("::debug::Package cryptography not installed. Not loading auth cache.")
+        return None
+    except FileNotFoundError:
+        print("::debug::No auth cache found")
+        return None
+    except (InvalidToken, ValueError):
+        print("::debug::Auth cache could not be decrypted. Invalidating auth cache.")
+        invalidate_cache(azure_credentials=azure_credentials, workspace_config=workspace_config)
+        return None
+    if cache.get("expires_on", 0) - time.time() < TOKEN_EXPIRY_MARGIN_SECONDS:
+        print("::debug::Cached token expired. Invalidating auth cache.")
+        invalidate_cache(azure_credentials=azure_credentials, workspace_config=workspace_config)
+        return None
+    print("::debug::Loaded auth cache")
+    return cache
+
+
+def save_cache(azure_credentials, workspace_config, token, workspace_details):
+    cache_key = get_cache_key(azure_credentials=azure_credentials, workspace_config=workspace_config)
+    cache_file_path = get_cache_file_path(cache_key=cache_key)
+    cache = {
+        "token": token,
+        "expires_on": get_token_expiry(token=token),
+        "workspace": workspace_details
+    }
+    try:
+        encrypted_cache = get_cipher(azure_credentials=azure_credentials, cache_key=cache_key).encrypt(json.dumps(cache).encode("utf-8"))
+    except ImportError:
+        print("::debug::Package cryptography not installed. Not saving auth cache.")
+        return False
+
+    # Writing cache atomically and only readable for the current user
+    os.makedirs(os.path.dirname(cache_file_path), mode=0o700, exist_ok=True)
+    temporary_file_path = f"{cache_file_path}.{os.getpid()}.tmp"
+    with open(os.open(temporary_file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+        f.write(encrypted_cache)
+    os.replace(temporary_file_path, cache_file_path)
+    print("::debug::Saved auth cache")
+    return True
+
+
+def invalidate_cache(azure_credentials, workspace_config):
+    cache_key = get_cache_key(azure_credentials=azure_credentials, workspace_config=workspace_config)
+    try:
+        os.remove(get_cache_file_path(cache_key=cache_key))
+        print("::debug::Invalidated auth cache")
+    except FileNotFoundError:
+        pass
+
+
+def is_authentication_failure(exception):
+    # Authentication failures surface as different exception types depending on the SDK layer and are usually
+    # wrapped into the exceptions of the action, so the chain of causes is checked as well
+    while exception is not None:
+        message = str(exception)
+        if type(exception).__name__ in ["AuthenticationException", "AuthenticationError", "AdalError"] or get_status_code(exception) == 401 or any([code in message for code in ["InvalidAuthenticationToken", "ExpiredAuthenticationToken"]]):
+            return True
+        exception = exception.__cause__
+    return False
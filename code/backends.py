@@ -0,0 +1,99 @@
+from utils import create_aml_cluster, create_aks_cluster, attach_aks_cluster, get_compute_target, list_compute_targets, update_compute_tags, get_resource, wait_for_provisioning
+from preflight import ArmPreflightSource, run_preflight
+
+
+class ComputeBackend():
+    # Interface of the backends that talk to Azure Machine Learning. Compute targets returned by a backend provide
+    # name, type, id, tags and provisioning_state as well as serialize(), refresh_state(), update(), delete() and detach().
+    # Compute targets are created with the tags of the action and the additional tags passed to create_compute_target().
+    def get_compute_target(self, name):
+        raise NotImplementedError
+
+    def list_compute_targets(self):
+        raise NotImplementedError
+
+    def create_compute_target(self, name, parameters, wait=True, timeout_minutes=60, tags=None):
+        raise NotImplementedError
+
+    def update_tags(self, compute_target, tags):
+        raise NotImplementedError
+
+    def get_workspace_id(self):
+        raise NotImplementedError
+
+    def wait_for_provisioning(self, compute_target, timeout_minutes=60):
+        return wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=timeout_minutes
+        )
+
+    # Preflight checks run before creating compute targets if the backend provides a source, unless disabled
+    preflight = True
+
+    def get_preflight_source(self):
+        return None
+
+    def run_preflight(self, parameters):
+        source = self.get_preflight_source() if self.preflight else None
+        if source is None:
+            return
+        run_preflight(
+            source=source,
+            subscription_id=self.get_subscription_id(),
+            location=parameters.get("location", None) or self.get_location(),
+            parameters=parameters
+        )
+
+
+class SdkBackend(ComputeBackend):
+    # Backend using the Azure Machine Learning SDK
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.preflight_source = None
+
+    def get_compute_target(self, name):
+        return get_compute_target(
+            workspace=self.workspace,
+            name=name
+        )
+
+    def list_compute_targets(self):
+        return list_compute_targets(
+            workspace=self.workspace
+        )
+
+    def create_compute_target(self, name, parameters, wait=True, timeout_minutes=60, tags=None):
+        if parameters.get("compute_type", None) == "akscluster":
+            create_cluster = attach_aks_cluster if parameters.get("resource_id", None) is not None else create_aks_cluster
+        else:
+            create_cluster = create_aml_cluster
+        return create_cluster(
+            workspace=self.workspace,
+            parameters={**parameters, "name": name},
+            wait=wait,
+            timeout_minutes=timeout_minutes,
+            tags=tags
+        )
+
+    def update_tags(self, compute_target, tags):
+        return update_compute_tags(
+            compute_target=compute_target,
+            tags=tags
+        )
+
+    def get_subscription_id(self):
+        return self.workspace.subscription_id
+
+    def get_workspace_id(self):
+        return f"/subscriptions/{self.workspace.subscription_id}/resourceGroups/{self.workspace.resource_group}/providers/Microsoft.MachineLearningServices/workspaces/{self.workspace.name}"
+
+    def get_location(self):
+        return self.workspace.location
+
+    def get_preflight_source(self):
+        if self.preflight_source is None:
+            self.preflight_source = ArmPreflightSource(
+                get=lambda path, api_version: get_resource(workspace=self.workspace, path=path, api_version=api_version),
+                subscription_id=self.workspace.subscription_id
+            )
+        return self.preflight_source
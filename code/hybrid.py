@@ -0,0 +1,115 @@
+from metrics import get_allocation_status
+from reconcile import get_live_parameters
+from warmup import get_node_state_counts
+
+
+# Tag linking the dedicated and the low priority member of a hybrid pair to the name of the pair
+HYBRID_TAG = "Hybrid"
+
+# Suffixes of the members of a hybrid pair
+MEMBER_SUFFIXES = {"dedicated": "d", "lowpriority": "l"}
+
+
+def get_hybrid_member_names(name):
+    # Deriving member names from the pair name, names of compute targets can be max 16 characters
+    prefix = name[:16 - 2]
+    return {vm_priority: f"{prefix}-{suffix}" for vm_priority, suffix in MEMBER_SUFFIXES.items()}
+
+
+def get_hybrid_sizes(definition):
+    # The dedicated member keeps a small floor of nodes, the low priority member scales with min_nodes and max_nodes
+    hybrid = definition["hybrid"]
+    dedicated_min_nodes = hybrid.get("dedicated_min_nodes", 1)
+    return {
+        "dedicated": (dedicated_min_nodes, hybrid.get("dedicated_max_nodes", max(dedicated_min_nodes, 1))),
+        "lowpriority": (definition.get("min_nodes", 0), definition.get("max_nodes", 4))
+    }
+
+
+def get_member_definitions(definition, default_name):
+    # Expanding a hybrid definition into the definitions of its dedicated and low priority member, returns
+    # (definition, pair) tuples with a single member and no pair for other definitions
+    if definition.get("hybrid", None) is None:
+        return [(definition, None)]
+    name = definition.get("name", default_name)
+    pair = {"name": name, "max_preemption_rate": definition["hybrid"].get("max_preemption_rate", 0.2)}
+    member_names = get_hybrid_member_names(name=name)
+    sizes = get_hybrid_sizes(definition=definition)
+    member_parameters = {key: value for key, value in definition.items() if key not in ["hybrid", "vm_priority", "vm_candidates"]}
+    return [({
+        **member_parameters,
+        "name": member_names[vm_priority],
+        "vm_priority": vm_priority,
+        "min_nodes": sizes[vm_priority][0],
+        "max_nodes": sizes[vm_priority][1]
+    }, pair) for vm_priority in MEMBER_SUFFIXES]
+
+
+def link_hybrid_member(backend, compute_target, pair):
+    # Tagging members with the name of their pair, so both are recognizable as one hybrid compute definition
+    if (compute_target.tags or {}).get(HYBRID_TAG, None) == pair["name"]:
+        return
+    backend.update_tags(
+        compute_target=compute_target,
+        tags={HYBRID_TAG: pair["name"]}
+    )
+
+
+def get_routing_state(compute_target):
+    # Counting nodes that can take a job now or after scaling up, and the share of low priority nodes that were preempted
+    live_state = compute_target.serialize()
+    max_nodes = get_live_parameters(live_state=live_state).get("max_nodes", None) or 0
+    current_nodes = get_allocation_status(live_state=live_state)["current_nodes"]
+    nodes = get_node_state_counts(live_state=live_state)
+    allocated_nodes = nodes["idle"] + nodes["running"] + nodes["preparing"]
+    return {
+        "name": compute_target.name,
+        "idle_nodes": nodes["idle"],
+        "free_nodes": nodes["idle"] + max(max_nodes - current_nodes, 0),
+        "preempted_nodes": nodes["preempted"],
+        "preemption_rate": round(nodes["preempted"] / (allocated_nodes + nodes["preempted"]), 3) if allocated_nodes + nodes["preempted"] > 0 else 0.0
+    }
+
+
+def recommend_target(dedicated, lowpriority, max_preemption_rate):
+    # Preferring low priority nodes unless they are preempted too often. Idle dedicated nodes are paid for anyway
+    # and start a job immediately, so they win over scaling up the low priority member.
+    if lowpriority["preemption_rate"] > max_preemption_rate:
+        return dedicated, f"preemption rate {lowpriority['preemption_rate']} of '{lowpriority['name']}' exceeds {max_preemption_rate}"
+    if lowpriority["idle_nodes"] > 0:
+        return lowpriority, f"'{lowpriority['name']}' has {lowpriority['idle_nodes']} idle node(s)"
+    if dedicated["idle_nodes"] > 0:
+        return dedicated, f"'{dedicated['name']}' has {dedicated['idle_nodes']} idle node(s) and '{lowpriority['name']}' has none"
+    if lowpriority["free_nodes"] > 0:
+        return lowpriority, f"'{lowpriority['name']}' can scale up by {lowpriority['free_nodes']} node(s)"
+    if dedicated["free_nodes"] > 0:
+        return dedicated, f"'{dedicated['name']}' can scale up by {dedicated['free_nodes']} node(s) and '{lowpriority['name']}' is at max_nodes"
+    return lowpriority, "both members are at max_nodes, queueing on the cheaper member"
+
+
+def route_hybrid_pairs(members):
+    # Recommending the member of every pair that the next job should use, from (label, pair, vm_priority, compute_target)
+    # tuples of the members that succeeded. Pairs with a single member left are routed to that member.
+    grouped = {}
+    for label, pair, vm_priority, compute_target in members:
+        grouped.setdefault((label, pair["name"]), (pair, {}))[1][vm_priority] = get_routing_state(compute_target=compute_target)
+    routes = []
+    for (label, name), (pair, states) in grouped.items():
+        if len(states) == 2:
+            target, reason = recommend_target(
+                dedicated=states["dedicated"],
+                lowpriority=states["lowpriority"],
+                max_preemption_rate=pair["max_preemption_rate"]
+            )
+        else:
+            vm_priority, target = list(states.items())[0]
+            reason = f"only the {vm_priority} member is available"
+        print(f"::notice::Hybrid pair '{name}'{f' in {label}' if label is not None else ''} routes the next job to '{target['name']}': {reason}")
+        routes.append({
+            "name": name,
+            **({"workspace": label} if label is not None else {}),
+            "target": target["name"],
+            "reason": reason,
+            **states
+        })
+    return routes
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+from backends import ComputeBackend
+
+
+def get_inventory_file_path(workspace_id):
+    # RUNNER_TEMP is emptied at the end of every job, which scopes the inventory cache to the runner and job
+    cache_directory = os.path.join(os.environ.get("RUNNER_TEMP", tempfile.gettempdir()), "aml-compute-cache")
+    cache_key = hashlib.sha256(workspace_id.lower().encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_directory, f"inventory-{cache_key}.json")
+
+
+def summarize_compute_target(compute_target):
+    return {
+        "name": compute_target.name,
+        "type": compute_target.type,
+        "id": compute_target.id,
+        "tags": dict(compute_target.tags or {}),
+        "provisioning_state": compute_target.provisioning_state
+    }
+
+
+class Inventory():
+    # Index of all compute targets of a workspace by name, which is built from a single paged listing. If
+    # ttl_seconds is set, the index is cached on disk, so later steps of the same job skip the listing. Entries
+    # loaded from disk only carry metadata and no compute target objects.
+    def __init__(self, backend, ttl_seconds=0, cache_file_path=None, clock=time.time):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.cache_file_path = cache_file_path
+        self.clock = clock
+        self.entries = None
+        self.compute_targets = {}
+        self.lock = threading.RLock()
+
+    def load_cache(self):
+        if self.ttl_seconds <= 0 or self.cache_file_path is None:
+            return None
+        try:
+            with open(self.cache_file_path) as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            print("::debug::No inventory cache found")
+            return None
+        if self.clock() - cache.get("listed_at", 0) > self.ttl_seconds:
+            print("::debug::Inventory cache expired")
+            return None
+        print(f"::debug::Loaded inventory of {len(cache['entries'])} compute target(s) from cache")
+        return cache["entries"]
+
+    def save_cache(self):
+        if self.ttl_seconds <= 0 or self.cache_file_path is None:
+            return False
+
+        # Writing cache atomically and only readable for the current user
+        os.makedirs(os.path.dirname(self.cache_file_path), mode=0o700, exist_ok=True)
+        temporary_file_path = f"{self.cache_file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(os.open(temporary_file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump({"listed_at": self.clock(), "entries": self.entries}, f)
+        os.replace(temporary_file_path, self.cache_file_path)
+        return True
+
+    def refresh(self):
+        # Listing all compute targets with one paged listing instead of one lookup per name
+        compute_targets = self.backend.list_compute_targets()
+        with self.lock:
+            self.compute_targets = {compute_target.name: compute_target for compute_target in compute_targets}
+            self.entries = {compute_target.name: summarize_compute_target(compute_target) for compute_target in compute_targets}
+            self.save_cache()
+        print(f"::debug::Listed inventory of {len(compute_targets)} compute target(s)")
+        return compute_targets
+
+    def load(self):
+        with self.lock:
+            if self.entries is None:
+                entries = self.load_cache()
+                if entries is None:
+                    self.refresh()
+                else:
+                    self.entries = entries
+            return self.entries
+
+    def get(self, name):
+        return self.load().get(name, None)
+
+    def contains(self, name):
+        return name in self.load()
+
+    def take_compute_target(self, name):
+        # Handing out the listed compute target object once, later lookups need to see changes since the listing
+        with self.lock:
+            return self.compute_targets.pop(name, None)
+
+    def update(self, name, compute_target):
+        # Keeping the index and the cache in line with lookups, creations and tag updates of this run
+        with self.lock:
+            self.load()
+            self.entries.pop(name, None)
+            self.compute_targets.pop(name, None)
+            if compute_target is not None:
+                self.entries[name] = summarize_compute_target(compute_target)
+            self.save_cache()
+
+
+class InventoryBackend(ComputeBackend):
+    # Backend serving the first lookup of every name from the inventory of the wrapped backend. Later lookups
+    # of the same name go to the wrapped backend, because they check for changes, e.g. while waiting for
+    # another run or for a deletion.
+    def __init__(self, backend, inventory):
+        self.backend = backend
+        self.inventory = inventory
+        self.served = set()
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def get_compute_target(self, name):
+        with self.lock:
+            first_lookup = name not in self.served
+            self.served.add(name)
+        if first_lookup:
+            if not self.inventory.contains(name=name):
+                print(f"::debug::Compute target '{name}' is not in the inventory")
+                return None
+            compute_target = self.inventory.take_compute_target(name=name)
+            if compute_target is not None:
+                return compute_target
+        compute_target = self.backend.get_compute_target(name=name)
+        self.inventory.update(name=name, compute_target=compute_target)
+        return compute_target
+
+    def list_compute_targets(self):
+        with self.lock:
+            self.served.clear()
+        return self.inventory.refresh()
+
+    def create_compute_target(self, name, parameters, wait=True, timeout_minutes=60, tags=None):
+        compute_target = self.backend.create_compute_target(
+            name=name,
+            parameters=parameters,
+            wait=wait,
+            timeout_minutes=timeout_minutes,
+            tags=tags
+        )
+        with self.lock:
+            self.served.add(name)
+        self.inventory.update(name=name, compute_target=compute_target)
+        return compute_target
+
+    def update_tags(self, compute_target, tags):
+        result = self.backend.update_tags(
+            compute_target=compute_target,
+            tags=tags
+        )
+        self.inventory.update(name=compute_target.name, compute_target=compute_target)
+        return result
+
+    def wait_for_provisioning(self, compute_target, timeout_minutes=60):
+        return self.backend.wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=timeout_minutes
+        )
+
+    def get_preflight_source(self):
+        return self.backend.get_preflight_source()
+
+    def run_preflight(self, parameters):
+        return self.backend.run_preflight(parameters=parameters)
+
+    def get_subscription_id(self):
+        return self.backend.get_subscription_id()
+
+    def get_location(self):
+        return self.backend.get_location()
+
+    def get_workspace_id(self):
+        return self.backend.get_workspace_id()
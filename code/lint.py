@@ -0,0 +1,223 @@
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+
+from hybrid import get_hybrid_member_names, get_hybrid_sizes
+from schemas import compute_schema, parameters_schema, workspaces_schema
+from utils import AMLConfigurationException, get_validator, default_compute_target_name
+
+
+# Names of compute targets have 2 to 16 letters, digits or dashes, start with a letter and end with a letter or digit
+COMPUTE_NAME_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9-]{0,14}[a-zA-Z0-9]$")
+
+# Parameters that are only used for one compute type
+AML_CLUSTER_KEYS = ["vm_priority", "min_nodes", "max_nodes", "idle_seconds_before_scaledown", "remote_login_port_public_access", "identity_type", "identity_id"]
+AKS_CLUSTER_KEYS = ["resource_id", "agent_count", "location", "service_cidr", "dns_service_ip", "docker_bridge_cidr", "cluster_purpose", "ssl_cname", "ssl_cert_pem_file", "ssl_key_pem_file", "load_balancer_type", "load_balancer_subnet"]
+
+# Rules that fail the action, other findings are only reported as warnings by the action, because it ran with them before
+ACTION_ERROR_RULES = ["schema", "hybrid-compute-type", "hybrid-priority"]
+
+# Groups of parameters that are ignored unless all of them are provided
+PARAMETER_GROUPS = {
+    "vnet-group": ["vnet_resource_group_name", "vnet_name", "subnet_name"],
+    "ssl-group": ["ssl_cname", "ssl_cert_pem_file", "ssl_key_pem_file"]
+}
+
+
+def finding(severity, rule, message, path=""):
+    return {"severity": severity, "rule": rule, "path": path, "message": message}
+
+
+def check_compute_definition(definition, path=""):
+    # Checking the rules across parameters of one compute target that the schema cannot express
+    findings = []
+    compute_type = definition.get("compute_type", "amlcluster")
+    name = definition.get("name", None)
+    if name is None:
+        name = default_compute_target_name()
+        if not COMPUTE_NAME_PATTERN.match(name):
+            findings.append(finding("error", "compute-name", f"No name is provided and the default name '{name}' derived from GITHUB_REPOSITORY is not a valid compute target name. Please provide a name with 2 to 16 letters, digits or dashes.", f"{path}/name"))
+    elif not COMPUTE_NAME_PATTERN.match(name):
+        findings.append(finding("error", "compute-name", f"Name '{name}' is not a valid compute target name. Please provide a name with 2 to 16 letters, digits or dashes that starts with a letter and ends with a letter or digit.", f"{path}/name"))
+
+    if compute_type == "amlcluster" and definition.get("min_nodes", 0) > definition.get("max_nodes", 4):
+        findings.append(finding("error", "min-max-nodes", f"min_nodes ({definition.get('min_nodes', 0)}) is larger than max_nodes ({definition.get('max_nodes', 4)}).", f"{path}/min_nodes"))
+    for rule, keys in PARAMETER_GROUPS.items():
+        provided = [key for key in keys if definition.get(key, None) is not None]
+        if 0 < len(provided) < len(keys):
+            findings.append(finding("error", rule, f"Settings {provided} are ignored unless all of {keys} are provided. Please provide a value for the following key(s) as well: {[key for key in keys if key not in provided]}", f"{path}/{provided[0]}"))
+    if definition.get("load_balancer_subnet", None) is not None and definition.get("load_balancer_type", None) != "InternalLoadBalancer":
+        findings.append(finding("error", "load-balancer-subnet", "load_balancer_subnet is ignored unless load_balancer_type is 'InternalLoadBalancer'.", f"{path}/load_balancer_subnet"))
+    if definition.get("identity_type", None) == "UserAssigned" and not definition.get("identity_id", None):
+        findings.append(finding("error", "user-assigned-identity", "identity_type 'UserAssigned' requires identity_id.", f"{path}/identity_id"))
+    if definition.get("hybrid", None) is not None:
+        findings.extend(check_hybrid_definition(definition=definition, path=path))
+
+    if definition.get("vm_candidates", None) is not None and definition.get("resource_id", None) is not None:
+        findings.append(finding("warning", "ignored-key", "vm_candidates is ignored, because an existing AKS cluster gets attached with resource_id.", f"{path}/vm_candidates"))
+    elif definition.get("vm_candidates", None) is not None:
+        for key in ["vm_size", "vm_priority"]:
+            if key in definition:
+                findings.append(finding("warning", "ignored-key", f"{key} is ignored, because vm_candidates takes precedence.", f"{path}/{key}"))
+    other_type_keys = AKS_CLUSTER_KEYS if compute_type == "amlcluster" else AML_CLUSTER_KEYS
+    for key in [key for key in definition if key in other_type_keys]:
+        findings.append(finding("warning", "ignored-key", f"{key} is ignored for compute type '{compute_type}'.", f"{path}/{key}"))
+    for key in [key for key in definition if key not in compute_schema["properties"]]:
+        findings.append(finding("warning", "unknown-key", f"{key} is not a known parameter and is ignored.", f"{path}/{key}"))
+    return findings
+
+
+def check_hybrid_definition(definition, path=""):
+    # Checking the sizing rules of hybrid pairs, the priority of each member is fixed
+    findings = []
+    if definition.get("compute_type", "amlcluster") != "amlcluster":
+        findings.append(finding("error", "hybrid-compute-type", "hybrid is only supported for compute type 'amlcluster'.", f"{path}/hybrid"))
+    for key in ["vm_priority", "vm_candidates"]:
+        if key in definition:
+            findings.append(finding("error", "hybrid-priority", f"{key} cannot be combined with hybrid, because the pair consists of a dedicated and a low priority cluster.", f"{path}/{key}"))
+    dedicated_min_nodes, dedicated_max_nodes = get_hybrid_sizes(definition=definition)["dedicated"]
+    if dedicated_min_nodes > dedicated_max_nodes:
+        findings.append(finding("error", "min-max-nodes", f"dedicated_min_nodes ({dedicated_min_nodes}) is larger than dedicated_max_nodes ({dedicated_max_nodes}).", f"{path}/hybrid/dedicated_min_nodes"))
+    return findings
+
+
+def get_definition_names(definition):
+    # Names of the compute targets of a definition, the members of a hybrid pair are named after the pair
+    if definition.get("hybrid", None) is not None and definition.get("name", None) is not None:
+        return list(get_hybrid_member_names(name=definition["name"]).values())
+    return [definition.get("name", None)]
+
+
+def check_schema(data, schema):
+    return [finding("error", "schema", error.message, "".join([f"/{part}" for part in error.absolute_path])) for error in get_validator(schema=schema).iter_errors(data)]
+
+
+def lint_parameters(parameters):
+    # Checking a parameters file with a single compute target or a list of compute targets
+    findings = check_schema(data=parameters, schema=parameters_schema)
+    if len(findings) > 0:
+        return findings
+    if not isinstance(parameters, list):
+        return check_compute_definition(definition=parameters)
+    names = [definition.get("name", None) for definition in parameters]
+    member_names = [name for definition in parameters for name in get_definition_names(definition=definition)]
+    for index, definition in enumerate(parameters):
+        if definition.get("name", None) is None:
+            findings.append(finding("error", "compute-name", "When providing a list of compute targets, every compute target needs a name.", f"/{index}"))
+        elif names.count(definition["name"]) > 1:
+            findings.append(finding("error", "unique-name", f"Name '{definition['name']}' is used by several compute targets.", f"/{index}/name"))
+        elif definition.get("hybrid", None) is not None or len(member_names) > len(names):
+            other_names = [name for other_index, other in enumerate(parameters) if other_index != index for name in get_definition_names(definition=other)]
+            for name in [name for name in get_definition_names(definition=definition) if name in other_names]:
+                findings.append(finding("error", "unique-name", f"Name '{name}' is used by several compute targets, including a member of a hybrid pair.", f"/{index}/name"))
+        findings.extend(check_compute_definition(definition=definition, path=f"/{index}"))
+    return findings
+
+
+def lint_workspaces(workspaces, compute_definitions=None):
+    # Checking a workspaces file and, if the compute targets are known, the compute targets with the overrides of every workspace
+    findings = check_schema(data=workspaces, schema=workspaces_schema)
+    if len(findings) > 0:
+        return findings
+    for index, workspace in enumerate(workspaces):
+        for key in workspace.get("overrides", {}):
+            if key not in compute_schema["properties"]:
+                findings.append(finding("warning", "unknown-key", f"{key} is not a known parameter and is ignored.", f"/{index}/overrides/{key}"))
+        for definition in compute_definitions or []:
+            # Reporting only the findings caused by the overrides, the others are reported for the parameters file
+            overridden = {**definition, **workspace.get("overrides", {})}
+            known = [(entry["rule"], entry["message"]) for entry in check_compute_definition(definition=definition)]
+            findings.extend([{**entry, "path": f"/{index}/overrides"} for entry in check_schema(data=overridden, schema=compute_schema)])
+            findings.extend([{**entry, "path": f"/{index}/overrides"} for entry in check_compute_definition(definition=overridden) if (entry["rule"], entry["message"]) not in known])
+    return findings
+
+
+def report_findings(findings, input_name, error_rules=None):
+    # Printing findings as annotations and failing on errors, before the backend is loaded. If error_rules is
+    # provided, errors of other rules are reported as warnings
+    if error_rules is not None:
+        findings = [{**entry, "severity": "warning"} if entry["rule"] not in error_rules else entry for entry in findings]
+    for entry in findings:
+        print(f"::{entry['severity']}::{input_name} {entry['path'] or '/'}: {entry['message']}")
+    errors = [entry for entry in findings if entry["severity"] == "error"]
+    if len(errors) > 0:
+        raise AMLConfigurationException(f"{len(errors)} error(s) in '{input_name}'. Please check the output for more details.")
+
+
+def get_file_kind(data):
+    # Telling compute and workspaces files apart from the files of other actions in the same folder by their keys
+    items = data if isinstance(data, list) else [data]
+    if not all([isinstance(item, dict) for item in items]):
+        return None
+    keys = set([key for item in items for key in item])
+    if isinstance(data, list) and len(items) > 0 and all(["workspace_name" in item for item in items]):
+        return "workspaces"
+    if "workspace_name" not in keys and len(keys & (set(compute_schema["properties"]) - {"name", "location"})) > 0:
+        return "parameters"
+    return None
+
+
+def lint_files(paths, parameters_file=None):
+    # Checking all files in one pass, validators are compiled once and shared by all files
+    results = []
+    loaded = {}
+    for path in paths:
+        try:
+            with open(path) as f:
+                loaded[path] = json.load(f)
+        except (OSError, json.JSONDecodeError) as exception:
+            results.append({"file": path, "kind": None, "findings": [finding("error", "json", f"Could not read JSON: {exception}")]})
+    kinds = {path: get_file_kind(data=data) for path, data in loaded.items()}
+    compute_definitions = None
+    paths_by_name = {os.path.normpath(path): path for path in loaded}
+    parameters_file = paths_by_name.get(os.path.normpath(parameters_file), None) if parameters_file is not None else None
+    if parameters_file is not None and kinds[parameters_file] == "parameters":
+        parameters = loaded[parameters_file]
+        compute_definitions = parameters if isinstance(parameters, list) else [parameters]
+    for path, data in loaded.items():
+        if kinds[path] == "parameters":
+            findings = lint_parameters(parameters=data)
+        elif kinds[path] == "workspaces":
+            findings = lint_workspaces(workspaces=data, compute_definitions=compute_definitions)
+        else:
+            findings = []
+        results.append({"file": path, "kind": kinds[path], "findings": findings})
+    return sorted(results, key=lambda result: result["file"])
+
+
+def format_results(results, output_format):
+    if output_format == "json":
+        return json.dumps(results, indent=2)
+    lines = []
+    for result in results:
+        for entry in result["findings"]:
+            if output_format == "github":
+                lines.append(f"::{entry['severity']} file={result['file']}::{entry['rule']} {entry['path'] or '/'}: {entry['message']}")
+            else:
+                lines.append(f"{result['file']}:{entry['path'] or '/'}: {entry['severity']}: [{entry['rule']}] {entry['message']}")
+    checked = len([result for result in results if result["kind"] is not None])
+    errors = len([entry for result in results for entry in result["findings"] if entry["severity"] == "error"])
+    if output_format == "text":
+        lines.append(f"Checked {checked} file(s), found {errors} error(s)")
+    return "\n".join(lines)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Checks compute and workspaces files of the Azure Machine Learning Compute Action without connecting to Azure.")
+    parser.add_argument("paths", nargs="*", help="Files to check. Defaults to all JSON files in .cloud/.azure.")
+    parser.add_argument("--parameters-file", default=os.path.join(".cloud", ".azure", "compute.json"), help="Parameters file whose compute targets are checked with the overrides of every workspaces file.")
+    parser.add_argument("--format", choices=["text", "json", "github"], default="text", help="Output format.")
+    arguments = parser.parse_args(arguments)
+    paths = arguments.paths or sorted(glob.glob(os.path.join(".cloud", ".azure", "*.json")))
+    results = lint_files(paths=paths, parameters_file=arguments.parameters_file)
+    output = format_results(results=results, output_format=arguments.format)
+    if output != "":
+        print(output)
+    return 1 if any([entry["severity"] == "error" for result in results for entry in result["findings"]]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
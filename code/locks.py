@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import hashlib
+import random
+import tempfile
+import threading
+
+from contextlib import contextmanager
+from utils import AMLComputeException
+
+
+class CreationLock():
+    # Interface of locks that ensure that only one run creates a compute target with a given name
+    lease_seconds = 60
+
+    def acquire(self, name):
+        raise NotImplementedError
+
+    def renew(self, name):
+        raise NotImplementedError
+
+    def release(self, name):
+        raise NotImplementedError
+
+
+class FileCreationLock(CreationLock):
+    # Lock based on exclusively created files, for runs on the same machine or a shared file system
+    def __init__(self, directory=None, lease_seconds=60):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "aml-compute-locks")
+        self.lease_seconds = lease_seconds
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_lock_file_path(self, name):
+        return os.path.join(self.directory, f"{name}.lock")
+
+    def is_stale(self, file_path):
+        try:
+            return time.time() - os.path.getmtime(file_path) > self.lease_seconds
+        except FileNotFoundError:
+            return False
+
+    def break_stale_lock(self, lock_file_path):
+        # Removing the lock if the lease of the previous owner expired. Only the run that exclusively creates the breaker
+        # file checks the lock again and removes it, so runs that found the same stale lock do not remove a new lock
+        if not self.is_stale(file_path=lock_file_path):
+            return
+        breaker_file_path = f"{lock_file_path}.break"
+        if self.is_stale(file_path=breaker_file_path):
+            # Removing breaker files of runs that stopped while breaking a lock
+            try:
+                os.remove(breaker_file_path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.close(os.open(breaker_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            return
+        try:
+            if self.is_stale(file_path=lock_file_path):
+                os.remove(lock_file_path)
+        except FileNotFoundError:
+            pass
+        finally:
+            os.remove(breaker_file_path)
+
+    def acquire(self, name):
+        lock_file_path = self.get_lock_file_path(name=name)
+        self.break_stale_lock(lock_file_path=lock_file_path)
+        try:
+            with open(os.open(lock_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL), "w") as f:
+                json.dump({"pid": os.getpid()}, f)
+        except FileExistsError:
+            return False
+        return True
+
+    def renew(self, name):
+        os.utime(self.get_lock_file_path(name=name))
+
+    def release(self, name):
+        try:
+            os.remove(self.get_lock_file_path(name=name))
+        except FileNotFoundError:
+            pass
+
+
+class BlobLeaseCreationLock(CreationLock):
+    # Lock based on a lease on a blob in the default datastore of the workspace, for runs on different machines
+    def __init__(self, blob_service, container_name, lease_seconds=60):
+        self.blob_service = blob_service
+        self.container_name = container_name
+        self.lease_seconds = lease_seconds
+        self.lease_ids = {}
+
+    def get_blob_name(self, name):
+        return f"aml-compute-locks/{name}.lock"
+
+    def acquire(self, name):
+        from azure.common import AzureHttpError
+
+        blob_name = self.get_blob_name(name=name)
+        try:
+            if not self.blob_service.exists(self.container_name, blob_name):
+                self.blob_service.create_blob_from_text(self.container_name, blob_name, "")
+            self.lease_ids[name] = self.blob_service.acquire_blob_lease(
+                self.container_name,
+                blob_name,
+                lease_duration=self.lease_seconds
+            )
+        except AzureHttpError as exception:
+            # 409 if another run holds the lease, 412 if the blob was leased while creating it
+            if exception.status_code in [409, 412]:
+                return False
+            raise
+        return True
+
+    def renew(self, name):
+        self.blob_service.renew_blob_lease(self.container_name, self.get_blob_name(name=name), self.lease_ids[name])
+
+    def release(self, name):
+        lease_id = self.lease_ids.pop(name, None)
+        if lease_id is not None:
+            self.blob_service.release_blob_lease(self.container_name, self.get_blob_name(name=name), lease_id)
+
+
+def get_creation_lock(lock_type, workspace, scope=None):
+    if lock_type == "blob":
+        datastore = workspace.get_default_datastore()
+        return BlobLeaseCreationLock(
+            blob_service=datastore.blob_service,
+            container_name=datastore.container_name
+        )
+    elif lock_type == "file":
+        if scope is not None:
+            return FileCreationLock(directory=os.path.join(tempfile.gettempdir(), "aml-compute-locks", hashlib.sha256(scope.lower().encode("utf-8")).hexdigest()[:16]))
+        return FileCreationLock()
+    return None
+
+
+@contextmanager
+def renewing(lock, name):
+    # Renewing the lease in the background while the owner of the lock creates the compute target
+    stopped = threading.Event()
+
+    def renew():
+        while not stopped.wait(lock.lease_seconds / 3):
+            try:
+                lock.renew(name=name)
+            except Exception as exception:
+                print(f"::warning::Could not renew creation lock for '{name}': {exception}")
+
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        renewer.join()
+        lock.release(name=name)
+
+
+def run_exclusively(lock, name, function, wait_for_other, timeout_minutes=60, initial_interval=5, max_interval=30):
+    # Calling function if the lock is acquired, otherwise waiting until wait_for_other returns a result of the lock owner
+    deadline = time.monotonic() + timeout_minutes * 60
+    interval = initial_interval
+    while True:
+        if lock.acquire(name=name):
+            print(f"::debug::Acquired creation lock for '{name}'")
+            with renewing(lock=lock, name=name):
+                return function()
+        result = wait_for_other()
+        if result is not None:
+            print(f"::debug::Compute target '{name}' was created by another run")
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"::error::Creation lock for '{name}' was not released within {timeout_minutes} minute(s)")
+            raise AMLComputeException(f"Creation lock for '{name}' was not released within {timeout_minutes} minute(s).")
+        print(f"::debug::Another run is creating '{name}'. Waiting for the creation lock.")
+        time.sleep(min(remaining, random.uniform(interval / 2, interval)))
+        interval = min(interval * 2, max_interval)
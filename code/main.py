@@ -1,61 +1,360 @@
 import os
 import json
+import time
+import random
 
-from azureml.core import Workspace
-from azureml.core.compute import ComputeTarget
-from azureml.exceptions import ComputeTargetException, AuthenticationException, ProjectSystemException
-from azureml.core.authentication import ServicePrincipalAuthentication
-from adal.adal_error import AdalError
-from msrest.exceptions import AuthenticationError
 from json import JSONDecodeError
-from utils import AMLConfigurationException, create_aml_cluster, create_aks_cluster, mask_parameter, validate_json, required_parameters_provided
-from schemas import azure_credentials_schema, parameters_schema
+from utils import AMLConfigurationException, AMLComputeException, AMLCapacityException, AMLProvisioningException, CREATED_TAG, ATTACHED_TAG, mask_parameter, validate_json, required_parameters_provided, unique_names_provided, run_in_parallel, load_integer_input, set_output, compute_fingerprint, check_provisioning_state, default_compute_target_name, FINGERPRINT_TAG
+from backends import SdkBackend
+from auth_cache import find_workspace_config, load_cache, save_cache, invalidate_cache, is_authentication_failure
+from locks import get_creation_lock, run_exclusively
+from inventory import Inventory, InventoryBackend, get_inventory_file_path
+from outputs import write_compute_outputs
+from reconcile import reconcile_compute_target
+from retry import retry_policy
+from schemas import azure_credentials_schema, parameters_schema, workspaces_schema
+from tracing import tracer, write_summary, write_trace
+from warmup import warm_compute_target, restore_compute_target
+from pool import default_lease_id, lease_pool_member, release_pool_members
+from sweep import sweep_compute_targets, write_sweep_summary
+from lint import ACTION_ERROR_RULES, check_compute_definition, lint_workspaces, report_findings
+from hybrid import get_member_definitions, link_hybrid_member, route_hybrid_pairs
+from metrics import collect_samples, summarize_samples, write_metrics, get_metrics_directory
 
 
-def main():
-    # Loading azure credentials
-    print("::debug::Loading azure credentials")
-    azure_credentials = os.environ.get("INPUT_AZURE_CREDENTIALS", default="{}")
-    try:
-        azure_credentials = json.loads(azure_credentials)
-    except JSONDecodeError:
-        print("::error::Please paste output of `az ad sp create-for-rbac --name <your-sp-name> --role contributor --scopes /subscriptions/<your-subscriptionId>/resourceGroups/<your-rg> --sdk-auth` as value of secret variable: AZURE_CREDENTIALS. The JSON should include the following keys: 'tenantId', 'clientId', 'clientSecret' and 'subscriptionId'.")
-        raise AMLConfigurationException("Incorrect or poorly formed output from azure credentials saved in AZURE_CREDENTIALS secret. See setup in https://github.com/Azure/aml-workspace/blob/master/README.md")
+def get_vm_candidates(parameters):
+    # Expanding the ordered list of VM candidates into parameters, a single candidate if no list is provided. Candidates
+    # keep vm_candidates, so every candidate is fingerprinted like the compute definition
+    candidates = parameters.get("vm_candidates", None)
+    if candidates is None:
+        return [parameters]
+    if parameters.get("resource_id", None) is not None:
+        print("::warning::Ignoring 'vm_candidates', because an existing AKS cluster gets attached with 'resource_id'.")
+        return [parameters]
+    candidate_parameters = {key: value for key, value in parameters.items() if key not in ["vm_size", "vm_priority"]}
+    return [{**candidate_parameters, **candidate} for candidate in candidates]
 
-    # Checking provided parameters
-    print("::debug::Checking provided parameters")
-    validate_json(
-        data=azure_credentials,
-        schema=azure_credentials_schema,
-        input_name="AZURE_CREDENTIALS"
+
+def delete_failed_compute_target(backend, name, timeout_minutes=60, initial_interval=5, max_interval=30):
+    # Deleting a compute target that could not be provisioned, so it can be created again with the next candidate,
+    # attached clusters are only detached, because the action does not own the underlying AKS cluster
+    compute_target = backend.get_compute_target(name=name)
+    if compute_target is None:
+        return
+    if any([key in (compute_target.tags or {}) for key in ATTACHED_TAG.keys()]):
+        print(f"::debug::Detaching compute target '{name}' in state '{compute_target.provisioning_state}'")
+        retry_policy.call(
+            function=compute_target.detach,
+            description=f"detachment of compute target '{name}'"
+        )
+    else:
+        print(f"::debug::Deleting compute target '{name}' in state '{compute_target.provisioning_state}'")
+        retry_policy.call(
+            function=compute_target.delete,
+            description=f"deletion of compute target '{name}'"
+        )
+    wait_for_deletion(
+        backend=backend,
+        name=name,
+        timeout_minutes=timeout_minutes,
+        initial_interval=initial_interval,
+        max_interval=max_interval
     )
 
-    # Mask values
-    print("::debug::Masking parameters")
-    mask_parameter(parameter=azure_credentials.get("tenantId", ""))
-    mask_parameter(parameter=azure_credentials.get("clientId", ""))
-    mask_parameter(parameter=azure_credentials.get("clientSecret", ""))
-    mask_parameter(parameter=azure_credentials.get("subscriptionId", ""))
 
-    # Loading parameters file
-    print("::debug::Loading parameters file")
-    parameters_file = os.environ.get("INPUT_PARAMETERS_FILE", default="compute.json")
-    parameters_file_path = os.path.join(".cloud", ".azure", parameters_file)
-    try:
-        with open(parameters_file_path) as f:
-            parameters = json.load(f)
-    except FileNotFoundError:
-        print(f"::debug::Could not find parameter file in {parameters_file_path}. Please provide a parameter file in your repository if you do not want to use default settings (e.g. .cloud/.azure/compute.json).")
-        parameters = {}
+def wait_for_deletion(backend, name, timeout_minutes=60, initial_interval=5, max_interval=30):
+    deadline = time.monotonic() + timeout_minutes * 60
+    interval = initial_interval
+    while backend.get_compute_target(name=name) is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"::error::Compute target '{name}' was not deleted within {timeout_minutes} minute(s)")
+            raise AMLComputeException(f"Compute target '{name}' was not deleted within {timeout_minutes} minute(s).")
+        time.sleep(min(remaining, random.uniform(interval / 2, interval)))
+        interval = min(interval * 2, max_interval)
 
-    # Checking provided parameters
-    print("::debug::Checking provided parameters")
-    validate_json(
-        data=parameters,
-        schema=parameters_schema,
-        input_name="PARAMETERS_FILE"
+
+def create_new_compute_target(backend, parameters, wait=True, timeout_minutes=60, tags=None):
+    print("::debug::Creating new compute target")
+    compute_type = parameters.get("compute_type", "")
+    print(f"::debug::Compute type listed is {compute_type}")
+    if compute_type not in ["amlcluster", "akscluster"]:
+        print(f"::error::Compute type '{compute_type}' is not supported")
+        raise AMLConfigurationException(f"Compute type '{compute_type}' is not supported.")
+    name = parameters.get("name", default_compute_target_name())
+    candidates = get_vm_candidates(parameters={**parameters, "name": name})
+    for index, candidate in enumerate(candidates):
+        print(f"::debug::Trying VM candidate {index + 1} of {len(candidates)}: {candidate.get('vm_size', 'default size')} ({candidate.get('vm_priority', 'default priority')})")
+        try:
+            backend.run_preflight(parameters=candidate)
+            compute_target = backend.create_compute_target(
+                name=name,
+                parameters=candidate,
+                wait=wait,
+                timeout_minutes=timeout_minutes,
+                tags=tags
+            )
+            break
+        except AMLCapacityException:
+            if index == len(candidates) - 1:
+                print(f"::error::None of the {len(candidates)} VM candidate(s) of compute target '{name}' is available")
+                raise
+            print(f"::warning::VM candidate {index + 1} of compute target '{name}' is not available due to capacity or quota. Trying next candidate.")
+            delete_failed_compute_target(
+                backend=backend,
+                name=name,
+                timeout_minutes=timeout_minutes
+            )
+    if len(candidates) > 1:
+        print(f"::notice::Compute target '{name}' uses VM candidate {index + 1} of {len(candidates)}: {candidate.get('vm_size', 'default size')} ({candidate.get('vm_priority', 'default priority')})")
+    print(f"::debug::Successfully submitted {'AKS' if compute_type == 'akscluster' else 'AML'} cluster: {compute_target.serialize()}")
+    return compute_target
+
+
+def process_compute_target(backend, parameters, wait=True, timeout_minutes=60, creation_lock=None, recover_failed_attempts=0):
+    # Loading or creating compute target and recreating it if provisioning failed, at most recover_failed_attempts times
+    name = parameters.get("name", default_compute_target_name())
+    for attempt in range(recover_failed_attempts + 1):
+        try:
+            return load_or_create_compute_target(
+                backend=backend,
+                parameters=parameters,
+                wait=wait,
+                timeout_minutes=timeout_minutes,
+                creation_lock=creation_lock
+            )
+        except AMLProvisioningException:
+            if attempt == recover_failed_attempts:
+                raise
+            compute_target = backend.get_compute_target(name=name)
+            tags = (compute_target.tags or {}) if compute_target is not None else {}
+            if compute_target is not None and not any([key in tags for key in [*CREATED_TAG.keys(), *ATTACHED_TAG.keys()]]):
+                print(f"::error::Not recovering compute target '{name}', because it was not created by the action")
+                raise
+            print(f"::warning::Provisioning of compute target '{name}' failed. Removing and recreating it (attempt {attempt + 1} of {recover_failed_attempts}).")
+            delete_failed_compute_target(
+                backend=backend,
+                name=name,
+                timeout_minutes=timeout_minutes
+            )
+
+
+def resolve_provisioning_state(backend, compute_target, wait=True, timeout_minutes=60):
+    # Awaiting compute targets that another run is provisioning or deleting, returns None if the compute target is gone
+    state = compute_target.provisioning_state
+    if state == "Deleting":
+        print(f"::notice::Compute target '{compute_target.name}' is being deleted. Waiting for the deletion before creating it again.")
+        wait_for_deletion(
+            backend=backend,
+            name=compute_target.name,
+            timeout_minutes=timeout_minutes
+        )
+        return None
+    if state not in ["Succeeded", "Failed", "Canceled"]:
+        if not wait:
+            return compute_target
+        print(f"::notice::Compute target '{compute_target.name}' is in state '{state}', e.g. started by a concurrent or cancelled run. Waiting for it.")
+        backend.wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=timeout_minutes
+        )
+    check_provisioning_state(compute_target=compute_target)
+    return compute_target
+
+
+def load_or_create_compute_target(backend, parameters, wait=True, timeout_minutes=60, creation_lock=None):
+    # Loading compute target, the name is resolved so compute targets with the default name get the same fingerprint
+    name = parameters.get("name", default_compute_target_name())
+    parameters = {**parameters, "name": name}
+    print("::debug::Loading existing compute target")
+    with tracer.span(name="lookup", compute_target=name):
+        compute_target = backend.get_compute_target(name=name)
+    if compute_target is not None and compute_target.provisioning_state != "Succeeded":
+        compute_target = resolve_provisioning_state(
+            backend=backend,
+            compute_target=compute_target,
+            wait=wait,
+            timeout_minutes=timeout_minutes
+        )
+    if compute_target is None:
+        print("::debug::Could not find existing compute target with provided name")
+
+        # Checking provided parameters
+        print("::debug::Checking provided parameters")
+        required_parameters_provided(
+            parameters=parameters,
+            keys=["compute_type"],
+            message="Required parameter(s) not found in your parameters file for creating a compute target. Please provide a value for the following key(s): "
+        )
+
+        if creation_lock is None:
+            return create_new_compute_target(
+                backend=backend,
+                parameters=parameters,
+                wait=wait,
+                timeout_minutes=timeout_minutes
+            )
+
+        # Creating compute target in only one of all concurrent runs, the other runs wait for it
+        compute_target = run_exclusively(
+            lock=creation_lock,
+            name=name,
+            function=lambda: backend.get_compute_target(name=name) or create_new_compute_target(
+                backend=backend,
+                parameters=parameters,
+                wait=wait,
+                timeout_minutes=timeout_minutes
+            ),
+            wait_for_other=lambda: backend.get_compute_target(name=name),
+            timeout_minutes=timeout_minutes
+        )
+        if wait and compute_target.provisioning_state not in ["Succeeded", "Failed", "Canceled"]:
+            backend.wait_for_provisioning(
+                compute_target=compute_target,
+                timeout_minutes=timeout_minutes
+            )
+        if wait:
+            check_provisioning_state(compute_target=compute_target)
+        return compute_target
+
+    # Returning compute targets that are still provisioning in detach mode, they are reconciled by a later run
+    if compute_target.provisioning_state != "Succeeded":
+        return compute_target
+
+    # Skipping further inspection if the compute target was created or reconciled with the same parameters
+    if (compute_target.tags or {}).get(FINGERPRINT_TAG, None) == compute_fingerprint(parameters=parameters):
+        print(f"::debug::Found compute target '{compute_target.name}' with matching fingerprint. Compute target is up to date.")
+        return compute_target
+    print(f"::debug::Found compute target with same name: {compute_target.serialize()}")
+
+    # Reconciling existing compute target with parameters file
+    print("::debug::Reconciling compute target with parameters file")
+    with tracer.span(name="reconcile", compute_target=name):
+        reconcile_compute_target(
+            backend=backend,
+            compute_target=compute_target,
+            parameters=parameters
+        )
+    return compute_target
+
+
+def await_compute_target(backend, parameters, timeout_minutes=60):
+    # Loading compute target that was created in detach mode
+    name = parameters.get("name", default_compute_target_name())
+    print("::debug::Loading existing compute target")
+    with tracer.span(name="lookup", compute_target=name):
+        compute_target = backend.get_compute_target(name=name)
+    if compute_target is None:
+        print(f"::error::Could not find compute target '{name}' to await. Please run the action in 'create' or 'detach' mode first.")
+        raise AMLConfigurationException(f"Could not find compute target '{name}' to await. Please run the action in 'create' or 'detach' mode first.")
+
+    # Waiting for provisioning to finish
+    backend.wait_for_provisioning(
+        compute_target=compute_target,
+        timeout_minutes=timeout_minutes
+    )
+    check_provisioning_state(compute_target=compute_target)
+    return compute_target
+
+
+def collect_compute_metrics(backend, parameters, metrics_directory, interval_seconds=30, duration_seconds=300):
+    # Sampling the status of an existing compute target and writing its metrics as Prometheus text and JSON time series
+    name = parameters.get("name", default_compute_target_name())
+    with tracer.span(name="lookup", compute_target=name):
+        compute_target = backend.get_compute_target(name=name)
+    if compute_target is None:
+        print(f"::error::Could not find compute target '{name}' to collect metrics. Please run the action in 'create' mode first.")
+        raise AMLConfigurationException(f"Could not find compute target '{name}' to collect metrics. Please run the action in 'create' mode first.")
+    print(f"::debug::Sampling compute target '{name}' every {interval_seconds}s for {duration_seconds}s")
+    with tracer.span(name="metrics", compute_target=name):
+        samples = collect_samples(
+            compute_target=compute_target,
+            interval_seconds=interval_seconds,
+            duration_seconds=duration_seconds
+        )
+    summary = summarize_samples(samples=samples)
+    print(f"::debug::Metrics of compute target '{name}': {summary}")
+    write_metrics(
+        metrics_directory=metrics_directory,
+        name=compute_target.name,
+        samples=samples,
+        summary=summary
+    )
+    compute_target.metrics_summary = summary
+    return compute_target
+
+
+def warm_up_compute_target(backend, parameters, nodes, timeout_minutes=60, creation_lock=None, recover_failed_attempts=0):
+    # Loading or creating compute target and scaling it to the requested number of ready nodes
+    compute_target = process_compute_target(
+        backend=backend,
+        parameters=parameters,
+        wait=True,
+        timeout_minutes=timeout_minutes,
+        creation_lock=creation_lock,
+        recover_failed_attempts=recover_failed_attempts
+    )
+    compute_target.warm_up_seconds = warm_compute_target(
+        backend=backend,
+        compute_target=compute_target,
+        nodes=nodes,
+        timeout_minutes=timeout_minutes
+    )
+    return compute_target
+
+
+def restore_warm_compute_target(backend, parameters):
+    # Loading compute target that was warmed up in warm mode and restoring its scale settings
+    name = parameters.get("name", default_compute_target_name())
+    print("::debug::Loading existing compute target")
+    with tracer.span(name="lookup", compute_target=name):
+        compute_target = backend.get_compute_target(name=name)
+    if compute_target is None:
+        print(f"::error::Could not find compute target '{name}' to restore. Please run the action in 'warm' mode first.")
+        raise AMLConfigurationException(f"Could not find compute target '{name}' to restore. Please run the action in 'warm' mode first.")
+    restore_compute_target(
+        backend=backend,
+        compute_target=compute_target
+    )
+    return compute_target
+
+
+def lease_pool_compute_target(backend, parameters, pool_size, lease_id, lease_minutes=360, timeout_minutes=60, creation_lock=None):
+    # Leasing a member of the pool of compute targets named after the compute target in the parameters file
+    pool_name = parameters.get("name", default_compute_target_name())
+    return lease_pool_member(
+        backend=backend,
+        pool_name=pool_name,
+        pool_size=pool_size,
+        lease_id=lease_id,
+        create_member=lambda name, wait, tags: create_new_compute_target(
+            backend=backend,
+            parameters={**parameters, "name": name},
+            wait=wait,
+            timeout_minutes=timeout_minutes,
+            tags=tags
+        ),
+        lease_minutes=lease_minutes,
+        timeout_minutes=timeout_minutes,
+        lock=creation_lock
+    )
+
+
+def release_pool_compute_targets(backend, parameters, pool_size, lease_id, recycle=False):
+    # Returning the members of the pool that were leased in lease mode
+    pool_name = parameters.get("name", default_compute_target_name())
+    return release_pool_members(
+        backend=backend,
+        pool_name=pool_name,
+        pool_size=pool_size,
+        lease_id=lease_id,
+        recycle=recycle
     )
 
+
+def get_service_principal_auth(azure_credentials):
+    from azureml.core.authentication import ServicePrincipalAuthentication
+
     # Define target cloud
     if azure_credentials.get("resourceManagerEndpointUrl", "").startswith("https://management.usgovcloudapi.net"):
         cloud = "AzureUSGovernment"
@@ -64,22 +363,67 @@ def main():
     else:
         cloud = "AzureCloud"
 
-    # Loading Workspace
-    print("::debug::Loading AML Workspace")
     sp_auth = ServicePrincipalAuthentication(
         tenant_id=azure_credentials.get("tenantId", ""),
         service_principal_id=azure_credentials.get("clientId", ""),
         service_principal_password=azure_credentials.get("clientSecret", ""),
         cloud=cloud
     )
+    return sp_auth, cloud
+
+
+def load_workspace(azure_credentials):
+    from azureml.core import Workspace
+    from azureml.exceptions import AuthenticationException, ProjectSystemException
+    from adal.adal_error import AdalError
+    from msrest.exceptions import AuthenticationError
+
+    # Loading Workspace
+    print("::debug::Loading AML Workspace")
+    sp_auth, cloud = get_service_principal_auth(azure_credentials=azure_credentials)
     config_file_path = os.environ.get("GITHUB_WORKSPACE", default=".cloud/.azure")
     config_file_name = "aml_arm_config.json"
-    try:
-        ws = Workspace.from_config(
+
+    # Loading token and workspace details from auth cache
+    workspace_config = None
+    if os.environ.get("INPUT_CACHE_AUTH", default="false").lower() == "true":
+        print("::debug::Loading auth cache")
+        workspace_config = find_workspace_config(
             path=config_file_path,
-            _file_name=config_file_name,
-            auth=sp_auth
+            file_name=config_file_name
         )
+        cache = load_cache(
+            azure_credentials=azure_credentials,
+            workspace_config=workspace_config
+        ) if workspace_config is not None else None
+        if cache is not None:
+            print("::debug::Using cached token and workspace details")
+            sp_auth._cached_arm_token = cache["token"]
+            return Workspace(
+                subscription_id=cache["workspace"]["subscription_id"],
+                resource_group=cache["workspace"]["resource_group"],
+                workspace_name=cache["workspace"]["workspace_name"],
+                auth=sp_auth,
+                _location=cache["workspace"]["location"],
+                _disable_service_check=True,
+                _cloud=cloud
+            ), workspace_config
+
+    try:
+        with tracer.span(name="authentication"):
+            retry_policy.call(
+                function=sp_auth.get_authentication_header,
+                description="authentication"
+            )
+        with tracer.span(name="workspace_load"):
+            ws = retry_policy.call(
+                function=lambda: Workspace.from_config(
+                    path=config_file_path,
+                    _file_name=config_file_name,
+                    auth=sp_auth
+                ),
+                description="loading of workspace"
+            )
     except AuthenticationException as exception:
         print(f"::error::Could not retrieve user token. Please paste output of `az ad sp create-for-rbac --name <your-sp-name> --role contributor --scopes /subscriptions/<your-subscriptionId>/resourceGroups/<your-rg> --sdk-auth` as value of secret variable: AZURE_CREDENTIALS: {exception}")
         raise AuthenticationException
@@ -93,46 +437,608 @@ def main():
         print(f"::error::Workspace authorizationfailed: {exception}")
         raise ProjectSystemException
 
-    # Loading compute target
+    # Saving token and workspace details to auth cache
+    if workspace_config is not None:
+        save_cache(
+            azure_credentials=azure_credentials,
+            workspace_config=workspace_config,
+            token=sp_auth.get_authentication_header()["Authorization"].split(" ")[-1],
+            workspace_details={
+                "subscription_id": ws.subscription_id,
+                "resource_group": ws.resource_group,
+                "workspace_name": ws.name,
+                "location": ws.location
+            }
+        )
+    return ws, workspace_config
+
+
+def load_backend(azure_credentials, backend_type):
+    if backend_type == "sdk":
+        ws, workspace_config = load_workspace(azure_credentials=azure_credentials)
+        return SdkBackend(workspace=ws), workspace_config
+    from rest_backend import RestBackend
+
+    # Loading workspace config, which the REST backend requires because it does not discover workspaces
+    print("::debug::Loading workspace config for REST backend")
+    workspace_config = find_workspace_config(
+        path=os.environ.get("GITHUB_WORKSPACE", default=".cloud/.azure"),
+        file_name="aml_arm_config.json"
+    )
+    if workspace_config is None:
+        print("::error::Could not find workspace config 'aml_arm_config.json'. Please run the Azure/aml-workspace action before this action when using the REST backend.")
+        raise AMLConfigurationException("Could not find workspace config 'aml_arm_config.json'. Please run the Azure/aml-workspace action before this action when using the REST backend.")
+    if os.environ.get("INPUT_CACHE_AUTH", default="false").lower() != "true":
+        return RestBackend(azure_credentials=azure_credentials, workspace_config=workspace_config), None
+
+    # Loading token and workspace location from auth cache
+    print("::debug::Loading auth cache")
+    cache = load_cache(
+        azure_credentials=azure_credentials,
+        workspace_config=workspace_config
+    )
+    backend = RestBackend(
+        azure_credentials=azure_credentials,
+        workspace_config=workspace_config,
+        token=cache["token"] if cache is not None else None
+    )
+    if cache is not None:
+        print("::debug::Using cached token and workspace details")
+        backend.location = cache["workspace"]["location"]
+    else:
+        save_cache(
+            azure_credentials=azure_credentials,
+            workspace_config=workspace_config,
+            token=backend.get_token(),
+            workspace_details={
+                "subscription_id": workspace_config.get("subscription_id", None),
+                "resource_group": workspace_config.get("resource_group", None),
+                "workspace_name": workspace_config.get("workspace_name", None),
+                "location": backend.get_location()
+            }
+        )
+    return backend, workspace_config
+
+
+def find_cached_workspace_config():
+    # Workspace config that identifies the auth cache, None if the auth cache is disabled
+    if os.environ.get("INPUT_CACHE_AUTH", default="false").lower() != "true":
+        return None
+    return find_workspace_config(
+        path=os.environ.get("GITHUB_WORKSPACE", default=".cloud/.azure"),
+        file_name="aml_arm_config.json"
+    )
+
+
+def invalidate_cache_after_failure(azure_credentials, workspace_config, exceptions):
+    # Removing the auth cache if a cached token was rejected, so the next step acquires a new token
+    if workspace_config is not None and any([is_authentication_failure(exception) for exception in exceptions]):
+        print("::debug::Invalidating auth cache after authentication failure")
+        invalidate_cache(
+            azure_credentials=azure_credentials,
+            workspace_config=workspace_config
+        )
+
+
+def get_workspace_label(workspace_config):
+    return f"{workspace_config['resource_group']}/{workspace_config['workspace_name']}"
+
+
+def load_workspace_backends(azure_credentials, backend_type, workspace_configs, max_workers=4):
+    # Loading one backend per workspace in parallel, which all reuse a single service principal token. Returns
+    # (backend, exception) tuples, so workspaces that cannot be loaded fail without affecting the others.
+    workspace_configs = [{**workspace_config, "subscription_id": workspace_config.get("subscription_id", None) or azure_credentials.get("subscriptionId", None)} for workspace_config in workspace_configs]
+    if backend_type == "sdk":
+        from azureml.core import Workspace
+
+        sp_auth, cloud = get_service_principal_auth(azure_credentials=azure_credentials)
+        with tracer.span(name="authentication"):
+            retry_policy.call(
+                function=sp_auth.get_authentication_header,
+                description="authentication"
+            )
+
+        def load(workspace_config):
+            return SdkBackend(workspace=retry_policy.call(
+                function=lambda: Workspace(
+                    subscription_id=workspace_config["subscription_id"],
+                    resource_group=workspace_config["resource_group"],
+                    workspace_name=workspace_config["workspace_name"],
+                    auth=sp_auth,
+                    _cloud=cloud
+                ),
+                description=f"loading of workspace '{get_workspace_label(workspace_config=workspace_config)}'"
+            ))
+    else:
+        from rest_backend import RestBackend, create_session
+
+        # Sharing the pooled session and the token of the first backend with the backends of all other workspaces
+        session = create_session()
+        first_backend = RestBackend(
+            azure_credentials=azure_credentials,
+            workspace_config=workspace_configs[0],
+            session=session
+        )
+        token = first_backend.get_token()
+
+        def load(workspace_config):
+            backend = RestBackend(
+                azure_credentials=azure_credentials,
+                workspace_config=workspace_config,
+                session=session,
+                token=token
+            )
+            backend.token_expires_on = first_backend.token_expires_on
+            backend.get_location()
+            return backend
+
+    with tracer.span(name="workspace_load"):
+        return run_in_parallel(
+            function=load,
+            items=workspace_configs,
+            max_workers=max_workers
+        )
+
+
+def write_workspace_results(workspace_labels, successes, failures):
+    # Reporting the status of every workspace, a workspace failed if any of its compute targets failed
+    workspace_results = []
+    for label in workspace_labels:
+        errors = [f"{name[len(label) + 1:]}: {exception}" for name, exception in failures if name.startswith(f"{label}/")]
+        workspace_results.append({
+            "workspace": label,
+            "status": "failed" if len(errors) > 0 else "succeeded",
+            "compute_targets": [name[len(label) + 1:] for name in successes if name.startswith(f"{label}/")],
+            "errors": errors
+        })
+    print("::group::Workspace results")
+    for result in workspace_results:
+        print(f"{result['workspace']:48} {result['status']}")
+    print("::endgroup::")
+    set_output(name="workspace_results", value=json.dumps(workspace_results))
+    return workspace_results
+
+
+def report_timings():
+    # Reporting duration of all phases as outputs, job summary and optional trace file
+    phase_durations = tracer.phase_durations()
+    total_duration = tracer.total_duration()
+    print("::group::Phase timings")
+    for name, duration in phase_durations.items():
+        print(f"{name:24} {duration:8.3f}s")
+    print(f"{'total':24} {total_duration:8.3f}s")
+    print("::endgroup::")
+    set_output(name="phase_timings", value=json.dumps(phase_durations))
+    set_output(name="duration_seconds", value=total_duration)
+    write_summary(
+        phase_durations=phase_durations,
+        total_duration=total_duration
+    )
+    trace_file = os.environ.get("INPUT_TRACE_FILE", default="")
+    if trace_file != "":
+        print(f"::debug::Writing trace to {trace_file}")
+        write_trace(
+            trace_file_path=trace_file,
+            trace=tracer.to_otlp()
+        )
+
+
+def report_retries():
+    retry_report = retry_policy.report()
+    print(f"::debug::Retried {retry_report['retries']} call(s) and spent {retry_report['backoff_seconds']}s in backoff")
+    set_output(name="retry_count", value=retry_report["retries"])
+    set_output(name="retry_backoff_seconds", value=retry_report["backoff_seconds"])
+
+
+def run_sweep(backend, sweep_action, max_age_hours, idle_hours, dry_run, max_workers):
+    # Sweeping stale compute targets created by the action and reporting the decision for every compute target
+    with tracer.span(name="sweep", dry_run=dry_run):
+        report = sweep_compute_targets(
+            backend=backend,
+            action=sweep_action,
+            max_age_hours=max_age_hours,
+            idle_hours=idle_hours,
+            dry_run=dry_run,
+            max_workers=max_workers
+        )
+    print("::group::Sweep report")
+    for entry in report:
+        print(f"{entry['name']:16} {entry['status']:12} {entry['reason']}")
+    print("::endgroup::")
+    write_sweep_summary(
+        report=report,
+        dry_run=dry_run
+    )
+    set_output(name="sweep_report", value=json.dumps(report))
+    set_output(name="swept_count", value=len([entry for entry in report if entry["status"] in ["deleted", "scaled_down", "dry_run"]]))
+    failures = [entry for entry in report if entry["status"] == "failed"]
+    if len(failures) > 0:
+        raise AMLComputeException(f"Could not sweep {len(failures)} compute target(s): {[entry['name'] for entry in failures]}. Please check the output for more details.")
+
+
+def main():
+    try:
+        with tracer.span(name="action", root=True):
+            run_action()
+    finally:
+        report_timings()
+
+
+def run_action():
+    # Loading azure credentials
+    print("::debug::Loading azure credentials")
+    azure_credentials = os.environ.get("INPUT_AZURE_CREDENTIALS", default="{}")
     try:
-        # Default compute target name
-        repository_name = os.environ.get("GITHUB_REPOSITORY").split("/")[-1][:16]  # names can be max 16 characters
+        with tracer.span(name="parse_credentials"):
+            azure_credentials = json.loads(azure_credentials)
+    except JSONDecodeError:
+        print("::error::Please paste output of `az ad sp create-for-rbac --name <your-sp-name> --role contributor --scopes /subscriptions/<your-subscriptionId>/resourceGroups/<your-rg> --sdk-auth` as value of secret variable: AZURE_CREDENTIALS. The JSON should include the following keys: 'tenantId', 'clientId', 'clientSecret' and 'subscriptionId'.")
+        raise AMLConfigurationException("Incorrect or poorly formed output from azure credentials saved in AZURE_CREDENTIALS secret. See setup in https://github.com/Azure/aml-workspace/blob/master/README.md")
 
-        print("::debug::Loading existing compute target")
-        compute_target = ComputeTarget(
-            workspace=ws,
-            name=parameters.get("name", repository_name)
+    # Checking provided parameters
+    print("::debug::Checking provided parameters")
+    with tracer.span(name="validate_credentials"):
+        validate_json(
+            data=azure_credentials,
+            schema=azure_credentials_schema,
+            input_name="AZURE_CREDENTIALS"
         )
-        print(f"::debug::Found compute target with same name. Not updating the compute target: {compute_target.serialize()}")
-    except ComputeTargetException:
-        print("::debug::Could not find existing compute target with provided name")
 
-        # Checking provided parameters
-        print("::debug::Checking provided parameters")
-        required_parameters_provided(
-            parameters=parameters,
-            keys=["compute_type"],
-            message="Required parameter(s) not found in your parameters file for creating a compute target. Please provide a value for the following key(s): "
+    # Mask values
+    print("::debug::Masking parameters")
+    mask_parameter(parameter=azure_credentials.get("tenantId", ""))
+    mask_parameter(parameter=azure_credentials.get("clientId", ""))
+    mask_parameter(parameter=azure_credentials.get("clientSecret", ""))
+    mask_parameter(parameter=azure_credentials.get("subscriptionId", ""))
+
+    # Loading parameters file
+    print("::debug::Loading parameters file")
+    parameters_file = os.environ.get("INPUT_PARAMETERS_FILE", default="compute.json")
+    parameters_file_path = os.path.join(".cloud", ".azure", parameters_file)
+    try:
+        with open(parameters_file_path) as f:
+            parameters = json.load(f)
+    except FileNotFoundError:
+        print(f"::debug::Could not find parameter file in {parameters_file_path}. Please provide a parameter file in your repository if you do not want to use default settings (e.g. .cloud/.azure/compute.json).")
+        parameters = {}
+
+    # Checking provided parameters
+    print("::debug::Checking provided parameters")
+    with tracer.span(name="validate_parameters"):
+        validate_json(
+            data=parameters,
+            schema=parameters_schema,
+            input_name="PARAMETERS_FILE"
+        )
+
+    # Converting parameters to a list of compute definitions
+    print("::debug::Converting parameters to a list of compute definitions")
+    compute_definitions = parameters if isinstance(parameters, list) else [parameters]
+    if len(compute_definitions) > 1:
+        for definition in compute_definitions:
+            required_parameters_provided(
+                parameters=definition,
+                keys=["name"],
+                message="Required parameter(s) not found for one of the compute targets in your parameters file. When providing a list of compute targets, please provide a value for the following key(s): "
+            )
+        unique_names_provided(
+            names=[definition.get("name") for definition in compute_definitions]
+        )
+
+    # Checking rules across parameters that the schema cannot express, e.g. min_nodes <= max_nodes, most are only warnings
+    with tracer.span(name="validate_parameters"):
+        report_findings(
+            findings=[entry for index, definition in enumerate(compute_definitions) for entry in check_compute_definition(definition=definition, path=f"/{index}" if isinstance(parameters, list) else "")],
+            input_name="PARAMETERS_FILE",
+            error_rules=ACTION_ERROR_RULES
         )
 
-        print("::debug::Creating new compute target")
-        compute_type = parameters.get("compute_type", "")
-        print(f"::debug::Compute type listed is{compute_type}")
-        if compute_type == "amlcluster":
-            compute_target = create_aml_cluster(
-                workspace=ws,
-                parameters=parameters
+    # Checking that hybrid pairs do not share names with other compute targets, members are named after their pair
+    member_names = [member.get("name", default_compute_target_name()) for definition in compute_definitions for member, _ in get_member_definitions(definition=definition, default_name=default_compute_target_name())]
+    if len(member_names) > len(compute_definitions):
+        unique_names_provided(
+            names=member_names
+        )
+
+    # Loading workspaces file, which applies the compute definitions to several workspaces instead of the one of the workspace config
+    workspaces_file = os.environ.get("INPUT_WORKSPACES_FILE", default="")
+    workspace_configs = None
+    if workspaces_file != "":
+        print("::debug::Loading workspaces file")
+        workspaces_file_path = os.path.join(".cloud", ".azure", workspaces_file)
+        try:
+            with open(workspaces_file_path) as f:
+                workspace_configs = json.load(f)
+        except FileNotFoundError:
+            print(f"::error::Could not find workspaces file in {workspaces_file_path}. Please provide a list of workspaces in your repository (e.g. .cloud/.azure/workspaces.json).")
+            raise AMLConfigurationException(f"Could not find workspaces file in {workspaces_file_path}. Please provide a list of workspaces in your repository (e.g. .cloud/.azure/workspaces.json).")
+        with tracer.span(name="validate_parameters"):
+            validate_json(
+                data=workspace_configs,
+                schema=workspaces_schema,
+                input_name="WORKSPACES_FILE"
             )
-            print(f"::debug::Successfully created AML cluster: {compute_target.serialize()}")
-        elif compute_type == "akscluster":
-            compute_target = create_aks_cluster(
-                workspace=ws,
-                parameters=parameters
+            for workspace_config in workspace_configs:
+                validate_json(
+                    data=[{**definition, **workspace_config.get("overrides", {})} for definition in compute_definitions],
+                    schema=parameters_schema,
+                    input_name="WORKSPACES_FILE"
+                )
+            report_findings(
+                findings=lint_workspaces(workspaces=workspace_configs, compute_definitions=compute_definitions),
+                input_name="WORKSPACES_FILE",
+                error_rules=ACTION_ERROR_RULES
             )
-            print(f"::debug::Successfully created AKS cluster: {compute_target.serialize()}")
+        labels = [get_workspace_label(workspace_config=workspace_config) for workspace_config in workspace_configs]
+        duplicate_labels = sorted(set([label for label in labels if labels.count(label) > 1]))
+        if len(duplicate_labels) > 0:
+            print(f"::error::Workspaces must be unique within the workspaces file. Duplicate workspaces: {duplicate_labels}")
+            raise AMLConfigurationException(f"Workspaces must be unique within the workspaces file. Duplicate workspaces: {duplicate_labels}")
+
+    # Loading mode and runtime settings
+    print("::debug::Loading mode and runtime settings")
+    mode = os.environ.get("INPUT_MODE", default="create")
+    if mode not in ["create", "detach", "await", "warm", "restore", "lease", "release", "sweep", "metrics"]:
+        print(f"::error::Mode '{mode}' is not supported. Please choose one of 'create', 'detach', 'await', 'warm', 'restore', 'lease', 'release', 'sweep' or 'metrics'.")
+        raise AMLConfigurationException(f"Mode '{mode}' is not supported. Please choose one of 'create', 'detach', 'await', 'warm', 'restore', 'lease', 'release', 'sweep' or 'metrics'.")
+    warm_nodes = load_integer_input(
+        input_name="warm_nodes",
+        default=1
+    ) if mode == "warm" else None
+    pool_size = load_integer_input(
+        input_name="pool_size",
+        default=2
+    ) if mode in ["lease", "release"] else None
+    lease_minutes = load_integer_input(
+        input_name="lease_minutes",
+        default=360
+    ) if mode == "lease" else None
+    lease_id = os.environ.get("INPUT_LEASE_ID", default="") or default_lease_id()
+    recycle = os.environ.get("INPUT_RECYCLE", default="false").lower() == "true"
+    sweep_action = os.environ.get("INPUT_SWEEP_ACTION", default="delete")
+    if sweep_action not in ["delete", "scale_down"]:
+        print(f"::error::Sweep action '{sweep_action}' is not supported. Please choose one of 'delete' or 'scale_down'.")
+        raise AMLConfigurationException(f"Sweep action '{sweep_action}' is not supported. Please choose one of 'delete' or 'scale_down'.")
+    sweep_max_age_hours = load_integer_input(
+        input_name="sweep_max_age_hours",
+        default=24,
+        minimum=0
+    ) if mode == "sweep" else None
+    sweep_idle_hours = load_integer_input(
+        input_name="sweep_idle_hours",
+        default=24,
+        minimum=0
+    ) if mode == "sweep" else None
+    dry_run = os.environ.get("INPUT_DRY_RUN", default="true").lower() != "false"
+    metrics_interval_seconds = load_integer_input(
+        input_name="metrics_interval_seconds",
+        default=30
+    ) if mode == "metrics" else None
+    metrics_duration_seconds = load_integer_input(
+        input_name="metrics_duration_seconds",
+        default=300,
+        minimum=0
+    ) if mode == "metrics" else None
+    max_workers = load_integer_input(
+        input_name="max_workers",
+        default=4
+    )
+    timeout_minutes = load_integer_input(
+        input_name="timeout_minutes",
+        default=60
+    )
+    recover_failed_attempts = load_integer_input(
+        input_name="recover_failed_attempts",
+        default=0,
+        minimum=0
+    )
+    creation_lock_type = os.environ.get("INPUT_CREATION_LOCK", default="none")
+    if creation_lock_type not in ["none", "blob", "file"]:
+        print(f"::error::Creation lock '{creation_lock_type}' is not supported. Please choose one of 'none', 'blob' or 'file'.")
+        raise AMLConfigurationException(f"Creation lock '{creation_lock_type}' is not supported. Please choose one of 'none', 'blob' or 'file'.")
+    inventory_type = os.environ.get("INPUT_INVENTORY", default="auto")
+    if inventory_type not in ["auto", "true", "false"]:
+        print(f"::error::Inventory '{inventory_type}' is not supported. Please choose one of 'auto', 'true' or 'false'.")
+        raise AMLConfigurationException(f"Inventory '{inventory_type}' is not supported. Please choose one of 'auto', 'true' or 'false'.")
+    inventory_ttl_seconds = load_integer_input(
+        input_name="inventory_ttl_seconds",
+        default=0,
+        minimum=0
+    )
+    backend_type = os.environ.get("INPUT_BACKEND", default="sdk")
+    if backend_type not in ["sdk", "rest"]:
+        print(f"::error::Backend '{backend_type}' is not supported. Please choose one of 'sdk' or 'rest'.")
+        raise AMLConfigurationException(f"Backend '{backend_type}' is not supported. Please choose one of 'sdk' or 'rest'.")
+    if backend_type == "rest" and creation_lock_type == "blob":
+        print("::error::Creation lock 'blob' requires the 'sdk' backend. Please use creation lock 'file' or 'none' with the 'rest' backend.")
+        raise AMLConfigurationException("Creation lock 'blob' requires the 'sdk' backend. Please use creation lock 'file' or 'none' with the 'rest' backend.")
+    retry_policy.budget_seconds = load_integer_input(
+        input_name="retry_budget_seconds",
+        default=300,
+        minimum=0
+    )
+
+    if workspace_configs is not None and mode == "sweep":
+        print("::error::Mode 'sweep' does not support a workspaces file. Please sweep every workspace in a separate step.")
+        raise AMLConfigurationException("Mode 'sweep' does not support a workspaces file. Please sweep every workspace in a separate step.")
+
+    # Loading backends, the Azure ML SDK is only imported from here on and only by the SDK backend
+    failures = []
+    with tracer.span(name="load_backend", backend=backend_type):
+        if workspace_configs is None:
+            try:
+                backend, workspace_config = load_backend(
+                    azure_credentials=azure_credentials,
+                    backend_type=backend_type
+                )
+            except Exception as exception:
+                invalidate_cache_after_failure(
+                    azure_credentials=azure_credentials,
+                    workspace_config=find_cached_workspace_config(),
+                    exceptions=[exception]
+                )
+                raise
+            workspaces = [(None, backend, {})]
         else:
-            print(f"::error::Compute type '{compute_type}' is not supported")
-            raise AMLConfigurationException(f"Compute type '{compute_type}' is not supported.")
+            print(f"::debug::Loading {len(workspace_configs)} workspace(s)")
+            workspace_config = None
+            workspaces = []
+            loaded_backends = load_workspace_backends(
+                azure_credentials=azure_credentials,
+                backend_type=backend_type,
+                workspace_configs=workspace_configs,
+                max_workers=max_workers
+            )
+            for config, (backend, exception) in zip(workspace_configs, loaded_backends):
+                label = get_workspace_label(workspace_config=config)
+                if exception is None:
+                    workspaces.append((label, backend, config.get("overrides", {})))
+                else:
+                    print(f"::error::Workspace '{label}' could not be loaded: {exception}")
+                    failures.extend([(f"{label}/{name}", exception) for name in member_names])
+
+    def prepare_backend(backend):
+        backend.preflight = os.environ.get("INPUT_PREFLIGHT", default="true").lower() != "false"
+
+        # Looking up compute targets in an inventory built from one listing, if several names are checked
+        if inventory_type == "true" or (inventory_type == "auto" and (len(member_names) > 1 or mode in ["lease", "release", "sweep"])):
+            print("::debug::Using inventory of compute targets for lookups")
+            backend = InventoryBackend(
+                backend=backend,
+                inventory=Inventory(
+                    backend=backend,
+                    ttl_seconds=inventory_ttl_seconds,
+                    cache_file_path=get_inventory_file_path(workspace_id=backend.get_workspace_id())
+                )
+            )
+
+        # Loading creation lock, file locks are scoped to the workspace so equal names in other workspaces do not wait
+        creation_lock = get_creation_lock(
+            lock_type=creation_lock_type,
+            workspace=getattr(backend, "workspace", None),
+            scope=backend.get_workspace_id() if len(workspaces) > 1 else None
+        )
+        return backend, creation_lock
+
+    workspaces = [(label, *prepare_backend(backend=backend), overrides) for label, backend, overrides in workspaces]
+
+    # Sweeping stale compute targets instead of processing the parameters file
+    if mode == "sweep":
+        try:
+            run_sweep(
+                backend=workspaces[0][1],
+                sweep_action=sweep_action,
+                max_age_hours=sweep_max_age_hours,
+                idle_hours=sweep_idle_hours,
+                dry_run=dry_run,
+                max_workers=max_workers
+            )
+        except Exception as exception:
+            invalidate_cache_after_failure(
+                azure_credentials=azure_credentials,
+                workspace_config=workspace_config,
+                exceptions=[exception]
+            )
+            raise
+        finally:
+            report_retries()
+        print("::debug::Successfully finished Azure Machine Learning Compute Action")
+        return
+
+    # Loading, creating or awaiting compute targets of all workspaces in parallel, with overrides applied per workspace
+    # before hybrid definitions are expanded into their members
+    items = [
+        (label, backend, creation_lock, member, pair)
+        for label, backend, creation_lock, overrides in workspaces
+        for definition in compute_definitions
+        for member, pair in get_member_definitions(definition={**definition, **overrides}, default_name=default_compute_target_name())
+    ]
+    print(f"::debug::Processing {len(items)} compute target(s) in {len(workspaces)} workspace(s) in '{mode}' mode with up to {max_workers} worker(s)")
+
+    def process(item):
+        label, backend, creation_lock, definition, pair = item
+        if mode == "await":
+            return await_compute_target(backend=backend, parameters=definition, timeout_minutes=timeout_minutes)
+        if mode == "warm":
+            return warm_up_compute_target(backend=backend, parameters=definition, nodes=warm_nodes, timeout_minutes=timeout_minutes, creation_lock=creation_lock, recover_failed_attempts=recover_failed_attempts)
+        if mode == "restore":
+            return restore_warm_compute_target(backend=backend, parameters=definition)
+        if mode == "lease":
+            return lease_pool_compute_target(backend=backend, parameters=definition, pool_size=pool_size, lease_id=lease_id, lease_minutes=lease_minutes, timeout_minutes=timeout_minutes, creation_lock=creation_lock)
+        if mode == "release":
+            return release_pool_compute_targets(backend=backend, parameters=definition, pool_size=pool_size, lease_id=lease_id, recycle=recycle)
+        if mode == "metrics":
+            metrics_directory = os.path.join(get_metrics_directory(), label.replace("/", "-")) if label is not None else get_metrics_directory()
+            return collect_compute_metrics(backend=backend, parameters=definition, metrics_directory=metrics_directory, interval_seconds=metrics_interval_seconds, duration_seconds=metrics_duration_seconds)
+        compute_target = process_compute_target(backend=backend, parameters=definition, wait=mode == "create", timeout_minutes=timeout_minutes, creation_lock=creation_lock, recover_failed_attempts=recover_failed_attempts)
+        if pair is not None:
+            link_hybrid_member(backend=backend, compute_target=compute_target, pair=pair)
+        return compute_target
+
+    results = run_in_parallel(
+        function=process,
+        items=items,
+        max_workers=max_workers
+    )
+
+    # Reporting results per compute target
+    successes = []
+    for (label, _, _, definition, _), (compute_target, exception) in zip(items, results):
+        name = definition.get("name", default_compute_target_name())
+        name = f"{label}/{name}" if label is not None else name
+        if exception is not None:
+            print(f"::error::Compute target '{name}' failed: {exception}")
+            failures.append((name, exception))
+            continue
+        successes.append(name)
+        if mode == "release":
+            print(f"::debug::Released {len(compute_target)} member(s) of pool '{name}'")
+        else:
+            print(f"::debug::Compute target '{name}' is ready: {compute_target.name} ({compute_target.type})")
+    compute_targets = [compute_target for compute_target, exception in results if exception is None]
+    if mode == "release":
+        compute_targets = [compute_target for released in compute_targets for compute_target in released]
+    print("::debug::Writing compute target details to outputs")
+    write_compute_outputs(
+        compute_targets=compute_targets,
+        single_target=len(items) == 1 and workspace_configs is None
+    )
+    if workspace_configs is not None:
+        write_workspace_results(
+            workspace_labels=[get_workspace_label(workspace_config=config) for config in workspace_configs],
+            successes=successes,
+            failures=failures
+        )
+
+    if mode == "warm":
+        warm_up_seconds = [compute_target.warm_up_seconds for compute_target, exception in results if exception is None]
+        set_output(name="warm_up_seconds", value=max(warm_up_seconds) if len(warm_up_seconds) > 0 else "")
+    if mode in ["lease", "release"]:
+        set_output(name="lease_id", value=lease_id)
+    if mode == "metrics":
+        set_output(name="metrics_directory", value=get_metrics_directory())
+        set_output(name="metrics_summary", value=json.dumps([{"name": compute_target.name, "id": compute_target.id, **compute_target.metrics_summary} for compute_target in compute_targets]))
+
+    # Recommending the member of every hybrid pair that the next job should use
+    if mode not in ["lease", "release"] and any([pair is not None for _, _, _, _, pair in items]):
+        routes = route_hybrid_pairs(
+            members=[(label, pair, definition["vm_priority"], compute_target) for (label, _, _, definition, pair), (compute_target, exception) in zip(items, results) if pair is not None and exception is None]
+        )
+        set_output(name="hybrid_routing", value=json.dumps(routes))
+        set_output(name="hybrid_target", value=routes[0]["target"] if len(routes) == 1 else "")
+
+    report_retries()
+
+    invalidate_cache_after_failure(
+        azure_credentials=azure_credentials,
+        workspace_config=workspace_config,
+        exceptions=[exception for _, exception in failures]
+    )
+    total = len(member_names) * (len(workspace_configs) if workspace_configs is not None else 1)
+    if len(failures) == 1:
+        raise failures[0][1]
+    elif len(failures) > 1:
+        raise AMLComputeException(f"{len(failures)} of {total} compute targets failed: {[name for name, _ in failures]}. Please check the output for more details.")
     print("::debug::Successfully finished Azure Machine Learning Compute Action")
 
 
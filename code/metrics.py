@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import tempfile
+
+from retry import retry_policy
+from reconcile import get_live_parameters
+from warmup import get_node_state_counts
+
+
+# Node states reported by AML clusters, in the order of the node state counts
+NODE_STATES = ["idle", "running", "preparing", "unusable", "leaving", "preempted"]
+
+
+def get_allocation_status(live_state):
+    # The SDK serializes the allocation as part of the status, the REST API as part of the properties
+    cluster_properties = live_state.get("properties", None) or {}
+    status = cluster_properties.get("status", None) or {}
+    properties = cluster_properties.get("properties", None) or {}
+    return {
+        "allocation_state": status.get("allocationState", None) or properties.get("allocationState", None),
+        "current_nodes": status.get("currentNodeCount", None) or properties.get("currentNodeCount", None) or 0,
+        "target_nodes": status.get("targetNodeCount", None) or properties.get("targetNodeCount", None) or 0
+    }
+
+
+def sample_live_state(live_state, timestamp):
+    # Extracting the metrics of one point in time from the serialized state of a compute target
+    live_parameters = get_live_parameters(live_state=live_state)
+    allocation_status = get_allocation_status(live_state=live_state)
+    max_nodes = live_parameters.get("max_nodes", None)
+    return {
+        "timestamp": round(timestamp, 3),
+        "provisioning_state": (live_state.get("properties", None) or {}).get("provisioningState", None),
+        **allocation_status,
+        "min_nodes": live_parameters.get("min_nodes", None),
+        "max_nodes": max_nodes,
+        "at_max_nodes": max_nodes is not None and allocation_status["current_nodes"] >= max_nodes,
+        "nodes": get_node_state_counts(live_state=live_state)
+    }
+
+
+def collect_samples(compute_target, interval_seconds=30, duration_seconds=300, clock=time.time, sleep=time.sleep):
+    # Sampling the status of a compute target every interval_seconds for duration_seconds, starting immediately
+    samples = []
+    deadline = clock() + duration_seconds
+    while True:
+        retry_policy.call(
+            function=compute_target.refresh_state,
+            description=f"refresh of compute target '{compute_target.name}'"
+        )
+        samples.append(sample_live_state(
+            live_state=compute_target.serialize(),
+            timestamp=clock()
+        ))
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return samples
+        sleep(min(remaining, interval_seconds))
+
+
+def summarize_samples(samples):
+    # Deriving scale-up latencies, preemptions and the time spent at max_nodes from consecutive samples. A scale-up
+    # starts when the target node count rises and ends when that many nodes are idle or running.
+    scale_up_latencies = []
+    pending_scale_up = None
+    preemptions = 0
+    seconds_at_max_nodes = 0.0
+    node_seconds = {state: 0.0 for state in NODE_STATES}
+    for index, sample in enumerate(samples):
+        previous = samples[index - 1] if index > 0 else None
+        ready_nodes = sample["nodes"]["idle"] + sample["nodes"]["running"]
+        if pending_scale_up is None and sample["target_nodes"] > ready_nodes and (previous is None or sample["target_nodes"] > previous["target_nodes"]):
+            pending_scale_up = sample
+        if pending_scale_up is not None and ready_nodes >= pending_scale_up["target_nodes"]:
+            scale_up_latencies.append(round(sample["timestamp"] - pending_scale_up["timestamp"], 3))
+            pending_scale_up = None
+        if previous is not None:
+            preemptions += max(sample["nodes"]["preempted"] - previous["nodes"]["preempted"], 0)
+            elapsed = sample["timestamp"] - previous["timestamp"]
+            if previous["at_max_nodes"]:
+                seconds_at_max_nodes += elapsed
+            for state in NODE_STATES:
+                node_seconds[state] += previous["nodes"][state] * elapsed
+    duration_seconds = samples[-1]["timestamp"] - samples[0]["timestamp"] if len(samples) > 0 else 0.0
+    return {
+        "samples": len(samples),
+        "duration_seconds": round(duration_seconds, 3),
+        "scale_up_latencies_seconds": scale_up_latencies,
+        "max_scale_up_latency_seconds": max(scale_up_latencies) if len(scale_up_latencies) > 0 else None,
+        "pending_scale_up_seconds": round(samples[-1]["timestamp"] - pending_scale_up["timestamp"], 3) if pending_scale_up is not None else None,
+        "preemptions": preemptions,
+        "seconds_at_max_nodes": round(seconds_at_max_nodes, 3),
+        "node_hours": {state: round(seconds / 3600, 4) for state, seconds in node_seconds.items()}
+    }
+
+
+def format_labels(labels):
+    escaped = [(key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for key, value in labels.items()]
+    return "{" + ",".join([f"{key}=\"{value}\"" for key, value in escaped]) + "}"
+
+
+def to_prometheus(name, samples, summary):
+    # Writing the samples as timestamped gauges and the summary as gauges and counters in the Prometheus text format
+    labels = {"compute": name}
+    lines = []
+
+    def metric(metric_name, metric_type, description, values):
+        lines.append(f"# HELP {metric_name} {description}")
+        lines.append(f"# TYPE {metric_name} {metric_type}")
+        for metric_labels, value, timestamp in values:
+            if value is None:
+                continue
+            value = int(value) if isinstance(value, bool) else value
+            lines.append(f"{metric_name}{format_labels({**labels, **metric_labels})} {value}{f' {int(timestamp * 1000)}' if timestamp is not None else ''}")
+
+    metric("aml_compute_nodes", "gauge", "Number of nodes of the compute target by state.", [({"state": state}, sample["nodes"][state], sample["timestamp"]) for sample in samples for state in NODE_STATES])
+    metric("aml_compute_current_nodes", "gauge", "Number of allocated nodes of the compute target.", [({}, sample["current_nodes"], sample["timestamp"]) for sample in samples])
+    metric("aml_compute_target_nodes", "gauge", "Number of nodes the compute target is scaling to.", [({}, sample["target_nodes"], sample["timestamp"]) for sample in samples])
+    metric("aml_compute_max_nodes", "gauge", "Maximum number of nodes of the compute target.", [({}, sample["max_nodes"], sample["timestamp"]) for sample in samples])
+    metric("aml_compute_at_max_nodes", "gauge", "Whether all max_nodes nodes of the compute target are allocated.", [({}, sample["at_max_nodes"], sample["timestamp"]) for sample in samples])
+    metric("aml_compute_scale_up_latency_seconds", "gauge", "Maximum number of seconds from a rising target node count until the nodes were ready.", [({}, summary["max_scale_up_latency_seconds"], None)])
+    metric("aml_compute_preemptions_total", "counter", "Number of preempted low priority nodes while sampling.", [({}, summary["preemptions"], None)])
+    metric("aml_compute_at_max_nodes_seconds", "gauge", "Number of seconds all max_nodes nodes were allocated while sampling.", [({}, summary["seconds_at_max_nodes"], None)])
+    metric("aml_compute_node_hours", "gauge", "Node hours of the compute target by state while sampling.", [({"state": state}, hours, None) for state, hours in summary["node_hours"].items()])
+    return "\n".join(lines) + "\n"
+
+
+def get_metrics_directory():
+    metrics_directory = os.environ.get("INPUT_METRICS_DIRECTORY", default="")
+    if metrics_directory != "":
+        return metrics_directory
+    return os.path.join(os.environ.get("RUNNER_TEMP", tempfile.gettempdir()), "aml-compute", "metrics")
+
+
+def write_metrics(metrics_directory, name, samples, summary):
+    # Writing one Prometheus text file and one JSON time series per compute target, e.g. to upload them as artifact
+    os.makedirs(metrics_directory, exist_ok=True)
+    with open(os.path.join(metrics_directory, f"{name}.prom"), "w") as f:
+        f.write(to_prometheus(name=name, samples=samples, summary=summary))
+    with open(os.path.join(metrics_directory, f"{name}.json"), "w") as f:
+        json.dump({"compute_target": name, "summary": summary, "samples": samples}, f, indent=2)
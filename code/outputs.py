@@ -0,0 +1,84 @@
+import os
+import json
+import tempfile
+
+from reconcile import get_live_parameters
+from utils import set_output
+from warmup import get_node_state_counts
+
+
+# Outputs and their compute details that are set if the parameters file includes a single compute target
+SINGLE_TARGET_OUTPUTS = {
+    "compute_name": "name",
+    "compute_type": "compute_type",
+    "vm_size": "vm_size",
+    "vm_priority": "vm_priority",
+    "min_nodes": "min_nodes",
+    "max_nodes": "max_nodes",
+    "idle_nodes": "idle_nodes",
+    "provisioning_state": "provisioning_state",
+    "compute_id": "id"
+}
+
+
+def get_compute_details(compute_target):
+    # Extracting the details that downstream steps need from the serialized compute target
+    live_state = compute_target.serialize()
+    live_parameters = get_live_parameters(live_state=live_state)
+    return {
+        "name": compute_target.name,
+        "compute_type": compute_target.type,
+        "vm_size": live_parameters.get("vm_size", None),
+        "vm_priority": live_parameters.get("vm_priority", None),
+        "min_nodes": live_parameters.get("min_nodes", None),
+        "max_nodes": live_parameters.get("max_nodes", live_parameters.get("agent_count", None)),
+        "idle_nodes": get_node_state_counts(live_state=live_state)["idle"] if live_parameters["compute_type"] == "amlcluster" else None,
+        "provisioning_state": compute_target.provisioning_state,
+        "id": getattr(compute_target, "id", None),
+        "operation_endpoint": getattr(compute_target, "_operation_endpoint", None)
+    }
+
+
+def get_handle_file_path():
+    handle_file = os.environ.get("INPUT_HANDLE_FILE", default="")
+    if handle_file != "":
+        return handle_file
+    return os.path.join(os.environ.get("RUNNER_TEMP", tempfile.gettempdir()), "aml-compute", "compute_targets.json")
+
+
+def write_handle_file(handle_file_path, compute_targets):
+    # Writing details and serialized state of all compute targets, so later steps can load them without a lookup
+    os.makedirs(os.path.dirname(os.path.abspath(handle_file_path)), exist_ok=True)
+    with open(handle_file_path, "w") as f:
+        json.dump({
+            "compute_targets": [{
+                **get_compute_details(compute_target=compute_target),
+                "serialized": compute_target.serialize()
+            } for compute_target in compute_targets]
+        }, f, indent=2, default=str)
+
+
+def write_compute_outputs(compute_targets, single_target):
+    compute_details = [get_compute_details(compute_target=compute_target) for compute_target in compute_targets]
+    set_output(
+        name="compute_targets",
+        value=json.dumps(compute_details, default=str)
+    )
+    if single_target and len(compute_details) == 1:
+        for name, key in SINGLE_TARGET_OUTPUTS.items():
+            value = compute_details[0][key]
+            set_output(
+                name=name,
+                value=value if value is not None else ""
+            )
+    handle_file_path = get_handle_file_path()
+    print(f"::debug::Writing compute target handle file to {handle_file_path}")
+    write_handle_file(
+        handle_file_path=handle_file_path,
+        compute_targets=compute_targets
+    )
+    set_output(
+        name="handle_file",
+        value=handle_file_path
+    )
+    return compute_details
@@ -0,0 +1,181 @@
+import os
+import time
+import random
+
+from locks import run_exclusively
+from retry import retry_policy
+from utils import AMLComputeException
+
+
+# Tags marking pool members and their leases, empty values mean the member is not leased
+POOL_TAG = "Pool"
+LEASE_TAG = "LeasedBy"
+LEASE_EXPIRY_TAG = "LeaseExpiresAt"
+
+
+def default_lease_id():
+    # Identifying the run that holds a lease, so the post step of the same job can release it
+    return f"{os.environ.get('GITHUB_REPOSITORY', 'local')}/{os.environ.get('GITHUB_RUN_ID', os.getpid())}-{os.environ.get('GITHUB_RUN_ATTEMPT', 1)}/{os.environ.get('GITHUB_JOB', '')}"
+
+
+def get_pool_member_names(name, pool_size):
+    # Deriving member names from the pool name, names of compute targets can be max 16 characters
+    prefix = name[:16 - 1 - len(str(pool_size - 1))]
+    return [f"{prefix}-{index}" for index in range(pool_size)]
+
+
+def get_lease(compute_target, now=None):
+    # Returning the holder of an active lease or None if the member is free or the lease expired
+    tags = compute_target.tags or {}
+    lease_id = tags.get(LEASE_TAG, "")
+    if lease_id == "":
+        return None
+    try:
+        expires_at = float(tags.get(LEASE_EXPIRY_TAG, "0"))
+    except ValueError:
+        expires_at = 0.0
+    if expires_at <= (now if now is not None else time.time()):
+        return None
+    return lease_id
+
+
+def lookup_pool_members(backend, member_names):
+    return {member_name: backend.get_compute_target(name=member_name) for member_name in member_names}
+
+
+def refill_pool(members, create_member, pool_name):
+    # Submitting creation of missing members without waiting, so they provision while the leased member is used
+    refilled = []
+    for member_name, compute_target in members.items():
+        if compute_target is None:
+            print(f"::debug::Refilling pool with new member '{member_name}'")
+            try:
+                create_member(name=member_name, wait=False, tags={POOL_TAG: pool_name})
+                refilled.append(member_name)
+            except Exception as exception:
+                print(f"::warning::Could not refill pool with member '{member_name}': {exception}")
+    return refilled
+
+
+def try_lease_pool_member(backend, member_names, lease_id, lease_minutes, pool_name, create_member):
+    members = lookup_pool_members(
+        backend=backend,
+        member_names=member_names
+    )
+    now = time.time()
+    candidates = []
+    for member_name, compute_target in members.items():
+        if compute_target is None or compute_target.provisioning_state != "Succeeded":
+            continue
+        holder = (compute_target.tags or {}).get(LEASE_TAG, "")
+        if get_lease(compute_target=compute_target, now=now) is None:
+            if holder != "":
+                print(f"::notice::Lease of pool member '{member_name}' by '{holder}' expired. Reclaiming the member.")
+            candidates.append(compute_target)
+
+    # Creating a member and waiting for it if no provisioned member is free, but the pool is not full yet
+    if len(candidates) == 0:
+        missing = [member_name for member_name, compute_target in members.items() if compute_target is None]
+        if len(missing) == 0:
+            return None
+        print(f"::debug::No free member in pool '{pool_name}'. Creating member '{missing[0]}'.")
+        candidates.append(create_member(name=missing[0], wait=True, tags={POOL_TAG: pool_name}))
+        members[missing[0]] = candidates[0]
+
+    compute_target = candidates[0]
+    backend.update_tags(
+        compute_target=compute_target,
+        tags={
+            POOL_TAG: pool_name,
+            LEASE_TAG: lease_id,
+            LEASE_EXPIRY_TAG: str(int(now + lease_minutes * 60))
+        }
+    )
+
+    # Reading the lease back, because another run without lock may have leased the same member concurrently
+    leased_compute_target = backend.get_compute_target(name=compute_target.name)
+    if leased_compute_target is None or (leased_compute_target.tags or {}).get(LEASE_TAG, "") != lease_id:
+        print(f"::debug::Pool member '{compute_target.name}' was leased by another run")
+        return None
+    refill_pool(
+        members=members,
+        create_member=create_member,
+        pool_name=pool_name
+    )
+    return leased_compute_target
+
+
+def lease_pool_member(backend, pool_name, pool_size, lease_id, create_member, lease_minutes=360, timeout_minutes=60, lock=None, initial_interval=5, max_interval=60):
+    # Leasing a free member of the pool, waiting with exponential backoff and jitter if all members are leased
+    member_names = get_pool_member_names(
+        name=pool_name,
+        pool_size=pool_size
+    )
+    print(f"::debug::Leasing member of pool '{pool_name}' with members {member_names} as '{lease_id}'")
+
+    def lease():
+        return try_lease_pool_member(
+            backend=backend,
+            member_names=member_names,
+            lease_id=lease_id,
+            lease_minutes=lease_minutes,
+            pool_name=pool_name,
+            create_member=create_member
+        )
+
+    deadline = time.monotonic() + timeout_minutes * 60
+    interval = initial_interval
+    while True:
+        if lock is None:
+            compute_target = lease()
+        else:
+            compute_target = run_exclusively(
+                lock=lock,
+                name=f"pool-{pool_name}",
+                function=lease,
+                wait_for_other=lambda: None,
+                timeout_minutes=timeout_minutes
+            )
+        if compute_target is not None:
+            print(f"::notice::Leased member '{compute_target.name}' of pool '{pool_name}' for {lease_minutes} minute(s)")
+            return compute_target
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"::error::No member of pool '{pool_name}' became free within {timeout_minutes} minute(s)")
+            raise AMLComputeException(f"No member of pool '{pool_name}' became free within {timeout_minutes} minute(s).")
+        print(f"::debug::All members of pool '{pool_name}' are leased. Waiting for a free member.")
+        time.sleep(min(remaining, random.uniform(interval / 2, interval)))
+        interval = min(interval * 2, max_interval)
+
+
+def release_pool_members(backend, pool_name, pool_size, lease_id, recycle=False):
+    # Returning members leased by lease_id to the pool, or deleting them if recycle is set. Deleted members
+    # are created again by the next lease.
+    member_names = get_pool_member_names(
+        name=pool_name,
+        pool_size=pool_size
+    )
+    members = lookup_pool_members(
+        backend=backend,
+        member_names=member_names
+    )
+    released = []
+    for member_name, compute_target in members.items():
+        if compute_target is None or (compute_target.tags or {}).get(LEASE_TAG, "") != lease_id:
+            continue
+        if recycle:
+            print(f"::debug::Recycling pool member '{member_name}'")
+            retry_policy.call(
+                function=compute_target.delete,
+                description=f"deletion of compute target '{member_name}'"
+            )
+        else:
+            print(f"::debug::Returning pool member '{member_name}' to pool '{pool_name}'")
+            backend.update_tags(
+                compute_target=compute_target,
+                tags={LEASE_TAG: "", LEASE_EXPIRY_TAG: ""}
+            )
+        released.append(compute_target)
+    if len(released) == 0:
+        print(f"::warning::No member of pool '{pool_name}' is leased by '{lease_id}'")
+    return released
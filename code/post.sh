@@ -0,0 +1,13 @@
+#!/bin/sh
+
+set -e
+
+# Restoring scale settings after the job if the action ran in warm mode
+if [ "$INPUT_MODE" = "warm" ] && [ "$INPUT_RESTORE_AFTER_JOB" != "false" ]; then
+    INPUT_MODE=restore python /code/main.py
+fi
+
+# Returning leased pool members after the job if the action ran in lease mode
+if [ "$INPUT_MODE" = "lease" ] && [ "$INPUT_RELEASE_AFTER_JOB" != "false" ]; then
+    INPUT_MODE=release python /code/main.py
+fi
@@ -0,0 +1,158 @@
+import re
+import json
+import threading
+
+from retry import classify_exception
+from tracing import tracer
+from utils import AMLConfigurationException, AMLCapacityException
+
+
+# API versions of the Azure Resource Manager endpoints used by the preflight checks
+PREFLIGHT_API_VERSION = "2021-04-01"
+NETWORK_API_VERSION = "2021-02-01"
+
+# Names of the usages that limit the cores of all families together
+TOTAL_DEDICATED_CORES = "TotalDedicatedCores"
+TOTAL_LOW_PRIORITY_CORES = "TotalLowPriorityCores"
+
+
+class PreflightSource():
+    # Interface of the sources of VM sizes, core usages and subnets, which return the Azure Resource Manager
+    # representations, so sources can be replaced by local fixtures
+    def get_vm_sizes(self, location):
+        raise NotImplementedError
+
+    def get_usages(self, location):
+        raise NotImplementedError
+
+    def subnet_exists(self, subnet_id):
+        raise NotImplementedError
+
+
+class ArmPreflightSource(PreflightSource):
+    # Source calling the Azure Resource Manager endpoints through the request function of a backend. VM sizes
+    # and usages are cached, because all compute targets of a run share them.
+    def __init__(self, get, subscription_id):
+        self.get = get
+        self.subscription_id = subscription_id
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def get_cached(self, path, api_version):
+        with self.lock:
+            if path not in self.cache:
+                self.cache[path] = self.get(path=path, api_version=api_version)
+            return self.cache[path]
+
+    def get_vm_sizes(self, location):
+        return self.get_cached(
+            path=f"/subscriptions/{self.subscription_id}/providers/Microsoft.MachineLearningServices/locations/{location}/vmSizes",
+            api_version=PREFLIGHT_API_VERSION
+        ).get("value", [])
+
+    def get_usages(self, location):
+        return self.get_cached(
+            path=f"/subscriptions/{self.subscription_id}/providers/Microsoft.MachineLearningServices/locations/{location}/usages",
+            api_version=PREFLIGHT_API_VERSION
+        ).get("value", [])
+
+    def subnet_exists(self, subnet_id):
+        try:
+            self.get(path=subnet_id, api_version=NETWORK_API_VERSION)
+        except Exception as exception:
+            if classify_exception(exception) == "not_found":
+                return False
+            raise
+        return True
+
+
+class FixturePreflightSource(PreflightSource):
+    # Source reading VM sizes, usages and subnets from a JSON file or dict, e.g. for tests
+    def __init__(self, fixture):
+        if isinstance(fixture, str):
+            with open(fixture) as f:
+                fixture = json.load(f)
+        self.fixture = fixture
+
+    def get_vm_sizes(self, location):
+        return self.fixture.get("vm_sizes", {}).get(location, [])
+
+    def get_usages(self, location):
+        return self.fixture.get("usages", {}).get(location, [])
+
+    def subnet_exists(self, subnet_id):
+        return subnet_id.lower() in [subnet.lower() for subnet in self.fixture.get("subnets", [])]
+
+
+def get_remaining_cores(usages, name):
+    for usage in usages:
+        if (usage.get("name", None) or {}).get("value", "").lower() == name.lower():
+            return usage.get("limit", 0) - usage.get("currentValue", 0)
+    return None
+
+
+def check_subnet(source, subscription_id, parameters):
+    # Checking that complete virtual network settings point to an existing subnet, incomplete settings are ignored by the action
+    vnet_parameters = ["vnet_resource_group_name", "vnet_name", "subnet_name"]
+    provided = [key for key in vnet_parameters if parameters.get(key, None) is not None]
+    if len(provided) == 0:
+        return
+    if len(provided) < len(vnet_parameters):
+        missing = [key for key in vnet_parameters if key not in provided]
+        print(f"::warning::Virtual network settings are incomplete and ignored. Please provide a value for the following key(s) as well: {missing}")
+        return
+    subnet_id = f"/subscriptions/{subscription_id}/resourceGroups/{parameters['vnet_resource_group_name']}/providers/Microsoft.Network/virtualNetworks/{parameters['vnet_name']}/subnets/{parameters['subnet_name']}"
+    if not source.subnet_exists(subnet_id=subnet_id):
+        print(f"::error::Subnet '{parameters['subnet_name']}' of virtual network '{parameters['vnet_name']}' in resource group '{parameters['vnet_resource_group_name']}' does not exist or is not accessible by the service principal.")
+        raise AMLConfigurationException(f"Subnet '{parameters['subnet_name']}' of virtual network '{parameters['vnet_name']}' in resource group '{parameters['vnet_resource_group_name']}' does not exist or is not accessible by the service principal.")
+
+
+def check_vm_size_and_quota(source, location, parameters):
+    # Checking that the VM size is offered in the region and that the maximum number of nodes fits into the remaining quota
+    vm_size = parameters.get("vm_size", "Standard_DS3_v2")
+    low_priority = parameters.get("vm_priority", "dedicated") == "lowpriority"
+    vm_sizes = {size.get("name", "").lower(): size for size in source.get_vm_sizes(location=location)}
+    if len(vm_sizes) == 0:
+        print(f"::debug::No VM sizes available for location '{location}'. Skipping VM size and quota checks.")
+        return
+    size = vm_sizes.get(vm_size.lower(), None)
+    if size is None:
+        # Suggesting sizes of the same series, i.e. with the same name apart from the numbers
+        similar = sorted([candidate["name"] for name, candidate in vm_sizes.items() if re.sub(r"\d+", "", name) == re.sub(r"\d+", "", vm_size.lower())])[:5]
+        print(f"::error::VM size '{vm_size}' is not available in location '{location}' (SkuNotAvailable). Similar available sizes: {similar}")
+        raise AMLCapacityException(f"VM size '{vm_size}' is not available in location '{location}'. Similar available sizes: {similar}")
+    if low_priority and size.get("lowPriorityCapable", True) is False:
+        print(f"::error::VM size '{vm_size}' does not support low priority VMs in location '{location}'. Please use vm_priority 'dedicated' or another VM size.")
+        raise AMLCapacityException(f"VM size '{vm_size}' does not support low priority VMs in location '{location}'.")
+
+    requested_cores = parameters.get("max_nodes", 4) * size.get("vCPUs", 0)
+    usages = source.get_usages(location=location)
+    limits = [TOTAL_LOW_PRIORITY_CORES] if low_priority else [size.get("family", ""), TOTAL_DEDICATED_CORES]
+    for name in limits:
+        remaining_cores = get_remaining_cores(usages=usages, name=name)
+        if remaining_cores is not None and requested_cores > remaining_cores:
+            print(f"::error::Compute target requests {requested_cores} {'low priority' if low_priority else 'dedicated'} cores ({parameters.get('max_nodes', 4)} x {size.get('vCPUs', 0)} of '{vm_size}'), but only {remaining_cores} cores of '{name}' quota remain in location '{location}' (QuotaExceeded). Please reduce max_nodes, choose another VM size or request a quota increase.")
+            raise AMLCapacityException(f"Compute target requests {requested_cores} cores, but only {remaining_cores} cores of '{name}' quota remain in location '{location}'.")
+
+
+def run_preflight(source, subscription_id, location, parameters):
+    # Checking the parameters of a new compute target against the region before the creation is submitted. If the
+    # source cannot be read, e.g. because the service principal may not read subscription usages, creation continues.
+    with tracer.span(name="preflight", compute_target=parameters.get("name", "")):
+        print("::debug::Running preflight checks")
+        try:
+            check_subnet(
+                source=source,
+                subscription_id=subscription_id,
+                parameters=parameters
+            )
+            if parameters.get("compute_type", None) == "amlcluster":
+                check_vm_size_and_quota(
+                    source=source,
+                    location=location,
+                    parameters=parameters
+                )
+        except (AMLConfigurationException, AMLCapacityException):
+            raise
+        except Exception as exception:
+            print(f"::warning::Could not run preflight checks. Continuing without them: {exception}")
@@ -0,0 +1,216 @@
+import os
+import re
+
+from retry import retry_policy
+from utils import AMLComputeException, FINGERPRINT_TAG, compute_fingerprint
+
+
+# Parameters that can be changed on an existing compute target without recreating it
+UPDATABLE_PARAMETERS = {
+    "amlcluster": ["min_nodes", "max_nodes", "idle_seconds_before_scaledown"],
+    "akscluster": []
+}
+
+# Parameters that the action applies when creating a compute target, other parameters are ignored for the compute type
+APPLIED_PARAMETERS = {
+    "amlcluster": ["compute_type", "vm_size", "vm_priority", "min_nodes", "max_nodes", "idle_seconds_before_scaledown", "vnet_resource_group_name", "vnet_name", "subnet_name", "remote_login_port_public_access", "identity_type", "identity_id", "admin_user_name"],
+    "akscluster": ["compute_type", "vm_size", "agent_count", "location", "vnet_resource_group_name", "vnet_name", "subnet_name", "service_cidr", "dns_service_ip", "docker_bridge_cidr", "cluster_purpose", "ssl_cname", "ssl_cert_pem_file", "ssl_key_pem_file", "load_balancer_type", "load_balancer_subnet", "resource_id"]
+}
+
+# Groups of parameters that the action ignores unless all of them are provided
+PARAMETER_GROUPS = [
+    ["vnet_resource_group_name", "vnet_name", "subnet_name"],
+    ["ssl_cname", "ssl_cert_pem_file", "ssl_key_pem_file"]
+]
+
+
+def convert_duration_to_seconds(duration):
+    # Converting ISO-8601 durations as returned by the service (e.g. "PT2M", "PT120S") into seconds
+    if duration is None or isinstance(duration, int):
+        return duration
+    match = re.fullmatch(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", duration)
+    if duration == "" or match is None:
+        return None
+    days, hours, minutes, seconds = [int(value) if value else 0 for value in match.groups()]
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def get_subnet_parameters(subnet_id):
+    # Splitting the id of a subnet into the vnet parameters of the parameters file
+    match = re.fullmatch(r"/subscriptions/[^/]+/resourceGroups/([^/]+)/providers/Microsoft\.Network/virtualNetworks/([^/]+)/subnets/([^/]+)", subnet_id or "", flags=re.IGNORECASE)
+    return dict(zip(["vnet_resource_group_name", "vnet_name", "subnet_name"], match.groups() if match is not None else [None, None, None]))
+
+
+def get_live_parameters(live_state):
+    # Converting the serialized compute target into the parameter names of the parameters file
+    cluster_properties = live_state.get("properties", None) or {}
+    properties = cluster_properties.get("properties", None) or {}
+    compute_type = cluster_properties.get("computeType", None)
+    if compute_type == "AmlCompute":
+        scale_settings = properties.get("scaleSettings", None) or {}
+        identity = live_state.get("identity", None) or {}
+        user_assigned_identities = identity.get("userAssignedIdentities", None) or {}
+        return {
+            "compute_type": "amlcluster",
+            "vm_size": properties.get("vmSize", None),
+            "vm_priority": properties.get("vmPriority", None),
+            "min_nodes": scale_settings.get("minNodeCount", None),
+            "max_nodes": scale_settings.get("maxNodeCount", None),
+            "idle_seconds_before_scaledown": convert_duration_to_seconds(scale_settings.get("nodeIdleTimeBeforeScaleDown", None)),
+            "remote_login_port_public_access": properties.get("remoteLoginPortPublicAccess", None),
+            **get_subnet_parameters(subnet_id=(properties.get("subnet", None) or {}).get("id", None)),
+            "identity_type": identity.get("type", None),
+            "identity_id": sorted(user_assigned_identities.keys()) if len(user_assigned_identities) > 0 else None,
+            "admin_user_name": (properties.get("userAccountCredentials", None) or {}).get("adminUserName", None)
+        }
+    elif compute_type == "AKS":
+        networking = properties.get("aksNetworkingConfiguration", None) or {}
+        return {
+            "compute_type": "akscluster",
+            "agent_count": properties.get("agentCount", None),
+            "vm_size": properties.get("agentVmSize", None),
+            "location": cluster_properties.get("computeLocation", None),
+            "cluster_purpose": properties.get("clusterPurpose", None),
+            "load_balancer_type": properties.get("loadBalancerType", None),
+            "load_balancer_subnet": properties.get("loadBalancerSubnet", None),
+            "resource_id": cluster_properties.get("resourceId", None),
+            **get_subnet_parameters(subnet_id=networking.get("subnetId", None)),
+            "service_cidr": networking.get("serviceCidr", None),
+            "dns_service_ip": networking.get("dnsServiceIP", None),
+            "docker_bridge_cidr": networking.get("dockerBridgeCidr", None),
+            "ssl_cname": (properties.get("sslConfiguration", None) or {}).get("cname", None)
+        }
+    return {
+        "compute_type": compute_type
+    }
+
+
+def normalize_value(value):
+    # The service returns e.g. "STANDARD_DS3_V2" or "Dedicated" for values that are specified in lower case
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, list):
+        return sorted([normalize_value(item) for item in value])
+    return value
+
+
+def get_desired_parameters(parameters, compute_type):
+    # Parameters as the action applies them, settings of incomplete groups and settings of other compute types are ignored
+    parameters = {key: value for key, value in parameters.items() if key in APPLIED_PARAMETERS.get(compute_type, ["compute_type"])}
+    for keys in PARAMETER_GROUPS:
+        if not all([parameters.get(key, None) is not None for key in keys]):
+            parameters = {key: value for key, value in parameters.items() if key not in keys}
+    if parameters.get("identity_type", None) != "UserAssigned" or not parameters.get("identity_id", None):
+        parameters = {key: value for key, value in parameters.items() if key not in ["identity_type", "identity_id"]}
+    if compute_type == "amlcluster" and os.environ.get("ADMIN_USER_NAME", None) is not None and (os.environ.get("ADMIN_USER_PASSWORD", None) is not None or os.environ.get("ADMIN_USER_SSH_KEY", None) is not None):
+        parameters["admin_user_name"] = os.environ.get("ADMIN_USER_NAME", None)
+    return parameters
+
+
+def select_vm_candidate(parameters, live_parameters):
+    # Accepting any of the VM candidates, so a compute target created with a fallback candidate is up to date
+    candidates = parameters.get("vm_candidates", None)
+    if candidates is None:
+        return parameters
+    parameters = {key: value for key, value in parameters.items() if key not in ["vm_size", "vm_priority"]}
+    for candidate in candidates:
+        if all([normalize_value(value) == normalize_value(live_parameters.get(key, None)) for key, value in candidate.items()]):
+            return {**parameters, **candidate}
+    return {**parameters, **candidates[0]}
+
+
+def plan_reconcile(parameters, live_state):
+    live_parameters = get_live_parameters(live_state=live_state)
+    updatable_parameters = UPDATABLE_PARAMETERS.get(live_parameters["compute_type"], [])
+    parameters = get_desired_parameters(
+        parameters=select_vm_candidate(
+            parameters=parameters,
+            live_parameters=live_parameters
+        ),
+        compute_type=live_parameters["compute_type"]
+    )
+    plan = []
+    for key, desired_value in parameters.items():
+        # Reporting parameters that the service does not return, e.g. certificate files, instead of assuming they match
+        if key not in live_parameters:
+            plan.append({
+                "parameter": key,
+                "current": None,
+                "desired": desired_value,
+                "action": "unverifiable"
+            })
+            continue
+        current_value = live_parameters[key]
+        if normalize_value(desired_value) == normalize_value(current_value):
+            continue
+        if key == "remote_login_port_public_access" and desired_value == "NotSpecified":
+            continue
+        plan.append({
+            "parameter": key,
+            "current": current_value,
+            "desired": desired_value,
+            "action": "update" if key in updatable_parameters else "recreate"
+        })
+    return plan
+
+
+def print_plan(name, plan):
+    print(f"::group::Reconcile plan for compute target '{name}'")
+    if len(plan) == 0:
+        print("No changes. Compute target matches the parameters file.")
+    for change in plan:
+        print(f"{change['action']:12} {change['parameter']}: {change['current']} -> {change['desired']}")
+    print("::endgroup::")
+
+
+def apply_plan(compute_target, plan):
+    # Flagging changes that cannot be applied in place
+    for change in plan:
+        if change["action"] == "recreate":
+            print(f"::warning::Parameter '{change['parameter']}' of compute target '{compute_target.name}' cannot be updated in place ({change['current']} -> {change['desired']}). Please delete the compute target and rerun the action to apply this change.")
+        elif change["action"] == "unverifiable":
+            print(f"::warning::Parameter '{change['parameter']}' of compute target '{compute_target.name}' cannot be compared with the live compute target. If it changed, please delete the compute target and rerun the action to apply this change.")
+
+    # Applying changes that can be updated in place
+    updates = {change["parameter"]: change["desired"] for change in plan if change["action"] == "update"}
+    if len(updates) == 0:
+        return updates
+    print(f"::debug::Updating compute target '{compute_target.name}' in place: {updates}")
+    try:
+        retry_policy.call(
+            function=lambda: compute_target.update(**updates),
+            description=f"update of compute target '{compute_target.name}'"
+        )
+    except Exception as exception:
+        # SDK and REST backends raise different exception types
+        print(f"::error::Could not update compute target '{compute_target.name}': {exception}")
+        raise AMLComputeException(f"Could not update compute target '{compute_target.name}'. Please check the output for more details.") from exception
+    return updates
+
+
+def reconcile_compute_target(backend, compute_target, parameters):
+    if compute_target.provisioning_state != "Succeeded":
+        print(f"::debug::Not reconciling compute target '{compute_target.name}' in state '{compute_target.provisioning_state}'")
+        return []
+    plan = plan_reconcile(
+        parameters=parameters,
+        live_state=compute_target.serialize()
+    )
+    print_plan(
+        name=compute_target.name,
+        plan=plan
+    )
+    apply_plan(
+        compute_target=compute_target,
+        plan=plan
+    )
+
+    # Stamping fingerprint only if every applied parameter was compared and the compute target now matches the parameters
+    # file, otherwise the fingerprint fast path would skip compute targets with changes that were never applied
+    if all([change["action"] == "update" for change in plan]):
+        print("::debug::Updating fingerprint tag of compute target")
+        backend.update_tags(
+            compute_target=compute_target,
+            tags={FINGERPRINT_TAG: compute_fingerprint(parameters=parameters)}
+        )
+    return plan
@@ -0,0 +1,365 @@
+import os
+import time
+import threading
+
+from urllib.parse import urlsplit, parse_qsl
+from backends import ComputeBackend
+from retry import retry_policy, is_capacity_failure
+from tracing import tracer
+from utils import AMLComputeException, AMLConfigurationException, AMLCapacityException, CREATED_TAG, ATTACHED_TAG, FINGERPRINT_TAG, compute_fingerprint, wait_for_provisioning, check_provisioning_state
+from auth_cache import get_token_expiry, TOKEN_EXPIRY_MARGIN_SECONDS
+from preflight import ArmPreflightSource
+
+
+# API versions of the Azure Resource Manager endpoints used by the REST backend
+COMPUTE_API_VERSION = "2021-04-01"
+TAGS_API_VERSION = "2021-04-01"
+
+
+def get_endpoint(azure_credentials, key, default):
+    return (azure_credentials.get(key, None) or default).rstrip("/")
+
+
+def create_session(pool_size=16):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    # Reusing keep-alive connections across all calls and threads of the action
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_subnet_id(subscription_id, parameters):
+    if parameters.get("vnet_resource_group_name", None) is not None and parameters.get("vnet_name", None) is not None and parameters.get("subnet_name", None) is not None:
+        return f"/subscriptions/{subscription_id}/resourceGroups/{parameters['vnet_resource_group_name']}/providers/Microsoft.Network/virtualNetworks/{parameters['vnet_name']}/subnets/{parameters['subnet_name']}"
+    return None
+
+
+def build_aml_cluster_payload(subscription_id, location, parameters, tags=None):
+    # Building the same request body that AmlCompute.provisioning_configuration sends
+    idle_seconds_before_scaledown = parameters.get("idle_seconds_before_scaledown", None)
+    properties = {
+        "vmSize": parameters.get("vm_size", "Standard_DS3_v2"),
+        "vmPriority": "LowPriority" if parameters.get("vm_priority", "dedicated") == "lowpriority" else "Dedicated",
+        "scaleSettings": {
+            "minNodeCount": parameters.get("min_nodes", 0),
+            "maxNodeCount": parameters.get("max_nodes", 4),
+            "nodeIdleTimeBeforeScaleDown": f"PT{idle_seconds_before_scaledown}S" if idle_seconds_before_scaledown is not None else None
+        },
+        "remoteLoginPortPublicAccess": parameters.get("remote_login_port_public_access", "NotSpecified")
+    }
+    subnet_id = get_subnet_id(subscription_id=subscription_id, parameters=parameters)
+    if subnet_id is not None:
+        properties["subnet"] = {"id": subnet_id}
+    if os.environ.get("ADMIN_USER_NAME", None) is not None and os.environ.get("ADMIN_USER_PASSWORD", None) is not None:
+        properties["userAccountCredentials"] = {
+            "adminUserName": os.environ.get("ADMIN_USER_NAME", None),
+            "adminUserPassword": os.environ.get("ADMIN_USER_PASSWORD", None)
+        }
+    elif os.environ.get("ADMIN_USER_NAME", None) is not None and os.environ.get("ADMIN_USER_SSH_KEY", None) is not None:
+        properties["userAccountCredentials"] = {
+            "adminUserName": os.environ.get("ADMIN_USER_NAME", None),
+            "adminUserSshPublicKey": os.environ.get("ADMIN_USER_SSH_KEY", None)
+        }
+    payload = {
+        "location": location,
+        "tags": {**CREATED_TAG, FINGERPRINT_TAG: compute_fingerprint(parameters=parameters), **(tags or {})},
+        "properties": {
+            "computeType": "AmlCompute",
+            "description": "AML Cluster created by Azure/aml-compute GitHub Action",
+            "properties": properties
+        }
+    }
+    if parameters.get("identity_type", None) == "UserAssigned" and parameters.get("identity_id", None) is not None:
+        payload["identity"] = {
+            "type": "UserAssigned",
+            "userAssignedIdentities": {identity_id: {} for identity_id in parameters.get("identity_id", [])}
+        }
+    return payload
+
+
+def build_aks_cluster_payload(subscription_id, location, parameters, tags=None):
+    # Building the same request body that AksCompute.provisioning_configuration sends
+    properties = {
+        "agentCount": parameters.get("agent_count", None),
+        "agentVmSize": parameters.get("vm_size", "Standard_D3_v2"),
+        "clusterPurpose": "DevTest" if "dev" in parameters.get("cluster_purpose", "").lower() or "test" in parameters.get("cluster_purpose", "").lower() else "FastProd"
+    }
+    subnet_id = get_subnet_id(subscription_id=subscription_id, parameters=parameters)
+    if subnet_id is not None:
+        properties["aksNetworkingConfiguration"] = {
+            "subnetId": subnet_id,
+            "serviceCidr": parameters.get("service_cidr", None),
+            "dnsServiceIP": parameters.get("dns_service_ip", None),
+            "dockerBridgeCidr": parameters.get("docker_bridge_cidr", None)
+        }
+    if parameters.get("ssl_cname", None) is not None and parameters.get("ssl_cert_pem_file", None) is not None and parameters.get("ssl_key_pem_file", None) is not None:
+        with open(parameters.get("ssl_cert_pem_file", None)) as f:
+            cert = f.read()
+        with open(parameters.get("ssl_key_pem_file", None)) as f:
+            key = f.read()
+        properties["sslConfiguration"] = {
+            "status": "Enabled",
+            "cname": parameters.get("ssl_cname", None),
+            "cert": cert,
+            "key": key
+        }
+    if parameters.get("load_balancer_type", None) == "InternalLoadBalancer" and parameters.get("load_balancer_subnet", None) is not None:
+        properties["loadBalancerType"] = parameters.get("load_balancer_type", None)
+        properties["loadBalancerSubnet"] = parameters.get("load_balancer_subnet", None)
+    return {
+        "location": location,
+        "tags": {**CREATED_TAG, FINGERPRINT_TAG: compute_fingerprint(parameters=parameters), **(tags or {})},
+        "properties": {
+            "computeType": "AKS",
+            "computeLocation": parameters.get("location", None) or location,
+            "description": "AKS Cluster created by Azure/aml-compute GitHub Action",
+            "properties": properties
+        }
+    }
+
+
+def build_aks_attach_payload(subscription_id, location, parameters, tags=None):
+    # Building the request body that attaches an existing AKS cluster, like AksCompute.attach_configuration
+    properties = {}
+    if parameters.get("cluster_purpose", None) is not None:
+        properties["clusterPurpose"] = "DevTest" if "dev" in parameters.get("cluster_purpose", "").lower() or "test" in parameters.get("cluster_purpose", "").lower() else "FastProd"
+    if parameters.get("ssl_cname", None) is not None and parameters.get("ssl_cert_pem_file", None) is not None and parameters.get("ssl_key_pem_file", None) is not None:
+        with open(parameters.get("ssl_cert_pem_file", None)) as f:
+            cert = f.read()
+        with open(parameters.get("ssl_key_pem_file", None)) as f:
+            key = f.read()
+        properties["sslConfiguration"] = {
+            "status": "Enabled",
+            "cname": parameters.get("ssl_cname", None),
+            "cert": cert,
+            "key": key
+        }
+    if parameters.get("load_balancer_type", None) == "InternalLoadBalancer" and parameters.get("load_balancer_subnet", None) is not None:
+        properties["loadBalancerType"] = parameters.get("load_balancer_type", None)
+        properties["loadBalancerSubnet"] = parameters.get("load_balancer_subnet", None)
+    return {
+        "location": location,
+        "tags": {**ATTACHED_TAG, FINGERPRINT_TAG: compute_fingerprint(parameters=parameters), **(tags or {})},
+        "properties": {
+            "computeType": "AKS",
+            "resourceId": parameters.get("resource_id", None),
+            "description": "AKS Cluster attached by Azure/aml-compute GitHub Action",
+            "properties": properties
+        }
+    }
+
+
+def get_payload_builder(parameters):
+    if parameters.get("compute_type", None) == "akscluster":
+        return build_aks_attach_payload if parameters.get("resource_id", None) is not None else build_aks_cluster_payload
+    return build_aml_cluster_payload
+
+
+class RestComputeTarget():
+    # Compute target backed by the Azure Resource Manager representation returned by the REST backend
+    def __init__(self, backend, resource):
+        self.backend = backend
+        self.load(resource=resource)
+
+    def load(self, resource):
+        self.resource = resource
+        properties = resource.get("properties", None) or {}
+        self.name = resource.get("name", None)
+        self.id = resource.get("id", None)
+        self.type = properties.get("computeType", None)
+        self.tags = resource.get("tags", None) or {}
+        self.provisioning_state = properties.get("provisioningState", None)
+
+    def serialize(self):
+        return self.resource
+
+    def refresh_state(self):
+        self.load(resource=self.backend.request(method="GET", path=self.id).json())
+
+    def is_attached(self):
+        properties = self.resource.get("properties", None) or {}
+        return bool(properties.get("isAttachedCompute", False)) or any([key in self.tags for key in ATTACHED_TAG.keys()])
+
+    def update(self, min_nodes=None, max_nodes=None, idle_seconds_before_scaledown=None):
+        # Sending the complete scale settings like AmlCompute.update, unchanged values are taken from the current state
+        current_scale_settings = ((self.resource.get("properties", None) or {}).get("properties", None) or {}).get("scaleSettings", None) or {}
+        scale_settings = {
+            "minNodeCount": min_nodes if min_nodes is not None else current_scale_settings.get("minNodeCount", 0),
+            "maxNodeCount": max_nodes if max_nodes is not None else current_scale_settings.get("maxNodeCount", None),
+            "nodeIdleTimeBeforeScaleDown": f"PT{idle_seconds_before_scaledown}S" if idle_seconds_before_scaledown is not None else current_scale_settings.get("nodeIdleTimeBeforeScaleDown", None)
+        }
+        self.backend.request(
+            method="PATCH",
+            path=self.id,
+            json={"properties": {"computeType": "AmlCompute", "properties": {"scaleSettings": scale_settings}}}
+        )
+        self.refresh_state()
+
+    def delete(self):
+        # Deleting the underlying resources of compute targets created by the action, attached clusters are only detached
+        if self.is_attached():
+            return self.detach()
+        self.backend.request(method="DELETE", path=self.id, params={"underlyingResourceAction": "Delete"})
+
+    def detach(self):
+        self.backend.request(method="DELETE", path=self.id, params={"underlyingResourceAction": "Detach"})
+
+
+class RestBackend(ComputeBackend):
+    # Backend calling the Azure Resource Manager endpoints of Azure Machine Learning directly, without the SDK
+    def __init__(self, azure_credentials, workspace_config, session=None, token=None):
+        self.azure_credentials = azure_credentials
+        self.resource_manager_endpoint = get_endpoint(azure_credentials, "resourceManagerEndpointUrl", "https://management.azure.com")
+        self.authority = get_endpoint(azure_credentials, "activeDirectoryEndpointUrl", "https://login.microsoftonline.com")
+        self.subscription_id = workspace_config.get("subscription_id", None) or azure_credentials.get("subscriptionId", None)
+        self.workspace_id = f"/subscriptions/{self.subscription_id}/resourceGroups/{workspace_config.get('resource_group', None)}/providers/Microsoft.MachineLearningServices/workspaces/{workspace_config.get('workspace_name', None)}"
+        self.session = session or create_session()
+        self.token = token
+        self.token_expires_on = get_token_expiry(token=token) if token is not None else 0
+        self.token_lock = threading.Lock()
+        self.location = None
+        self.preflight_source = ArmPreflightSource(
+            get=lambda path, api_version: self.request(method="GET", path=path, api_version=api_version).json(),
+            subscription_id=self.subscription_id
+        )
+
+    def get_token(self):
+        # Acquiring a token with the client credentials flow, shared by all threads until shortly before it expires
+        with self.token_lock:
+            if self.token is None or self.token_expires_on - time.time() < TOKEN_EXPIRY_MARGIN_SECONDS:
+                print("::debug::Acquiring token for Azure Resource Manager")
+                with tracer.span(name="authentication"):
+                    response = retry_policy.call(
+                        function=lambda: self.raise_for_status(self.session.post(
+                            url=f"{self.authority}/{self.azure_credentials.get('tenantId', '')}/oauth2/v2.0/token",
+                            data={
+                                "grant_type": "client_credentials",
+                                "client_id": self.azure_credentials.get("clientId", ""),
+                                "client_secret": self.azure_credentials.get("clientSecret", ""),
+                                "scope": f"{self.resource_manager_endpoint}/.default"
+                            }
+                        )),
+                        description="token acquisition"
+                    )
+                token = response.json()
+                self.token = token["access_token"]
+                self.token_expires_on = time.time() + int(token.get("expires_in", 3600))
+            return self.token
+
+    def raise_for_status(self, response):
+        response.raise_for_status()
+        return response
+
+    def request(self, method, path, api_version=COMPUTE_API_VERSION, json=None, params=None):
+        return retry_policy.call(
+            function=lambda: self.raise_for_status(self.session.request(
+                method=method,
+                url=f"{self.resource_manager_endpoint}{path}",
+                params={"api-version": api_version, **(params or {})},
+                headers={"Authorization": f"Bearer {self.get_token()}"},
+                json=json
+            )),
+            description=f"{method} {path.split('/')[-1]}"
+        )
+
+    def get_location(self):
+        if self.location is None:
+            self.location = self.request(method="GET", path=self.workspace_id).json().get("location", None)
+        return self.location
+
+    def get_subscription_id(self):
+        return self.subscription_id
+
+    def get_workspace_id(self):
+        return self.workspace_id
+
+    def get_preflight_source(self):
+        return self.preflight_source
+
+    def get_compute_target(self, name):
+        import requests
+
+        try:
+            response = self.request(method="GET", path=f"{self.workspace_id}/computes/{name}")
+        except requests.exceptions.HTTPError as exception:
+            if exception.response is not None and exception.response.status_code == 404:
+                return None
+            print(f"::error::Could not load compute target '{name}': {exception}")
+            raise AMLComputeException(f"Could not load compute target '{name}'. Please check the output for more details.") from exception
+        return RestComputeTarget(backend=self, resource=response.json())
+
+    def list_compute_targets(self):
+        import requests
+
+        # Listing all compute targets of the workspace, following the next links of paged results
+        compute_targets = []
+        path, params = f"{self.workspace_id}/computes", {}
+        while path is not None:
+            try:
+                result = self.request(method="GET", path=path, params=params).json()
+            except requests.exceptions.HTTPError as exception:
+                print(f"::error::Could not list compute targets: {exception}")
+                raise AMLComputeException("Could not list compute targets. Please check the output for more details.") from exception
+            compute_targets.extend([RestComputeTarget(backend=self, resource=resource) for resource in result.get("value", [])])
+            next_link = result.get("nextLink", None)
+            if next_link:
+                next_link = urlsplit(next_link)
+                path, params = next_link.path, dict(parse_qsl(next_link.query))
+            else:
+                path = None
+        return compute_targets
+
+    def create_compute_target(self, name, parameters, wait=True, timeout_minutes=60, tags=None):
+        import requests
+
+        build_payload = get_payload_builder(parameters=parameters)
+        payload = build_payload(
+            subscription_id=self.subscription_id,
+            location=self.get_location(),
+            parameters=parameters,
+            tags=tags
+        )
+        print("::debug::Creating compute target")
+        try:
+            with tracer.span(name="create_submission", compute_target=name):
+                response = self.request(method="PUT", path=f"{self.workspace_id}/computes/{name}", json=payload)
+        except requests.exceptions.HTTPError as exception:
+            if is_capacity_failure(exception.response.text if exception.response is not None else exception):
+                print(f"::error::Could not create compute target due to unavailable capacity or quota: {exception}")
+                raise AMLCapacityException(f"Could not create compute target '{name}' due to unavailable capacity or quota.") from exception
+            print(f"::error::Could not create compute target with specified parameters: {exception}")
+            if exception.response is not None and exception.response.status_code < 500 and exception.response.status_code != 429:
+                raise AMLConfigurationException(f"Could not create compute target with specified parameters. Please check the output for more details: {exception}") from exception
+            raise AMLComputeException(f"Could not create compute target '{name}'. Please check the output for more details.") from exception
+        compute_target = RestComputeTarget(backend=self, resource=response.json())
+        compute_target._operation_endpoint = response.headers.get("Azure-AsyncOperation", None)
+        if not wait:
+            return compute_target
+
+        # Waiting for provisioning to finish
+        wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=timeout_minutes
+        )
+        check_provisioning_state(compute_target=compute_target)
+        return compute_target
+
+    def update_tags(self, compute_target, tags):
+        import requests
+
+        try:
+            self.request(
+                method="PATCH",
+                path=f"{compute_target.id}/providers/Microsoft.Resources/tags/default",
+                api_version=TAGS_API_VERSION,
+                json={"operation": "Merge", "properties": {"tags": tags}}
+            )
+        except requests.exceptions.RequestException as exception:
+            print(f"::warning::Could not update tags of compute target '{compute_target.name}': {exception}")
+            return False
+        compute_target.tags = {**(compute_target.tags or {}), **tags}
+        return True
@@ -0,0 +1,99 @@
+import re
+import time
+import random
+import threading
+
+from tracing import tracer
+
+
+class RetryPolicy():
+    def __init__(self, max_attempts=6, initial_backoff=2, max_backoff=60, budget_seconds=300):
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.budget_seconds = budget_seconds
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def reserve_backoff(self, delay):
+        # Reserving backoff time from the retry budget that is shared by all calls and threads
+        with self.lock:
+            if self.backoff_seconds + delay > self.budget_seconds:
+                return False
+            self.retries += 1
+            self.backoff_seconds += delay
+            return True
+
+    def call(self, function, description):
+        backoff = self.initial_backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return function()
+            except Exception as exception:
+                classification = classify_exception(exception)
+                if classification not in ["throttled", "transient"] or attempt == self.max_attempts:
+                    raise
+                retry_after = get_retry_after(exception)
+                if retry_after is not None:
+                    delay = retry_after + random.uniform(0, 1)
+                else:
+                    delay = random.uniform(backoff / 2, backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                if not self.reserve_backoff(delay):
+                    print(f"::warning::Retry budget of {self.budget_seconds}s exhausted. Not retrying {description}.")
+                    raise
+                print(f"::debug::Attempt {attempt} of {description} failed ({classification}). Retrying in {delay:.1f}s.")
+                with tracer.span(name="retry_backoff", description=description, attempt=attempt, classification=classification):
+                    time.sleep(delay)
+
+    def report(self):
+        return {
+            "retries": self.retries,
+            "backoff_seconds": round(self.backoff_seconds, 1)
+        }
+
+
+def get_status_code(exception):
+    # requests exceptions carry the response, SDK exceptions include the status code in the message
+    response = getattr(exception, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        return int(status_code)
+    match = re.search(r"Response Code: (\d{3})", str(exception))
+    if match is not None:
+        return int(match.group(1))
+    return None
+
+
+def get_retry_after(exception):
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After", None)
+    if retry_after is None:
+        match = re.search(r"Retry-After['\"]?\s*:\s*['\"]?(\d+)", str(exception))
+        retry_after = match.group(1) if match is not None else None
+    try:
+        return int(retry_after) if retry_after is not None else None
+    except ValueError:
+        return None
+
+
+def is_capacity_failure(error):
+    # Capacity and quota failures surface as error codes or messages of the create call or of the provisioning errors
+    return re.search(r"QuotaExceeded|AllocationFailed|OverconstrainedAllocationRequest|SkuNotAvailable|InsufficientCapacity|\bquota\b", str(error), re.IGNORECASE) is not None
+
+
+def classify_exception(exception):
+    status_code = get_status_code(exception)
+    if status_code == 404 or "ComputeTargetNotFound" in str(exception):
+        return "not_found"
+    elif status_code == 429 or "TooManyRequests" in str(exception):
+        return "throttled"
+    elif status_code in [500, 502, 503, 504] or type(exception).__name__ in ["ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout"]:
+        return "transient"
+    return "fatal"
+
+
+# Retry policy used for all calls to Azure Resource Manager and Azure Machine Learning
+retry_policy = RetryPolicy()
@@ -25,11 +25,9 @@
     }
 }
 
-parameters_schema = {
-    "$id": "http://azure-ml.com/schemas/compute.json",
-    "$schema": "http://json-schema.org/schema",
-    "title": "aml-compute",
-    "description": "JSON specification for your compute details",
+compute_schema = {
+    "title": "compute",
+    "description": "JSON specification for a single compute target",
     "type": "object",
     "properties": {
         "name": {
@@ -41,7 +39,7 @@
         "compute_type": {
             "type": "string",
             "description": "Specifies the type of compute target that should be created by the action if a compute target with the specified name was not found.",
-            "pattern": "amlcluster|akscluster"
+            "pattern": "^(amlcluster|akscluster)$"
         },
         "vm_size": {
             "type": "string",
@@ -50,7 +48,28 @@
         "vm_priority": {
             "type": "string",
             "description": "The VM priority.",
-            "pattern": "dedicated|lowpriority"
+            "pattern": "^(dedicated|lowpriority)$"
+        },
+        "vm_candidates": {
+            "type": "array",
+            "description": "Ordered list of VM sizes and priorities that are tried in turn if capacity or quota is unavailable. Takes precedence over vm_size and vm_priority.",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "vm_size": {
+                        "type": "string",
+                        "description": "The size of agent VMs."
+                    },
+                    "vm_priority": {
+                        "type": "string",
+                        "description": "The VM priority.",
+                        "pattern": "^(dedicated|lowpriority)$"
+                    }
+                },
+                "required": ["vm_size"],
+                "additionalProperties": False
+            }
         },
         "min_nodes": {
             "type": "integer",
@@ -82,17 +101,22 @@
         "remote_login_port_public_access": {
             "type": "string",
             "description": "State of the public SSH port.",
-            "pattern": "Enabled|Disabled|NotSpecified"
+            "pattern": "^(Enabled|Disabled|NotSpecified)$"
         },
         "identity_type": {
             "type": "string",
             "description": "Specifies the type of identity that should be assigned to the AML Cluster. Supported is SystemAssigned or UserAssigned identity.",
-            "pattern": "SystemAssigned|UserAssigned"
+            "pattern": "^(SystemAssigned|UserAssigned)$"
         },
         "identity_id": {
             "type": "array",
             "description": "User assigned identities."
         },
+        "resource_id": {
+            "type": "string",
+            "description": "Azure resource id of an existing AKS cluster that is attached instead of provisioning a new AKS cluster.",
+            "pattern": "^/subscriptions/[^/]+/resource[Gg]roups/[^/]+/providers/Microsoft\\.ContainerService/managedClusters/[^/]+$"
+        },
         "agent_count": {
             "type": "integer",
             "description": "The number of agents (VMs) to host containers.",
@@ -117,7 +141,7 @@
         "cluster_purpose": {
             "type": "string",
             "description": "Targeted usage of the cluster.",
-            "pattern": "DevTest|FastProd"
+            "pattern": "^(DevTest|FastProd)$"
         },
         "ssl_cname": {
             "type": "string",
@@ -134,11 +158,85 @@
         "load_balancer_type": {
             "type": "string",
             "description": "Load balancer type of AKS cluster.",
-            "pattern": "PublicIp|InternalLoadBalancer"
+            "pattern": "^(PublicIp|InternalLoadBalancer)$"
         },
         "load_balancer_subnet": {
             "type": "string",
             "description": "Load balancer subnet of AKS cluster. It can be used only when Internal Load Balancer is used as load balancer type."
+        },
+        "hybrid": {
+            "type": "object",
+            "description": "Provisions a linked pair of a dedicated and a low priority AML cluster named '<name>-d' and '<name>-l' instead of a single AML cluster. min_nodes and max_nodes apply to the low priority cluster.",
+            "properties": {
+                "dedicated_min_nodes": {
+                    "type": "integer",
+                    "description": "The minimum number of nodes of the dedicated cluster.",
+                    "minimum": 0
+                },
+                "dedicated_max_nodes": {
+                    "type": "integer",
+                    "description": "The maximum number of nodes of the dedicated cluster.",
+                    "minimum": 1
+                },
+                "max_preemption_rate": {
+                    "type": "number",
+                    "description": "Share of preempted low priority nodes above which jobs are routed to the dedicated cluster.",
+                    "minimum": 0,
+                    "maximum": 1
+                }
+            },
+            "additionalProperties": False
+        }
+    }
+}
+
+parameters_schema = {
+    "$id": "http://azure-ml.com/schemas/compute.json",
+    "$schema": "http://json-schema.org/schema",
+    "title": "aml-compute",
+    "description": "JSON specification for your compute details. Either a single compute target or a list of compute targets.",
+    "if": {
+        "type": "array"
+    },
+    "then": {
+        "description": "List of compute targets that should be retrieved or created in parallel.",
+        "minItems": 1,
+        "items": compute_schema
+    },
+    "else": compute_schema
+}
+
+workspace_schema = {
+    "title": "workspace",
+    "description": "JSON specification for a single workspace to which the compute targets are applied",
+    "type": "object",
+    "required": ["resource_group", "workspace_name"],
+    "properties": {
+        "subscription_id": {
+            "type": "string",
+            "description": "The subscription ID of the workspace. Defaults to the subscription ID of the azure credentials."
+        },
+        "resource_group": {
+            "type": "string",
+            "description": "The resource group of the workspace."
+        },
+        "workspace_name": {
+            "type": "string",
+            "description": "The name of the workspace."
+        },
+        "overrides": {
+            "type": "object",
+            "description": "Parameters that replace the parameters of all compute targets in this workspace, e.g. the location or VM size."
         }
     }
 }
+
+workspaces_schema = {
+    "$id": "http://azure-ml.com/schemas/workspaces.json",
+    "$schema": "http://json-schema.org/schema",
+    "title": "aml-compute-workspaces",
+    "description": "JSON specification for the list of workspaces to which the compute targets are applied concurrently.",
+    "type": "array",
+    "minItems": 1,
+    "items": workspace_schema
+}
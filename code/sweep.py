@@ -0,0 +1,163 @@
+import os
+import re
+
+from datetime import datetime, timezone
+from pool import POOL_TAG, get_lease
+from reconcile import get_live_parameters
+from retry import retry_policy
+from utils import CREATED_TAG, run_in_parallel
+from warmup import get_node_state_counts
+
+
+def parse_timestamp(value):
+    # Parsing ISO 8601 timestamps of the service, which may end with 'Z' and include up to seven fractional digits
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        timestamp = value
+    else:
+        value = re.sub(r"(\.\d{6})\d+", r"\1", str(value).replace("Z", "+00:00"))
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+
+
+def get_created_on(compute_target, live_state):
+    cluster_properties = live_state.get("properties", None) or {}
+    return parse_timestamp(cluster_properties.get("createdOn", None) or getattr(compute_target, "created_on", None))
+
+
+def get_last_used_on(compute_target, live_state):
+    # Nodes are allocated or released whenever jobs start or finish, so the last allocation change approximates the last use
+    cluster_properties = live_state.get("properties", None) or {}
+    status = cluster_properties.get("status", None) or {}
+    properties = cluster_properties.get("properties", None) or {}
+    last_used_on = status.get("allocationStateTransitionTime", None) or properties.get("allocationStateTransitionTime", None) or cluster_properties.get("modifiedOn", None)
+    return parse_timestamp(last_used_on) or get_created_on(compute_target=compute_target, live_state=live_state)
+
+
+def hours_since(timestamp, now):
+    return round((now - timestamp).total_seconds() / 3600, 2) if timestamp is not None else None
+
+
+def evaluate_compute_target(compute_target, action, max_age_hours, idle_hours, now):
+    # Deciding whether a compute target is swept and why, only compute targets created by the action are considered
+    live_state = compute_target.serialize()
+    live_parameters = get_live_parameters(live_state=live_state)
+    node_state_counts = get_node_state_counts(live_state=live_state)
+    age_hours = hours_since(get_created_on(compute_target=compute_target, live_state=live_state), now)
+    unused_hours = hours_since(get_last_used_on(compute_target=compute_target, live_state=live_state), now)
+    evaluation = {
+        "name": compute_target.name,
+        "compute_type": compute_target.type,
+        "age_hours": age_hours,
+        "unused_hours": unused_hours,
+        "action": "skip"
+    }
+    created_key, created_value = list(CREATED_TAG.items())[0]
+    if (compute_target.tags or {}).get(created_key, None) != created_value:
+        return {**evaluation, "reason": "not created by the action"}
+    if get_lease(compute_target=compute_target) is not None:
+        return {**evaluation, "reason": "leased from a pool"}
+    if (compute_target.tags or {}).get(POOL_TAG, "") != "":
+        return {**evaluation, "reason": "member of a pool"}
+    if compute_target.provisioning_state not in ["Succeeded", "Failed", "Canceled"]:
+        return {**evaluation, "reason": f"provisioning state '{compute_target.provisioning_state}'"}
+    if node_state_counts["running"] + node_state_counts["preparing"] > 0:
+        return {**evaluation, "reason": "nodes are in use"}
+    if max_age_hours > 0 and (age_hours is None or age_hours < max_age_hours):
+        return {**evaluation, "reason": f"younger than {max_age_hours} hour(s)"}
+    if idle_hours > 0 and (unused_hours is None or unused_hours < idle_hours):
+        return {**evaluation, "reason": f"used within the last {idle_hours} hour(s)"}
+    if action == "scale_down":
+        if live_parameters["compute_type"] != "amlcluster":
+            return {**evaluation, "reason": "only AML clusters can be scaled down"}
+        if (live_parameters["min_nodes"] or 0) == 0 and node_state_counts["idle"] == 0:
+            return {**evaluation, "reason": "already scaled down"}
+    return {**evaluation, "action": action, "reason": "stale"}
+
+
+def sweep_compute_target(compute_target, action, max_age_hours, idle_hours, dry_run, now):
+    evaluation = evaluate_compute_target(
+        compute_target=compute_target,
+        action=action,
+        max_age_hours=max_age_hours,
+        idle_hours=idle_hours,
+        now=now
+    )
+    if evaluation["action"] == "skip":
+        return {**evaluation, "status": "skipped"}
+    if dry_run:
+        print(f"::notice::Dry run: would {action.replace('_', ' ')} compute target '{compute_target.name}' ({evaluation['age_hours']}h old, unused for {evaluation['unused_hours']}h)")
+        return {**evaluation, "status": "dry_run"}
+
+    # Evaluating the refreshed state again, because a job may have started since the compute targets were listed
+    retry_policy.call(
+        function=compute_target.refresh_state,
+        description=f"refresh of compute target '{compute_target.name}'"
+    )
+    evaluation = evaluate_compute_target(
+        compute_target=compute_target,
+        action=action,
+        max_age_hours=max_age_hours,
+        idle_hours=idle_hours,
+        now=now
+    )
+    if evaluation["action"] == "skip":
+        return {**evaluation, "status": "skipped"}
+    if action == "delete":
+        print(f"::debug::Deleting compute target '{compute_target.name}'")
+        retry_policy.call(
+            function=compute_target.delete,
+            description=f"deletion of compute target '{compute_target.name}'"
+        )
+    else:
+        print(f"::debug::Scaling down compute target '{compute_target.name}'")
+        retry_policy.call(
+            function=lambda: compute_target.update(min_nodes=0),
+            description=f"update of compute target '{compute_target.name}'"
+        )
+    return {**evaluation, "status": "deleted" if action == "delete" else "scaled_down"}
+
+
+def sweep_compute_targets(backend, action="delete", max_age_hours=24, idle_hours=24, dry_run=True, max_workers=4, now=None):
+    # Listing all compute targets once and sweeping the stale ones created by the action in parallel
+    now = now or datetime.now(timezone.utc)
+    compute_targets = backend.list_compute_targets()
+    print(f"::debug::Evaluating {len(compute_targets)} compute target(s) with action '{action}', maximum age {max_age_hours}h, idle time {idle_hours}h and dry run {dry_run}")
+    results = run_in_parallel(
+        function=lambda compute_target: sweep_compute_target(
+            compute_target=compute_target,
+            action=action,
+            max_age_hours=max_age_hours,
+            idle_hours=idle_hours,
+            dry_run=dry_run,
+            now=now
+        ),
+        items=compute_targets,
+        max_workers=max_workers
+    )
+    report = []
+    for compute_target, (result, exception) in zip(compute_targets, results):
+        if exception is None:
+            report.append(result)
+        else:
+            print(f"::error::Could not sweep compute target '{compute_target.name}': {exception}")
+            report.append({"name": compute_target.name, "compute_type": compute_target.type, "action": action, "status": "failed", "reason": str(exception)})
+    return report
+
+
+def write_sweep_summary(report, dry_run):
+    github_step_summary = os.environ.get("GITHUB_STEP_SUMMARY", None)
+    if github_step_summary is None:
+        return False
+    with open(github_step_summary, "a") as f:
+        f.write(f"### Azure Machine Learning Compute Action sweep{' (dry run)' if dry_run else ''}\n\n")
+        f.write("| Compute target | Type | Age | Unused | Status | Reason |\n")
+        f.write("| -------------- | ---- | --- | ------ | ------ | ------ |\n")
+        for entry in report:
+            f.write(f"| {entry['name']} | {entry['compute_type']} | {entry.get('age_hours', '')}h | {entry.get('unused_hours', '')}h | {entry['status']} | {entry['reason']} |\n")
+        f.write("\n")
+    return True
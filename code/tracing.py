@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import threading
+
+from contextlib import contextmanager
+
+
+class Tracer():
+    # Records nested spans with monotonic timers. Spans of worker threads without an open span are
+    # attached to the current root span.
+    def __init__(self):
+        self.spans = []
+        self.trace_id = os.urandom(16).hex()
+        self.root_span_id = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def get_stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name, root=False, **attributes):
+        stack = self.get_stack()
+        span = {
+            "name": name,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": stack[-1]["span_id"] if len(stack) > 0 else self.root_span_id,
+            "start_time": time.time(),
+            "start": time.monotonic(),
+            "attributes": attributes,
+            "root": root,
+            "status": "OK"
+        }
+        if root:
+            self.root_span_id = span["span_id"]
+        stack.append(span)
+        try:
+            yield span
+        except BaseException:
+            span["status"] = "ERROR"
+            raise
+        finally:
+            span["duration"] = time.monotonic() - span["start"]
+            stack.pop()
+            if root:
+                self.root_span_id = None
+            with self.lock:
+                self.spans.append(span)
+
+    def phase_durations(self):
+        # Summing durations of all spans with the same name, except root spans
+        durations = {}
+        with self.lock:
+            for span in self.spans:
+                if not span["root"]:
+                    durations[span["name"]] = durations.get(span["name"], 0.0) + span["duration"]
+        return {name: round(duration, 3) for name, duration in durations.items()}
+
+    def total_duration(self):
+        with self.lock:
+            return round(sum([span["duration"] for span in self.spans if span["root"]]), 3)
+
+    def to_otlp(self):
+        # Converting spans into the OpenTelemetry JSON format, so traces can be loaded by common collectors
+        with self.lock:
+            spans = [{
+                "traceId": self.trace_id,
+                "spanId": span["span_id"],
+                "parentSpanId": span["parent_span_id"] or "",
+                "name": span["name"],
+                "startTimeUnixNano": int(span["start_time"] * 1e9),
+                "endTimeUnixNano": int((span["start_time"] + span["duration"]) * 1e9),
+                "attributes": [{"key": key, "value": {"stringValue": str(value)}} for key, value in span["attributes"].items()],
+                "status": {"code": "STATUS_CODE_ERROR" if span["status"] == "ERROR" else "STATUS_CODE_OK"}
+            } for span in self.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "aml-compute"}},
+                        {"key": "github.repository", "value": {"stringValue": os.environ.get("GITHUB_REPOSITORY", "")}},
+                        {"key": "github.run_id", "value": {"stringValue": os.environ.get("GITHUB_RUN_ID", "")}}
+                    ]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "aml-compute"},
+                    "spans": spans
+                }]
+            }]
+        }
+
+
+def write_summary(phase_durations, total_duration):
+    github_step_summary = os.environ.get("GITHUB_STEP_SUMMARY", None)
+    if github_step_summary is None:
+        return False
+    with open(github_step_summary, "a") as f:
+        f.write("### Azure Machine Learning Compute Action timings\n\n")
+        f.write("| Phase | Duration |\n")
+        f.write("| ----- | -------- |\n")
+        for name, duration in phase_durations.items():
+            f.write(f"| {name} | {duration:.3f}s |\n")
+        f.write(f"| **total** | **{total_duration:.3f}s** |\n\n")
+    return True
+
+
+def write_trace(trace_file_path, trace):
+    os.makedirs(os.path.dirname(os.path.abspath(trace_file_path)), exist_ok=True)
+    with open(trace_file_path, "w") as f:
+        json.dump(trace, f, indent=2)
+
+
+# Tracer used for all phases of the action
+tracer = Tracer()
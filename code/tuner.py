@@ -0,0 +1,245 @@
+import os
+import csv
+import sys
+import json
+import math
+import re
+import difflib
+import argparse
+
+from sweep import parse_timestamp
+from utils import AMLConfigurationException
+
+
+# Candidate idle times before scale down in seconds, AML clusters accept any value, these cover the common range
+IDLE_SECONDS_CANDIDATES = [60, 120, 300, 600, 900, 1200, 1800, 2700, 3600]
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        print("::error::Package numpy is required by the autoscale tuner. Please install it with `pip install numpy`.")
+        raise AMLConfigurationException("Package numpy is required by the autoscale tuner. Please install it with `pip install numpy`.")
+    return numpy
+
+
+def load_records(path):
+    # Reading a list of records from a JSON file, optionally wrapped in 'value' like REST exports, or from a CSV file with a header
+    try:
+        with open(path, newline="") as f:
+            if path.lower().endswith(".csv"):
+                return list(csv.DictReader(f))
+            records = json.load(f)
+    except FileNotFoundError:
+        print(f"::error::Could not find file {path}.")
+        raise AMLConfigurationException(f"Could not find file {path}.")
+    return records.get("value", []) if isinstance(records, dict) else records
+
+
+def to_seconds(value):
+    # Converting ISO 8601 timestamps and epoch seconds to epoch seconds
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        timestamp = parse_timestamp(value)
+        return timestamp.timestamp() if timestamp is not None else None
+
+
+def load_runs(records):
+    # Returning start, end and node count of every run. Runs start when they were submitted, because the simulator
+    # decides how long they wait for nodes, and run for their recorded duration.
+    np = import_numpy()
+    runs = []
+    for record in records:
+        submitted_at = to_seconds(record.get("submitted_at", None))
+        started_at = to_seconds(record.get("started_at", None))
+        ended_at = to_seconds(record.get("ended_at", None))
+        duration_seconds = to_seconds(record.get("duration_seconds", None))
+        if duration_seconds is None and ended_at is not None:
+            duration_seconds = ended_at - (started_at if started_at is not None else submitted_at)
+        if submitted_at is None or duration_seconds is None or duration_seconds <= 0:
+            print(f"::debug::Skipping run without submission time or duration: {record}")
+            continue
+        runs.append((submitted_at, submitted_at + duration_seconds, float(record.get("node_count", None) or 1)))
+    if len(runs) == 0:
+        print("::error::The run history does not include any run with 'submitted_at' and 'ended_at' or 'duration_seconds'.")
+        raise AMLConfigurationException("The run history does not include any run with 'submitted_at' and 'ended_at' or 'duration_seconds'.")
+    runs = np.array(runs)
+    return runs[:, 0], runs[:, 1], runs[:, 2]
+
+
+def build_demand_from_runs(starts, ends, node_counts, step_seconds=60):
+    # Building the number of requested nodes per time step with one scatter-add of the run starts and ends
+    np = import_numpy()
+    origin = starts.min()
+    start_steps = np.floor((starts - origin) / step_seconds).astype(int)
+    end_steps = np.maximum(np.ceil((ends - origin) / step_seconds).astype(int), start_steps + 1)
+    changes = np.zeros(end_steps.max() + 1)
+    np.add.at(changes, start_steps, node_counts)
+    np.add.at(changes, end_steps, -node_counts)
+    return np.round(np.cumsum(changes)[:-1], 6)
+
+
+def build_demand_from_node_usage(records, step_seconds=60):
+    # Resampling a node count time series with 'timestamp', 'running' and optionally 'idle' columns to the time
+    # steps. Returns the running nodes as demand and the observed idle nodes, or None if not exported.
+    np = import_numpy()
+    samples = sorted([(to_seconds(record.get("timestamp", None)), record) for record in records if to_seconds(record.get("timestamp", None)) is not None], key=lambda sample: sample[0])
+    if len(samples) == 0:
+        print("::error::The node usage does not include any sample with a 'timestamp'.")
+        raise AMLConfigurationException("The node usage does not include any sample with a 'timestamp'.")
+    timestamps = np.array([timestamp for timestamp, _ in samples])
+    running = np.array([float(record.get("running", None) or 0) for _, record in samples])
+    steps = timestamps[0] + np.arange(max(1, int(math.ceil((timestamps[-1] - timestamps[0]) / step_seconds)))) * step_seconds
+    indexes = np.searchsorted(timestamps, steps, side="right") - 1
+    idle = None
+    if all([record.get("idle", None) not in [None, ""] for _, record in samples]):
+        idle = np.array([float(record["idle"]) for _, record in samples])[indexes]
+    return running[indexes], idle
+
+
+def rolling(values, window, reduce):
+    # Reducing every value with the window - 1 values before it, values before the first step count as zero
+    np = import_numpy()
+    if window <= 1:
+        return values
+    padded = np.concatenate([np.zeros(window - 1), values])
+    return reduce(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+
+
+def simulate(demand, min_nodes, max_nodes, idle_seconds, step_seconds=60, startup_seconds=300):
+    # Replaying the demand through the autoscaler of AML clusters: nodes are allocated when jobs request them, up to
+    # max_nodes, become ready after startup_seconds and are released after they were idle for idle_seconds, but never
+    # below min_nodes. Jobs wait for nodes that are not ready yet and for demand above max_nodes.
+    np = import_numpy()
+    served = np.minimum(demand, max_nodes)
+    allocated = np.maximum(rolling(served, int(math.ceil(idle_seconds / step_seconds)) + 1, np.max), min_nodes)
+    ready = np.maximum(rolling(allocated, int(math.ceil(startup_seconds / step_seconds)) + 1, np.min), min_nodes)
+    ready = np.minimum(ready, allocated)
+    busy = np.minimum(demand, ready)
+    hours = step_seconds / 3600
+    return {
+        "min_nodes": int(min_nodes),
+        "max_nodes": int(max_nodes),
+        "idle_seconds_before_scaledown": int(idle_seconds),
+        "idle_node_hours": round(float((allocated - busy).sum() * hours), 2),
+        "waiting_node_hours": round(float((demand - busy).sum() * hours), 2),
+        "allocated_node_hours": round(float(allocated.sum() * hours), 2)
+    }
+
+
+def get_candidates(demand):
+    # Deriving candidate node counts from the distribution of the demand
+    np = import_numpy()
+    peak = max(1, int(math.ceil(demand.max())))
+    max_nodes = sorted(set([max(1, int(math.ceil(value))) for value in np.percentile(demand, [90, 95, 99])] + [peak]))
+    min_nodes = sorted(set([0] + [int(math.ceil(value)) for value in np.percentile(demand, [10, 25, 50])]))
+    return min_nodes, max_nodes
+
+
+def tune(demand, step_seconds=60, startup_seconds=300, wait_weight=1.0, min_nodes_candidates=None, max_nodes_candidates=None, idle_seconds_candidates=IDLE_SECONDS_CANDIDATES):
+    # Simulating all candidate settings and ranking them by idle node hours plus weighted waiting node hours
+    default_min_nodes, default_max_nodes = get_candidates(demand=demand)
+    evaluations = []
+    for max_nodes in max_nodes_candidates or default_max_nodes:
+        for min_nodes in min_nodes_candidates or default_min_nodes:
+            if min_nodes > max_nodes:
+                continue
+            for idle_seconds in idle_seconds_candidates:
+                evaluation = simulate(
+                    demand=demand,
+                    min_nodes=min_nodes,
+                    max_nodes=max_nodes,
+                    idle_seconds=idle_seconds,
+                    step_seconds=step_seconds,
+                    startup_seconds=startup_seconds
+                )
+                evaluation["score"] = round(evaluation["idle_node_hours"] + wait_weight * evaluation["waiting_node_hours"], 2)
+                evaluations.append(evaluation)
+    return sorted(evaluations, key=lambda evaluation: (evaluation["score"], evaluation["max_nodes"], evaluation["min_nodes"], evaluation["idle_seconds_before_scaledown"]))
+
+
+def build_compute_diff(parameters_file_path, recommendation, name=None):
+    # Applying the recommended settings to the compute target in the parameters file and returning the new file content and a unified diff
+    with open(parameters_file_path) as f:
+        original = f.read()
+    parameters = json.loads(original)
+    definitions = parameters if isinstance(parameters, list) else [parameters]
+    matching = [definition for definition in definitions if name is None or definition.get("name", None) == name]
+    if len(matching) != 1:
+        print(f"::error::Could not find a single compute target{f' named {name}' if name is not None else ''} in {parameters_file_path}. Please provide the name of the compute target.")
+        raise AMLConfigurationException(f"Could not find a single compute target{f' named {name}' if name is not None else ''} in {parameters_file_path}.")
+    for key in ["min_nodes", "max_nodes", "idle_seconds_before_scaledown"]:
+        matching[0][key] = recommendation[key]
+    # Keeping the indentation and the final newline of the file, so the diff only shows the changed settings
+    indentation = re.search(r"^([ \t]+)\S", original, flags=re.MULTILINE)
+    updated = json.dumps(parameters, indent=indentation.group(1) if indentation is not None else None)
+    updated += "\n" if original.endswith("\n") else ""
+    diff = "".join(difflib.unified_diff(
+        original.splitlines(keepends=True),
+        updated.splitlines(keepends=True),
+        fromfile=f"a/{parameters_file_path}",
+        tofile=f"b/{parameters_file_path}"
+    ))
+    return updated, diff
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Recommends autoscale settings of AML clusters by replaying exported run history or node usage through an autoscale simulator.")
+    parser.add_argument("--runs", help="JSON or CSV file with one run per record and the columns submitted_at, started_at (optional), ended_at or duration_seconds and node_count.")
+    parser.add_argument("--node-usage", help="JSON or CSV file with the node counts of the cluster over time and the columns timestamp, running and idle (optional). Used as demand if no runs are provided.")
+    parser.add_argument("--parameters-file", default=os.path.join(".cloud", ".azure", "compute.json"), help="Parameters file to which the recommendation is applied.")
+    parser.add_argument("--name", default=None, help="Name of the compute target in the parameters file, required if it includes several compute targets.")
+    parser.add_argument("--step-seconds", type=int, default=60, help="Resolution of the simulation in seconds.")
+    parser.add_argument("--startup-seconds", type=int, default=300, help="Number of seconds until a new node is ready for jobs.")
+    parser.add_argument("--wait-weight", type=float, default=1.0, help="Cost of a node hour that jobs wait for relative to an idle node hour.")
+    parser.add_argument("--write", action="store_true", help="Write the recommendation to the parameters file instead of only printing the diff.")
+    arguments = parser.parse_args(arguments)
+    if arguments.runs is None and arguments.node_usage is None:
+        parser.error("Please provide --runs or --node-usage.")
+
+    observed_idle = None
+    if arguments.runs is not None:
+        starts, ends, node_counts = load_runs(records=load_records(path=arguments.runs))
+        demand = build_demand_from_runs(starts=starts, ends=ends, node_counts=node_counts, step_seconds=arguments.step_seconds)
+    if arguments.node_usage is not None:
+        running, observed_idle = build_demand_from_node_usage(records=load_records(path=arguments.node_usage), step_seconds=arguments.step_seconds)
+        if arguments.runs is None:
+            demand = running
+
+    evaluations = tune(
+        demand=demand,
+        step_seconds=arguments.step_seconds,
+        startup_seconds=arguments.startup_seconds,
+        wait_weight=arguments.wait_weight
+    )
+    print(f"Simulated {len(evaluations)} settings over {round(len(demand) * arguments.step_seconds / 86400, 1)} day(s) of demand")
+    if observed_idle is not None:
+        print(f"Observed idle node hours: {round(float(observed_idle.sum() * arguments.step_seconds / 3600), 2)}")
+    print(f"{'min_nodes':>9} {'max_nodes':>9} {'idle_seconds':>12} {'idle_node_h':>11} {'waiting_node_h':>14} {'score':>9}")
+    for evaluation in evaluations[:5]:
+        print(f"{evaluation['min_nodes']:>9} {evaluation['max_nodes']:>9} {evaluation['idle_seconds_before_scaledown']:>12} {evaluation['idle_node_hours']:>11} {evaluation['waiting_node_hours']:>14} {evaluation['score']:>9}")
+    recommendation = evaluations[0]
+    print(f"Recommendation: {json.dumps(recommendation)}")
+
+    if os.path.exists(arguments.parameters_file):
+        updated, diff = build_compute_diff(
+            parameters_file_path=arguments.parameters_file,
+            recommendation=recommendation,
+            name=arguments.name
+        )
+        print(diff if diff != "" else f"{arguments.parameters_file} already uses the recommended settings")
+        if arguments.write:
+            with open(arguments.parameters_file, "w") as f:
+                f.write(updated)
+    return recommendation
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except AMLConfigurationException:
+        sys.exit(1)
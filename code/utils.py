@@ -1,8 +1,13 @@
 import os
+import json
+import time
+import random
+import hashlib
 import jsonschema
 
-from azureml.core.compute import ComputeTarget, AmlCompute, AksCompute
-from azureml.exceptions import ComputeTargetException
+from concurrent.futures import ThreadPoolExecutor
+from retry import retry_policy, classify_exception, is_capacity_failure
+from tracing import tracer
 
 
 class AMLConfigurationException(Exception):
@@ -13,32 +18,171 @@ class AMLComputeException(Exception):
     pass
 
 
-def create_compute_target(workspace, name, config):
-    # Creating compute target
-    print("::debug::Creating compute target")
+class AMLCapacityException(AMLComputeException):
+    pass
+
+
+class AMLProvisioningException(AMLComputeException):
+    pass
+
+
+CREATED_TAG = {"Created": "GitHub Action: Azure/aml-compute"}
+ATTACHED_TAG = {"Attached": "GitHub Action: Azure/aml-compute"}
+FINGERPRINT_TAG = "Fingerprint"
+
+
+def default_compute_target_name():
+    # Default compute target name, names can be max 16 characters
+    return str(os.environ.get("GITHUB_REPOSITORY")).split("/")[-1][:16]
+
+
+def get_compute_target(workspace, name):
+    from azureml.core.compute import ComputeTarget
+    from azureml.exceptions import ComputeTargetException
+
+    # Distinguishing missing compute targets from throttling and other failures of the lookup
     try:
-        compute_target = ComputeTarget.create(
-            workspace=workspace,
-            name=name,
-            provisioning_configuration=config
+        return retry_policy.call(
+            function=lambda: ComputeTarget(
+                workspace=workspace,
+                name=name
+            ),
+            description=f"lookup of compute target '{name}'"
         )
-        compute_target.wait_for_completion(show_output=True)
+    except ComputeTargetException as exception:
+        if classify_exception(exception) == "not_found":
+            return None
+        print(f"::error::Could not load compute target '{name}': {exception}")
+        raise AMLComputeException(f"Could not load compute target '{name}'. Please check the output for more details.") from exception
+
+
+def list_compute_targets(workspace):
+    from azureml.core.compute import ComputeTarget
+    from azureml.exceptions import ComputeTargetException
+
+    # Listing all compute targets of the workspace with a single call
+    try:
+        return retry_policy.call(
+            function=lambda: ComputeTarget.list(workspace=workspace),
+            description="listing of compute targets"
+        )
+    except ComputeTargetException as exception:
+        print(f"::error::Could not list compute targets: {exception}")
+        raise AMLComputeException("Could not list compute targets. Please check the output for more details.") from exception
+
+
+def create_compute_target(workspace, name, config, wait=True, timeout_minutes=60, attach=False):
+    from azureml.core.compute import ComputeTarget
+    from azureml.exceptions import ComputeTargetException
+
+    # Creating compute target or attaching existing compute resource
+    print("::debug::Creating compute target")
+    try:
+        with tracer.span(name="create_submission", compute_target=name, attach=attach):
+            compute_target = retry_policy.call(
+                function=lambda: ComputeTarget.attach(
+                    workspace=workspace,
+                    name=name,
+                    attach_configuration=config
+                ) if attach else ComputeTarget.create(
+                    workspace=workspace,
+                    name=name,
+                    provisioning_configuration=config
+                ),
+                description=f"{'attachment' if attach else 'creation'} of compute target '{name}'"
+            )
     except AttributeError as exception:
         print(f"::error::Could not create compute target with specified parameters: {exception}")
-        raise AMLConfigurationException("Could not create compute target with specified parameters. Please review the provided parameters.")
+        raise AMLConfigurationException("Could not create compute target with specified parameters. Please review the provided parameters.") from exception
     except ComputeTargetException as exception:
+        if is_capacity_failure(exception):
+            print(f"::error::Could not create compute target due to unavailable capacity or quota: {exception}")
+            raise AMLCapacityException(f"Could not create compute target '{name}' due to unavailable capacity or quota.") from exception
+        if classify_exception(exception) in ["throttled", "transient"]:
+            print(f"::error::Could not create compute target after retrying: {exception}")
+            raise AMLComputeException("Could not create compute target after retrying. Please check the output for more details.") from exception
         print(f"::error::Could not create compute target with specified parameters: {exception}")
-        raise AMLConfigurationException("Could not create compute target with specified parameters. Please review the provided parameters.")
+        raise AMLConfigurationException("Could not create compute target with specified parameters. Please review the provided parameters.") from exception
+
+    # Returning without waiting in detach mode
+    if not wait:
+        print(f"::debug::Started creation of compute target '{compute_target.name}'. Not waiting for provisioning to finish.")
+        return compute_target
+
+    # Waiting for provisioning to finish
+    wait_for_provisioning(
+        compute_target=compute_target,
+        timeout_minutes=timeout_minutes
+    )
 
     # Checking state of compute target
+    check_provisioning_state(compute_target=compute_target)
+    return compute_target
+
+
+def get_capacity_error(live_state):
+    # Returning provisioning errors of the serialized compute target if they indicate unavailable capacity or quota
+    properties = live_state.get("properties", None) or {}
+    errors = [properties.get("provisioningErrors", None), (properties.get("status", None) or {}).get("errors", None)]
+    errors = json.dumps([error for error in errors if error], default=str)
+    return errors if is_capacity_failure(errors) else None
+
+
+def check_provisioning_state(compute_target):
     print("::debug::Checking state of compute target")
     if compute_target.provisioning_state != "Succeeded":
-        print(f"::error::Deployment of compute target '{compute_target.name}' failed with state '{compute_target.provisioning_state}'. Please delete the compute target manually and retry.")
-        raise AMLComputeException(f"Deployment of compute target '{compute_target.name}' failed with state '{compute_target.provisioning_state}'. Please delete the compute target manually and retry.")
-    return compute_target
+        capacity_error = get_capacity_error(live_state=compute_target.serialize())
+        if capacity_error is not None:
+            print(f"::error::Deployment of compute target '{compute_target.name}' failed due to unavailable capacity or quota: {capacity_error}")
+            raise AMLCapacityException(f"Deployment of compute target '{compute_target.name}' failed due to unavailable capacity or quota.")
+        print(f"::error::Deployment of compute target '{compute_target.name}' failed with state '{compute_target.provisioning_state}'. Please set 'recover_failed_attempts' to delete and recreate it automatically, or delete the compute target manually and retry.")
+        raise AMLProvisioningException(f"Deployment of compute target '{compute_target.name}' failed with state '{compute_target.provisioning_state}'. Please set 'recover_failed_attempts' to delete and recreate it automatically, or delete the compute target manually and retry.")
+
+
+def wait_for_provisioning(compute_target, timeout_minutes=60, initial_interval=5, max_interval=60):
+    # Polling provisioning state with exponential backoff and jitter until a terminal state or the timeout is reached
+    with tracer.span(name="provisioning_wait", compute_target=compute_target.name):
+        print(f"::debug::Waiting up to {timeout_minutes} minute(s) for provisioning of compute target '{compute_target.name}'")
+        start_time = time.monotonic()
+        deadline = start_time + timeout_minutes * 60
+        interval = initial_interval
+        state = compute_target.provisioning_state
+        transitions = [(0.0, state)]
+        while state not in ["Succeeded", "Failed", "Canceled"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print_transitions(name=compute_target.name, transitions=transitions)
+                print(f"::error::Provisioning of compute target '{compute_target.name}' did not finish within {timeout_minutes} minute(s). Last state: '{state}'.")
+                raise AMLComputeException(f"Provisioning of compute target '{compute_target.name}' did not finish within {timeout_minutes} minute(s). Last state: '{state}'.")
+            time.sleep(min(remaining, random.uniform(interval / 2, interval)))
+            interval = min(interval * 2, max_interval)
+            retry_policy.call(
+                function=compute_target.refresh_state,
+                description=f"refresh of compute target '{compute_target.name}'"
+            )
+            if compute_target.provisioning_state != state:
+                state = compute_target.provisioning_state
+                transitions.append((time.monotonic() - start_time, state))
+                print(f"::debug::Compute target '{compute_target.name}' changed state to '{state}'")
+
+            # Stopping early if the compute target cannot be provisioned due to unavailable capacity or quota
+            if state not in ["Succeeded", "Failed", "Canceled"] and get_capacity_error(live_state=compute_target.serialize()) is not None:
+                print(f"::debug::Compute target '{compute_target.name}' reported capacity or quota errors. Not waiting any longer.")
+                break
+        print_transitions(name=compute_target.name, transitions=transitions)
+        return state
+
 
+def print_transitions(name, transitions):
+    print(f"::group::Provisioning of compute target '{name}'")
+    for elapsed, state in transitions:
+        print(f"{elapsed:7.1f}s {state}")
+    print("::endgroup::")
+
+
+def create_aml_cluster(workspace, parameters, wait=True, timeout_minutes=60, tags=None):
+    from azureml.core.compute import AmlCompute
 
-def create_aml_cluster(workspace, parameters):
     print("::debug::Creating aml cluster configuration")
     aml_config = AmlCompute.provisioning_configuration(
         vm_size=parameters.get("vm_size", "Standard_DS3_v2"),
@@ -46,7 +190,7 @@ def create_aml_cluster(workspace, parameters):
         min_nodes=parameters.get("min_nodes", 0),
         max_nodes=parameters.get("max_nodes", 4),
         idle_seconds_before_scaledown=parameters.get("idle_seconds_before_scaledown", None),
-        tags={"Created": "GitHub Action: Azure/aml-compute"},
+        tags={**CREATED_TAG, FINGERPRINT_TAG: compute_fingerprint(parameters=parameters), **(tags or {})},
         description="AML Cluster created by Azure/aml-compute GitHub Action",
         remote_login_port_public_access=parameters.get("remote_login_port_public_access", "NotSpecified")
     )
@@ -76,12 +220,16 @@ def create_aml_cluster(workspace, parameters):
     aml_cluster = create_compute_target(
         workspace=workspace,
         name=parameters.get("name", repository_name),
-        config=aml_config
+        config=aml_config,
+        wait=wait,
+        timeout_minutes=timeout_minutes
     )
     return aml_cluster
 
 
-def create_aks_cluster(workspace, parameters):
+def create_aks_cluster(workspace, parameters, wait=True, timeout_minutes=60, tags=None):
+    from azureml.core.compute import AksCompute
+
     print("::debug::Creating aks cluster configuration")
     aks_config = AksCompute.provisioning_configuration(
         agent_count=parameters.get("agent_count", None),
@@ -119,8 +267,92 @@ def create_aks_cluster(workspace, parameters):
     aks_cluster = create_compute_target(
         workspace=workspace,
         name=parameters.get("name", repository_name),
-        config=aks_config
+        config=aks_config,
+        wait=False,
+        timeout_minutes=timeout_minutes
+    )
+
+    # Tagging right after the submission, so clusters that fail to provision can be recovered by the action
+    print("::debug::Adding tags to compute target")
+    update_compute_tags(
+        compute_target=aks_cluster,
+        tags={**CREATED_TAG, FINGERPRINT_TAG: compute_fingerprint(parameters=parameters), **(tags or {})}
+    )
+    if wait:
+        wait_for_provisioning(
+            compute_target=aks_cluster,
+            timeout_minutes=timeout_minutes
+        )
+        check_provisioning_state(compute_target=aks_cluster)
+    return aks_cluster
+
+
+def attach_aks_cluster(workspace, parameters, wait=True, timeout_minutes=60, tags=None):
+    from azureml.core.compute import AksCompute
+    from azureml.core.compute.aks import AksUpdateConfiguration
+
+    print("::debug::Creating aks attach configuration")
+    aks_config = AksCompute.attach_configuration(
+        resource_id=parameters.get("resource_id", None)
+    )
+
+    print("::debug::Changing cluster purpose if specified settings were provided")
+    if "dev" in parameters.get("cluster_purpose", "").lower() or "test" in parameters.get("cluster_purpose", "").lower():
+        aks_config.cluster_purpose = AksCompute.ClusterPurpose.DEV_TEST
+    elif parameters.get("cluster_purpose", None) is not None:
+        aks_config.cluster_purpose = AksCompute.ClusterPurpose.FAST_PROD
+
+    print("::debug::Adding SSL settings to configuration if all required settings were provided")
+    if parameters.get("ssl_cname", None) is not None and parameters.get("ssl_cert_pem_file", None) is not None and parameters.get("ssl_key_pem_file", None) is not None:
+        aks_config.enable_ssl(
+            ssl_cname=parameters.get("ssl_cname", None),
+            ssl_cert_pem_file=parameters.get("ssl_cert_pem_file", None),
+            ssl_key_pem_file=parameters.get("ssl_key_pem_file", None)
+        )
+
+    print("::debug::Attaching compute target")
+    # Default compute target name
+    repository_name = str(os.environ.get("GITHUB_REPOSITORY")).split("/")[-1][:16]
+    aks_cluster = create_compute_target(
+        workspace=workspace,
+        name=parameters.get("name", repository_name),
+        config=aks_config,
+        wait=False,
+        timeout_minutes=timeout_minutes,
+        attach=True
+    )
+
+    # Tagging right after the submission, so clusters that fail to attach can be recovered by the action
+    print("::debug::Adding tags to compute target")
+    update_compute_tags(
+        compute_target=aks_cluster,
+        tags={**ATTACHED_TAG, FINGERPRINT_TAG: compute_fingerprint(parameters=parameters), **(tags or {})}
     )
+    if wait:
+        wait_for_provisioning(
+            compute_target=aks_cluster,
+            timeout_minutes=timeout_minutes
+        )
+        check_provisioning_state(compute_target=aks_cluster)
+
+    # Applying load balancer settings, which the attach configuration does not support
+    if parameters.get("load_balancer_type", None) == "InternalLoadBalancer" and parameters.get("load_balancer_subnet", None) is not None:
+        if not wait:
+            print("::warning::Load balancer settings of attached AKS clusters can only be applied after the attachment finished. Please rerun the action in 'create' mode to apply them.")
+        else:
+            print("::debug::Updating load balancer settings of attached AKS cluster")
+            retry_policy.call(
+                function=lambda: aks_cluster.update(AksUpdateConfiguration(
+                    load_balancer_type=parameters.get("load_balancer_type", None),
+                    load_balancer_subnet=parameters.get("load_balancer_subnet", None)
+                )),
+                description=f"load balancer update of compute target '{aks_cluster.name}'"
+            )
+            wait_for_provisioning(
+                compute_target=aks_cluster,
+                timeout_minutes=timeout_minutes
+            )
+            check_provisioning_state(compute_target=aks_cluster)
     return aks_cluster
 
 
@@ -128,8 +360,20 @@ def mask_parameter(parameter):
     print(f"::add-mask::{parameter}")
 
 
+# Compiled validators by schema, the schema is stored with its validator, because ids of discarded schemas are reused
+validators = {}
+
+
+def get_validator(schema):
+    cached = validators.get(id(schema), None)
+    if cached is None or cached[0] is not schema:
+        cached = (schema, jsonschema.Draft7Validator(schema))
+        validators[id(schema)] = cached
+    return cached[1]
+
+
 def validate_json(data, schema, input_name):
-    validator = jsonschema.Draft7Validator(schema)
+    validator = get_validator(schema=schema)
     errors = list(validator.iter_errors(data))
     if len(errors) > 0:
         for error in errors:
@@ -148,3 +392,103 @@ def required_parameters_provided(parameters, keys, message="Required parameter n
     if len(missing_keys) > 0:
         print(f"::error::{err_msg}{missing_keys}")
         raise AMLConfigurationException(f"{message} {missing_keys}")
+
+
+def unique_names_provided(names):
+    duplicate_names = sorted(set([name for name in names if names.count(name) > 1]))
+    if len(duplicate_names) > 0:
+        print(f"::error::Compute target names must be unique within the parameters file. Duplicate names: {duplicate_names}")
+        raise AMLConfigurationException(f"Compute target names must be unique within the parameters file. Duplicate names: {duplicate_names}")
+
+
+def run_in_parallel(function, items, max_workers):
+    # Running function for all items on a bounded worker pool and collecting (result, exception) tuples in order
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = [executor.submit(function, item) for item in items]
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as exception:
+                results.append((None, exception))
+    return results
+
+
+def set_output(name, value):
+    github_output = os.environ.get("GITHUB_OUTPUT", None)
+    if github_output is not None:
+        with open(github_output, "a") as f:
+            f.write(f"{name}={value}\n")
+    else:
+        print(f"::set-output name={name}::{value}")
+
+
+def load_integer_input(input_name, default, minimum=1):
+    value = os.environ.get(f"INPUT_{input_name.upper()}", default=str(default))
+    try:
+        value = int(value)
+    except ValueError:
+        value = None
+    if value is None or value < minimum:
+        print(f"::error::Invalid value for {input_name}: '{os.environ.get(f'INPUT_{input_name.upper()}')}'. Please provide an integer greater than or equal to {minimum}.")
+        raise AMLConfigurationException(f"Invalid value for {input_name}. Please provide an integer greater than or equal to {minimum}.")
+    return value
+
+
+def normalize_definition(parameters):
+    # Compute definition as it is fingerprinted at creation and when loading compute targets. VM candidates replace
+    # vm_size and vm_priority, so the compute target has the fingerprint of the definition whichever candidate was used
+    if parameters.get("vm_candidates", None) is None:
+        return parameters
+    return {key: value for key, value in parameters.items() if key not in ["vm_size", "vm_priority"]}
+
+
+def compute_fingerprint(parameters):
+    # Hash of the normalized parameters that is stored as tag to detect compute targets which are already up to date
+    normalized_parameters = json.dumps(normalize_definition(parameters=parameters), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized_parameters.encode("utf-8")).hexdigest()[:32]
+
+
+def get_resource(workspace, path, api_version):
+    import requests
+    from azureml.core.compute import ComputeTarget
+
+    # Reading Azure Resource Manager resources that the SDK does not expose, with the credentials of the workspace
+    resource_manager_endpoint = ComputeTarget._get_resource_manager_endpoint(workspace).rstrip("/")
+
+    def get():
+        response = requests.get(
+            url=f"{resource_manager_endpoint}{path}",
+            params={"api-version": api_version},
+            headers=workspace._auth.get_authentication_header()
+        )
+        response.raise_for_status()
+        return response.json()
+
+    return retry_policy.call(
+        function=get,
+        description=f"GET {path.split('/')[-1]}"
+    )
+
+
+def update_compute_tags(compute_target, tags):
+    import requests
+    from azureml.core.compute import ComputeTarget
+
+    # Merging tags through the Azure Resource Manager tags API, because the SDK cannot update tags of existing compute targets
+    resource_manager_endpoint = ComputeTarget._get_resource_manager_endpoint(compute_target.workspace).rstrip("/")
+    try:
+        retry_policy.call(
+            function=lambda: requests.patch(
+                url=f"{resource_manager_endpoint}{compute_target.id}/providers/Microsoft.Resources/tags/default",
+                params={"api-version": "2021-04-01"},
+                headers=compute_target.workspace._auth.get_authentication_header(),
+                json={"operation": "Merge", "properties": {"tags": tags}}
+            ).raise_for_status(),
+            description=f"tag update of compute target '{compute_target.name}'"
+        )
+    except requests.exceptions.RequestException as exception:
+        print(f"::warning::Could not update tags of compute target '{compute_target.name}': {exception}")
+        return False
+    compute_target.tags = {**(compute_target.tags or {}), **tags}
+    return True
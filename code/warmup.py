@@ -0,0 +1,108 @@
+import json
+import time
+import random
+
+from retry import retry_policy
+from tracing import tracer
+from utils import AMLConfigurationException, AMLComputeException
+from reconcile import get_live_parameters
+
+
+# Tag storing the scale settings that were replaced by warm mode, an empty value means nothing needs to be restored
+WARM_RESTORE_TAG = "WarmRestore"
+
+
+def get_node_state_counts(live_state):
+    # The SDK serializes node counts as part of the status, the REST API as part of the properties
+    cluster_properties = live_state.get("properties", None) or {}
+    status = cluster_properties.get("status", None) or {}
+    properties = cluster_properties.get("properties", None) or {}
+    node_state_counts = status.get("nodeStateCounts", None) or properties.get("nodeStateCounts", None) or {}
+    return {
+        "idle": node_state_counts.get("idleNodeCount", 0) or 0,
+        "running": node_state_counts.get("runningNodeCount", 0) or 0,
+        "preparing": node_state_counts.get("preparingNodeCount", 0) or 0,
+        "unusable": node_state_counts.get("unusableNodeCount", 0) or 0,
+        "leaving": node_state_counts.get("leavingNodeCount", 0) or 0,
+        "preempted": node_state_counts.get("preemptedNodeCount", 0) or 0
+    }
+
+
+def get_pending_restore(compute_target):
+    restore = (compute_target.tags or {}).get(WARM_RESTORE_TAG, "")
+    return json.loads(restore) if restore else None
+
+
+def restore_compute_target(backend, compute_target):
+    # Restoring the scale settings stored by warm mode, so nodes scale down again after the idle time
+    restore = get_pending_restore(compute_target=compute_target)
+    if restore is None:
+        print(f"::debug::Compute target '{compute_target.name}' has no scale settings to restore")
+        return False
+    print(f"::debug::Restoring scale settings of compute target '{compute_target.name}': {restore}")
+    retry_policy.call(
+        function=lambda: compute_target.update(min_nodes=restore["min_nodes"]),
+        description=f"restore of compute target '{compute_target.name}'"
+    )
+    backend.update_tags(
+        compute_target=compute_target,
+        tags={WARM_RESTORE_TAG: ""}
+    )
+    return True
+
+
+def warm_compute_target(backend, compute_target, nodes, timeout_minutes=60, initial_interval=5, max_interval=30):
+    # Raising the minimum node count and polling until the requested number of nodes is idle and ready for jobs
+    live_parameters = get_live_parameters(live_state=compute_target.serialize())
+    if live_parameters["compute_type"] != "amlcluster":
+        print(f"::error::Warm mode only supports AML clusters. Compute target '{compute_target.name}' is of type '{compute_target.type}'.")
+        raise AMLConfigurationException(f"Warm mode only supports AML clusters. Compute target '{compute_target.name}' is of type '{compute_target.type}'.")
+    max_nodes = live_parameters.get("max_nodes", None)
+    if max_nodes is not None and nodes > max_nodes:
+        print(f"::error::Cannot warm {nodes} node(s), because compute target '{compute_target.name}' has at most {max_nodes} node(s).")
+        raise AMLConfigurationException(f"Cannot warm {nodes} node(s), because compute target '{compute_target.name}' has at most {max_nodes} node(s).")
+
+    with tracer.span(name="warm_up", compute_target=compute_target.name, nodes=nodes):
+        # Storing the original scale settings before changing them, unless an earlier warm up did not restore them yet
+        if get_pending_restore(compute_target=compute_target) is None:
+            stored = backend.update_tags(
+                compute_target=compute_target,
+                tags={WARM_RESTORE_TAG: json.dumps({"min_nodes": live_parameters["min_nodes"] or 0})}
+            )
+            # Not scaling up without stored scale settings, restore mode could not scale the nodes down again
+            if not stored:
+                print(f"::error::Could not store the scale settings of compute target '{compute_target.name}'. Not raising the minimum node count, because they could not be restored.")
+                raise AMLComputeException(f"Could not store the scale settings of compute target '{compute_target.name}'. Not raising the minimum node count, because they could not be restored.")
+        if (live_parameters["min_nodes"] or 0) < nodes:
+            print(f"::debug::Raising minimum node count of compute target '{compute_target.name}' to {nodes}")
+            retry_policy.call(
+                function=lambda: compute_target.update(min_nodes=nodes),
+                description=f"update of compute target '{compute_target.name}'"
+            )
+
+        # Polling node states with exponential backoff and jitter until enough nodes are idle or the deadline is reached
+        start_time = time.monotonic()
+        deadline = start_time + timeout_minutes * 60
+        interval = initial_interval
+        while True:
+            retry_policy.call(
+                function=compute_target.refresh_state,
+                description=f"refresh of compute target '{compute_target.name}'"
+            )
+            node_state_counts = get_node_state_counts(live_state=compute_target.serialize())
+            print(f"::debug::Node states of compute target '{compute_target.name}': {node_state_counts}")
+            if node_state_counts["idle"] >= nodes:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"::error::Only {node_state_counts['idle']} of {nodes} node(s) of compute target '{compute_target.name}' were ready within {timeout_minutes} minute(s). Restoring scale settings.")
+                restore_compute_target(
+                    backend=backend,
+                    compute_target=compute_target
+                )
+                raise AMLComputeException(f"Only {node_state_counts['idle']} of {nodes} node(s) of compute target '{compute_target.name}' were ready within {timeout_minutes} minute(s).")
+            time.sleep(min(remaining, random.uniform(interval / 2, interval)))
+            interval = min(interval * 2, max_interval)
+        warm_up_seconds = round(time.monotonic() - start_time, 3)
+        print(f"::notice::{node_state_counts['idle']} node(s) of compute target '{compute_target.name}' are ready after {warm_up_seconds}s")
+        return warm_up_seconds
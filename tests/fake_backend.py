@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import threading
+
+from datetime import datetime, timezone
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from backends import ComputeBackend
+from retry import retry_policy
+from tracing import tracer
+from rest_backend import get_payload_builder
+from utils import AMLCapacityException, wait_for_provisioning, check_provisioning_state
+
+
+class FakeResponse():
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeHttpError(Exception):
+    # Carries a response like requests exceptions, so the retry policy classifies it like a real failure
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(f"{message} (Response Code: {status_code})")
+        self.response = FakeResponse(status_code=status_code, headers=headers)
+
+
+class FakeComputeTarget():
+    # Compute target stored in memory by the fake backend
+    def __init__(self, backend, name, resource, ready_at, final_state):
+        self.backend = backend
+        self.name = name
+        self.id = resource["id"]
+        self.type = resource["properties"]["computeType"]
+        self.tags = dict(resource["tags"])
+        self.resource = resource
+        self.ready_at = ready_at
+        self.final_state = final_state
+        self.provisioning_state = final_state if backend.clock() >= ready_at else "Creating"
+        self.idle_nodes = resource["properties"]["properties"].get("scaleSettings", {}).get("minNodeCount", 0)
+        self.nodes_ready_at = 0.0
+
+    def serialize(self):
+        properties = self.resource["properties"]["properties"]
+        if "scaleSettings" in properties:
+            target_nodes = properties["scaleSettings"]["minNodeCount"]
+            properties = {
+                **properties,
+                "allocationState": "Resizing" if self.idle_nodes < target_nodes else "Steady",
+                "currentNodeCount": target_nodes,
+                "targetNodeCount": target_nodes,
+                "nodeStateCounts": {"idleNodeCount": self.idle_nodes, "preparingNodeCount": max(target_nodes - self.idle_nodes, 0)}
+            }
+        return {**self.resource, "tags": dict(self.tags), "properties": {**self.resource["properties"], "provisioningState": self.provisioning_state, "properties": properties}}
+
+    def refresh_state(self):
+        self.backend.call(description=f"refresh of '{self.name}'")
+        if self.backend.clock() >= self.ready_at:
+            self.provisioning_state = self.final_state
+        if "scaleSettings" in self.resource["properties"]["properties"] and self.backend.clock() >= self.nodes_ready_at:
+            self.idle_nodes = self.resource["properties"]["properties"]["scaleSettings"]["minNodeCount"]
+
+    def update(self, min_nodes=None, max_nodes=None, idle_seconds_before_scaledown=None):
+        self.backend.call(description=f"update of '{self.name}'")
+        scale_settings = self.resource["properties"]["properties"]["scaleSettings"]
+        if min_nodes is not None:
+            if min_nodes > scale_settings["minNodeCount"]:
+                self.nodes_ready_at = self.backend.clock() + self.backend.node_allocation_seconds
+            scale_settings["minNodeCount"] = min_nodes
+        if max_nodes is not None:
+            scale_settings["maxNodeCount"] = max_nodes
+        if idle_seconds_before_scaledown is not None:
+            scale_settings["nodeIdleTimeBeforeScaleDown"] = f"PT{idle_seconds_before_scaledown}S"
+
+    def delete(self):
+        self.backend.call(description=f"deletion of '{self.name}'")
+        with self.backend.lock:
+            self.backend.compute_targets.pop(self.name, None)
+            self.backend.deletions.append(self.name)
+
+    def detach(self):
+        self.backend.call(description=f"detachment of '{self.name}'")
+        with self.backend.lock:
+            self.backend.compute_targets.pop(self.name, None)
+            self.backend.detachments.append(self.name)
+
+
+class FakeBackend(ComputeBackend):
+    # Deterministic in-memory backend for tests and benchmarks. Every call takes latency_seconds, every
+    # throttle_every-th call is throttled, compute targets take provisioning_seconds to provision,
+    # compute targets listed in failures end up in state 'Failed', creating compute targets with a
+    # VM size listed in unavailable_vm_sizes fails due to exceeded quota and nodes added by raising
+    # the minimum node count take node_allocation_seconds to become idle. Preflight checks use preflight_source.
+    def __init__(self, latency_seconds=0.0, provisioning_seconds=0.0, throttle_every=0, failures=None, unavailable_vm_sizes=None, poll_interval=0.01, clock=time.monotonic, node_allocation_seconds=0.0, preflight_source=None):
+        self.latency_seconds = latency_seconds
+        self.provisioning_seconds = provisioning_seconds
+        self.node_allocation_seconds = node_allocation_seconds
+        self.preflight_source = preflight_source
+        self.throttle_every = throttle_every
+        self.failures = failures if failures is not None else []
+        self.unavailable_vm_sizes = unavailable_vm_sizes if unavailable_vm_sizes is not None else []
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.compute_targets = {}
+        self.calls = 0
+        self.creations = 0
+        self.deletions = []
+        self.detachments = []
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def call(self, description):
+        with self.lock:
+            self.calls += 1
+            throttled = self.throttle_every > 0 and self.calls % self.throttle_every == 0
+            if throttled:
+                self.throttled += 1
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+        if throttled:
+            raise FakeHttpError(status_code=429, message=f"Throttled {description}", headers={"Retry-After": "0"})
+
+    def get_compute_target(self, name):
+        retry_policy.call(
+            function=lambda: self.call(description=f"lookup of '{name}'"),
+            description=f"lookup of compute target '{name}'"
+        )
+        with self.lock:
+            return self.compute_targets.get(name, None)
+
+    def get_subscription_id(self):
+        return "fake"
+
+    def get_location(self):
+        return "fake"
+
+    def get_workspace_id(self):
+        return "/fake"
+
+    def get_preflight_source(self):
+        return self.preflight_source
+
+    def list_compute_targets(self):
+        retry_policy.call(
+            function=lambda: self.call(description="listing of compute targets"),
+            description="listing of compute targets"
+        )
+        with self.lock:
+            return list(self.compute_targets.values())
+
+    def create_compute_target(self, name, parameters, wait=True, timeout_minutes=60, tags=None):
+        with tracer.span(name="create_submission", compute_target=name):
+            retry_policy.call(
+                function=lambda: self.call(description=f"creation of '{name}'"),
+                description=f"creation of compute target '{name}'"
+            )
+        build_payload = get_payload_builder(parameters=parameters)
+        resource = build_payload(
+            subscription_id="fake",
+            location="fake",
+            parameters=parameters,
+            tags=tags
+        )
+        resource = {**resource, "id": f"/fake/computes/{name}", "name": name}
+        resource["properties"] = {**resource["properties"], "createdOn": datetime.now(timezone.utc).isoformat()}
+        vm_size = resource["properties"]["properties"].get("vmSize", resource["properties"]["properties"].get("agentVmSize", None))
+        if vm_size in self.unavailable_vm_sizes:
+            print(f"::error::Could not create compute target due to unavailable capacity or quota: QuotaExceeded for {vm_size}")
+            raise AMLCapacityException(f"Could not create compute target '{name}' due to unavailable capacity or quota.")
+        with self.lock:
+            # Creating the same name again returns the existing compute target, like a PUT to the service
+            compute_target = self.compute_targets.get(name, None)
+            if compute_target is None:
+                self.creations += 1
+                compute_target = FakeComputeTarget(
+                    backend=self,
+                    name=name,
+                    resource=resource,
+                    ready_at=self.clock() + self.provisioning_seconds,
+                    final_state="Failed" if name in self.failures else "Succeeded"
+                )
+                self.compute_targets[name] = compute_target
+        if not wait:
+            return compute_target
+        wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=timeout_minutes,
+            initial_interval=self.poll_interval,
+            max_interval=self.poll_interval
+        )
+        check_provisioning_state(compute_target=compute_target)
+        return compute_target
+
+    def wait_for_provisioning(self, compute_target, timeout_minutes=60):
+        return wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=timeout_minutes,
+            initial_interval=self.poll_interval,
+            max_interval=self.poll_interval
+        )
+
+    def update_tags(self, compute_target, tags):
+        retry_policy.call(
+            function=lambda: self.call(description=f"tag update of '{compute_target.name}'"),
+            description=f"tag update of compute target '{compute_target.name}'"
+        )
+        compute_target.tags = {**compute_target.tags, **tags}
+        return True
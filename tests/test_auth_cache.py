@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import base64
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from auth_cache import find_workspace_config, get_token_expiry, load_cache, save_cache, invalidate_cache, is_authentication_failure
+
+pytest.importorskip("cryptography")
+
+azure_credentials = {
+    "clientId": "test",
+    "clientSecret": "test",
+    "subscriptionId": "test",
+    "tenantId": "test"
+}
+workspace_config = {
+    "subscription_id": "test",
+    "resource_group": "test",
+    "workspace_name": "test"
+}
+workspace_details = {
+    "subscription_id": "test",
+    "resource_group": "test",
+    "workspace_name": "test",
+    "location": "westeurope"
+}
+
+
+def create_token(expires_on):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expires_on}).encode("utf-8")).decode("utf-8").rstrip("=")
+    return f"header.{payload}.signature"
+
+
+@pytest.fixture(autouse=True)
+def runner_temp(tmp_path):
+    os.environ["RUNNER_TEMP"] = str(tmp_path)
+    yield tmp_path
+    del os.environ["RUNNER_TEMP"]
+
+
+def test_find_workspace_config_azureml_directory(tmp_path):
+    """
+    Unit test to check the find_workspace_config function with a config in the .azureml directory
+    """
+    os.makedirs(tmp_path / ".azureml")
+    (tmp_path / ".azureml" / "aml_arm_config.json").write_text(json.dumps(workspace_config))
+    assert find_workspace_config(path=str(tmp_path), file_name="aml_arm_config.json") == workspace_config
+    assert find_workspace_config(path=str(tmp_path), file_name="wrongfile.json") is None
+
+
+def test_get_token_expiry_invalid_token():
+    """
+    Unit test to check the get_token_expiry function with an invalid token
+    """
+    assert get_token_expiry(token=create_token(expires_on=1234)) == 1234
+    assert get_token_expiry(token="test") == 0
+
+
+def test_save_and_load_cache():
+    """
+    Unit test to check the save_cache and load_cache functions with a valid token
+    """
+    token = create_token(expires_on=int(time.time()) + 3600)
+    save_cache(azure_credentials=azure_credentials, workspace_config=workspace_config, token=token, workspace_details=workspace_details)
+    cache = load_cache(azure_credentials=azure_credentials, workspace_config=workspace_config)
+    assert cache["token"] == token
+    assert cache["workspace"] == workspace_details
+
+
+def test_load_cache_expired_token():
+    """
+    Unit test to check the load_cache function with an expired token
+    """
+    token = create_token(expires_on=int(time.time()) + 60)
+    save_cache(azure_credentials=azure_credentials, workspace_config=workspace_config, token=token, workspace_details=workspace_details)
+    assert load_cache(azure_credentials=azure_credentials, workspace_config=workspace_config) is None
+
+
+def test_load_cache_different_client_secret(runner_temp):
+    """
+    Unit test to check the load_cache function cannot decrypt a cache written with a different client secret
+    """
+    token = create_token(expires_on=int(time.time()) + 3600)
+    save_cache(azure_credentials=azure_credentials, workspace_config=workspace_config, token=token, workspace_details=workspace_details)
+    (cache_file_path,) = list((runner_temp / "aml-compute-cache").iterdir())
+    assert token.encode("utf-8") not in cache_file_path.read_bytes()
+    assert load_cache(azure_credentials={**azure_credentials, "clientSecret": "wrong"}, workspace_config=workspace_config) is None
+
+
+def test_invalidate_cache():
+    """
+    Unit test to check the invalidate_cache function removes the cache
+    """
+    token = create_token(expires_on=int(time.time()) + 3600)
+    save_cache(azure_credentials=azure_credentials, workspace_config=workspace_config, token=token, workspace_details=workspace_details)
+    invalidate_cache(azure_credentials=azure_credentials, workspace_config=workspace_config)
+    assert load_cache(azure_credentials=azure_credentials, workspace_config=workspace_config) is None
+
+
+def test_is_authentication_failure():
+    """
+    Unit test to check the is_authentication_failure function with authentication and other failures
+    """
+    assert is_authentication_failure(Exception("Response Code: 401"))
+    assert not is_authentication_failure(Exception("Response Code: 404"))
+    assert not is_authentication_failure(Exception("Compute target 'gpu401' failed with request id 9e401c2a (Response Code: 409)"))
+    assert is_authentication_failure(Exception("Code: ExpiredAuthenticationToken"))
+    try:
+        try:
+            raise Exception("Response Code: 401")
+        except Exception as exception:
+            raise Exception("Could not load compute target 'testname'.") from exception
+    except Exception as exception:
+        assert is_authentication_failure(exception)
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import pytest
+import threading
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+import main as action
+from fake_backend import FakeBackend
+from retry import retry_policy
+
+# Latency budgets of the action itself, excluding calls to Azure, which are simulated by the fake backend
+OVERHEAD_BUDGET_SECONDS = 0.25
+CONCURRENCY_BUDGET_SECONDS = {
+    1: 2.0,
+    10: 4.0,
+    100: 15.0
+}
+
+
+@pytest.fixture
+def action_environment(tmp_path, monkeypatch):
+    # Running the action in an empty repository with a parameters file and a fresh retry budget
+    os.makedirs(os.path.join(tmp_path, ".cloud", ".azure"))
+    with open(os.path.join(tmp_path, ".cloud", ".azure", "compute.json"), "w") as f:
+        json.dump({"name": "benchmark", "compute_type": "amlcluster", "max_nodes": 2}, f)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("INPUT_AZURE_CREDENTIALS", json.dumps({"clientId": "test", "clientSecret": "test", "subscriptionId": "test", "tenantId": "test"}))
+    monkeypatch.setenv("INPUT_PARAMETERS_FILE", "compute.json")
+    monkeypatch.setenv("GITHUB_OUTPUT", os.path.join(tmp_path, "github_output"))
+    monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+    monkeypatch.setattr(retry_policy, "retries", 0)
+    monkeypatch.setattr(retry_policy, "backoff_seconds", 0.0)
+    return tmp_path
+
+
+def use_backend(monkeypatch, backend):
+    # Replacing the backend of the action and recording when each invocation finished its local phases
+    backend_loaded = {}
+
+    def load_backend(azure_credentials, backend_type):
+        backend_loaded[threading.get_ident()] = time.perf_counter()
+        return backend, None
+
+    monkeypatch.setattr(action, "load_backend", load_backend)
+    return backend_loaded
+
+
+def run_invocations(invocations, backend_loaded):
+    # Starting all invocations at the same time and measuring the end-to-end latency of each
+    barrier = threading.Barrier(invocations)
+    results = [None] * invocations
+
+    def invoke(index):
+        barrier.wait()
+        start_time = time.perf_counter()
+        try:
+            action.main()
+            exception = None
+        except Exception as e:
+            exception = e
+        end_time = time.perf_counter()
+        results[index] = (start_time, backend_loaded.pop(threading.get_ident(), end_time), end_time, exception)
+
+    threads = [threading.Thread(target=invoke, args=(index,)) for index in range(invocations)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def test_benchmark_overhead(action_environment, monkeypatch):
+    """
+    Benchmark of the latency of the action itself and of its local phases before the backend is loaded
+    """
+    backend = FakeBackend()
+    backend_loaded = use_backend(monkeypatch=monkeypatch, backend=backend)
+    results = [run_invocations(invocations=1, backend_loaded=backend_loaded)[0] for _ in range(20)]
+    latencies = [end_time - start_time for start_time, _, end_time, _ in results]
+    local_latencies = [loaded_time - start_time for start_time, loaded_time, _, _ in results]
+    print(f"end-to-end p50 {percentile(latencies, 0.5):.4f}s p95 {percentile(latencies, 0.95):.4f}s, local phases p50 {percentile(local_latencies, 0.5):.4f}s")
+    assert all([exception is None for _, _, _, exception in results])
+    assert backend.creations == 1
+    assert percentile(latencies, 0.95) < OVERHEAD_BUDGET_SECONDS
+
+
+@pytest.mark.parametrize("invocations", [1, 10, 100])
+def test_benchmark_concurrency(action_environment, monkeypatch, invocations):
+    """
+    Benchmark of simultaneous invocations for the same compute target with provisioning latency, network latency and throttling
+    """
+    backend = FakeBackend(latency_seconds=0.005, provisioning_seconds=0.2, throttle_every=25, poll_interval=0.05)
+    backend_loaded = use_backend(monkeypatch=monkeypatch, backend=backend)
+    start_time = time.perf_counter()
+    results = run_invocations(invocations=invocations, backend_loaded=backend_loaded)
+    total_seconds = time.perf_counter() - start_time
+    latencies = [end_time - start_time for start_time, _, end_time, _ in results]
+    print(f"{invocations} invocation(s): total {total_seconds:.3f}s, p50 {percentile(latencies, 0.5):.3f}s, p95 {percentile(latencies, 0.95):.3f}s, {backend.calls} call(s), {backend.throttled} throttled")
+    assert all([exception is None for _, _, _, exception in results])
+    assert total_seconds < CONCURRENCY_BUDGET_SECONDS[invocations]
@@ -0,0 +1,209 @@
+import os
+import sys
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend, FakeHttpError
+from main import process_compute_target
+from retry import classify_exception
+from utils import AMLComputeException, AMLCapacityException, AMLProvisioningException
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fake_backend_provisioning_latency():
+    """
+    Unit test to check the FakeBackend keeps compute targets in state 'Creating' until the provisioning latency passed
+    """
+    clock = FakeClock()
+    backend = FakeBackend(provisioning_seconds=10, clock=clock)
+    compute_target = backend.create_compute_target(name="testname", parameters={}, wait=False)
+    assert compute_target.provisioning_state == "Creating"
+    clock.now = 10
+    compute_target.refresh_state()
+    assert compute_target.provisioning_state == "Succeeded"
+    assert backend.get_compute_target(name="testname") is compute_target
+
+
+def test_fake_backend_failures():
+    """
+    Unit test to check the FakeBackend fails provisioning of compute targets listed in failures
+    """
+    backend = FakeBackend(failures=["testname"])
+    with pytest.raises(AMLComputeException):
+        assert backend.create_compute_target(name="testname", parameters={})
+
+
+def test_fake_backend_throttling():
+    """
+    Unit test to check the FakeBackend throttles every n-th call deterministically
+    """
+    backend = FakeBackend(throttle_every=2)
+    backend.call(description="test")
+    with pytest.raises(FakeHttpError) as exception:
+        backend.call(description="test")
+    assert classify_exception(exception.value) == "throttled"
+    assert backend.throttled == 1
+
+
+def test_process_compute_target_with_fake_backend():
+    """
+    Unit test to check the process_compute_target function creates a compute target once and then takes the fingerprint fast path
+    """
+    backend = FakeBackend(throttle_every=3)
+    parameters = {"name": "testname", "compute_type": "amlcluster", "max_nodes": 2}
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.provisioning_state == "Succeeded"
+    assert process_compute_target(backend=backend, parameters=parameters) is compute_target
+    assert backend.creations == 1
+
+
+def test_process_compute_target_vm_candidates():
+    """
+    Unit test to check the process_compute_target function falls back to the next VM candidate if quota is exceeded
+    """
+    backend = FakeBackend(unavailable_vm_sizes=["Standard_NC6"])
+    parameters = {
+        "name": "testname",
+        "compute_type": "amlcluster",
+        "vm_candidates": [
+            {"vm_size": "Standard_NC6", "vm_priority": "lowpriority"},
+            {"vm_size": "Standard_DS3_v2"}
+        ]
+    }
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.serialize()["properties"]["properties"]["vmSize"] == "Standard_DS3_v2"
+    assert compute_target.serialize()["properties"]["properties"]["vmPriority"] == "Dedicated"
+
+
+def test_process_compute_target_fingerprint_after_fallback(monkeypatch, capsys):
+    """
+    Unit test to check compute targets created with the default name and a fallback VM candidate take the fingerprint fast path when loaded
+    """
+    monkeypatch.setenv("GITHUB_REPOSITORY", "owner/testrepository")
+    backend = FakeBackend(unavailable_vm_sizes=["Standard_NC6"])
+    parameters = {
+        "compute_type": "amlcluster",
+        "vm_candidates": [{"vm_size": "Standard_NC6"}, {"vm_size": "Standard_DS3_v2"}]
+    }
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.name == "testrepository"
+    capsys.readouterr()
+    assert process_compute_target(backend=backend, parameters=parameters) is compute_target
+    assert "with matching fingerprint" in capsys.readouterr().out
+
+
+def test_process_compute_target_no_vm_candidate_available():
+    """
+    Unit test to check the process_compute_target function fails if none of the VM candidates is available
+    """
+    backend = FakeBackend(unavailable_vm_sizes=["Standard_NC6", "Standard_NC12"])
+    parameters = {
+        "name": "testname",
+        "compute_type": "amlcluster",
+        "vm_candidates": [{"vm_size": "Standard_NC6"}, {"vm_size": "Standard_NC12"}]
+    }
+    with pytest.raises(AMLCapacityException):
+        assert process_compute_target(backend=backend, parameters=parameters)
+
+
+def test_process_compute_target_attach_aks_cluster():
+    """
+    Unit test to check the process_compute_target function attaches an existing AKS cluster if a resource id is provided
+    """
+    backend = FakeBackend()
+    resource_id = "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/testcluster"
+    parameters = {
+        "name": "testname",
+        "compute_type": "akscluster",
+        "resource_id": resource_id,
+        "load_balancer_type": "InternalLoadBalancer",
+        "load_balancer_subnet": "testsubnet"
+    }
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.type == "AKS"
+    assert "Attached" in compute_target.tags
+    assert "Created" not in compute_target.tags
+    assert compute_target.serialize()["properties"]["resourceId"] == resource_id
+    assert compute_target.serialize()["properties"]["properties"]["loadBalancerSubnet"] == "testsubnet"
+    assert process_compute_target(backend=backend, parameters=parameters) is compute_target
+    assert backend.creations == 1
+
+
+def test_process_compute_target_awaits_creating_target():
+    """
+    Unit test to check the process_compute_target function waits for compute targets that another run is still creating
+    """
+    backend = FakeBackend(provisioning_seconds=0.1)
+    parameters = {"name": "testname", "compute_type": "amlcluster"}
+    backend.create_compute_target(name="testname", parameters=parameters, wait=False)
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.provisioning_state == "Succeeded"
+    assert backend.creations == 1
+
+
+def test_process_compute_target_recovers_failed_target():
+    """
+    Unit test to check the process_compute_target function deletes and recreates failed compute targets if recovery is enabled
+    """
+    failures = ["testname"]
+    backend = FakeBackend(failures=failures)
+    parameters = {"name": "testname", "compute_type": "amlcluster"}
+    backend.create_compute_target(name="testname", parameters=parameters, wait=False)
+    with pytest.raises(AMLProvisioningException):
+        assert process_compute_target(backend=backend, parameters=parameters)
+    failures.clear()
+    compute_target = process_compute_target(backend=backend, parameters=parameters, recover_failed_attempts=1)
+    assert compute_target.provisioning_state == "Succeeded"
+    assert backend.creations == 2
+
+
+def test_process_compute_target_recovery_attempts_exhausted():
+    """
+    Unit test to check the process_compute_target function gives up after the configured number of recovery attempts
+    """
+    backend = FakeBackend(failures=["testname"])
+    parameters = {"name": "testname", "compute_type": "amlcluster"}
+    with pytest.raises(AMLProvisioningException):
+        assert process_compute_target(backend=backend, parameters=parameters, recover_failed_attempts=2)
+    assert backend.creations == 3
+
+
+def test_process_compute_target_does_not_recover_foreign_target():
+    """
+    Unit test to check the process_compute_target function does not delete failed compute targets that were not created by the action
+    """
+    backend = FakeBackend(failures=["testname"])
+    parameters = {"name": "testname", "compute_type": "amlcluster"}
+    compute_target = backend.create_compute_target(name="testname", parameters=parameters, wait=False)
+    compute_target.tags = {}
+    with pytest.raises(AMLProvisioningException):
+        assert process_compute_target(backend=backend, parameters=parameters, recover_failed_attempts=1)
+    assert backend.creations == 1
+
+
+def test_process_compute_target_recovers_attached_target():
+    """
+    Unit test to check the process_compute_target function detaches instead of deletes failed attached AKS clusters if recovery is enabled
+    """
+    failures = ["testname"]
+    backend = FakeBackend(failures=failures)
+    parameters = {
+        "name": "testname",
+        "compute_type": "akscluster",
+        "resource_id": "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/testcluster"
+    }
+    backend.create_compute_target(name="testname", parameters=parameters, wait=False)
+    failures.clear()
+    compute_target = process_compute_target(backend=backend, parameters=parameters, recover_failed_attempts=1)
+    assert compute_target.provisioning_state == "Succeeded"
+    assert backend.detachments == ["testname"]
+    assert backend.deletions == []
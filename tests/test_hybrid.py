@@ -0,0 +1,71 @@
+import os
+import sys
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from hybrid import HYBRID_TAG, get_hybrid_member_names, get_member_definitions, link_hybrid_member, recommend_target, route_hybrid_pairs
+from main import process_compute_target
+from reconcile import get_live_parameters
+
+
+def get_state(name, idle_nodes=0, free_nodes=0, preemption_rate=0.0):
+    return {"name": name, "idle_nodes": idle_nodes, "free_nodes": free_nodes, "preempted_nodes": 0, "preemption_rate": preemption_rate}
+
+
+def test_get_hybrid_member_names():
+    """
+    Unit test to check the get_hybrid_member_names function keeps member names within 16 characters
+    """
+    assert get_hybrid_member_names(name="gpu") == {"dedicated": "gpu-d", "lowpriority": "gpu-l"}
+    assert get_hybrid_member_names(name="averylongcluster") == {"dedicated": "averylongclust-d", "lowpriority": "averylongclust-l"}
+
+
+def test_get_member_definitions():
+    """
+    Unit test to check the get_member_definitions function applies the sizing rules of hybrid pairs
+    """
+    definition = {"name": "gpu", "compute_type": "amlcluster", "vm_size": "Standard_NC6", "max_nodes": 10, "hybrid": {"dedicated_min_nodes": 2}}
+    (dedicated, pair), (lowpriority, _) = get_member_definitions(definition=definition, default_name="default")
+    assert pair == {"name": "gpu", "max_preemption_rate": 0.2}
+    assert dedicated == {"name": "gpu-d", "compute_type": "amlcluster", "vm_size": "Standard_NC6", "vm_priority": "dedicated", "min_nodes": 2, "max_nodes": 2}
+    assert lowpriority == {"name": "gpu-l", "compute_type": "amlcluster", "vm_size": "Standard_NC6", "vm_priority": "lowpriority", "min_nodes": 0, "max_nodes": 10}
+    assert get_member_definitions(definition={"name": "cpu"}, default_name="default") == [({"name": "cpu"}, None)]
+
+
+def test_recommend_target():
+    """
+    Unit test to check the recommend_target function prefers low priority nodes unless they are preempted or busy
+    """
+    dedicated = get_state(name="gpu-d", idle_nodes=1, free_nodes=1)
+    assert recommend_target(dedicated=dedicated, lowpriority=get_state(name="gpu-l", idle_nodes=2, free_nodes=4), max_preemption_rate=0.2)[0]["name"] == "gpu-l"
+    assert recommend_target(dedicated=dedicated, lowpriority=get_state(name="gpu-l", idle_nodes=2, free_nodes=4, preemption_rate=0.5), max_preemption_rate=0.2)[0]["name"] == "gpu-d"
+    assert recommend_target(dedicated=dedicated, lowpriority=get_state(name="gpu-l", free_nodes=4), max_preemption_rate=0.2)[0]["name"] == "gpu-d"
+    assert recommend_target(dedicated=get_state(name="gpu-d"), lowpriority=get_state(name="gpu-l", free_nodes=4), max_preemption_rate=0.2)[0]["name"] == "gpu-l"
+    assert recommend_target(dedicated=get_state(name="gpu-d"), lowpriority=get_state(name="gpu-l"), max_preemption_rate=0.2)[0]["name"] == "gpu-l"
+
+
+def test_hybrid_pair_with_fake_backend():
+    """
+    Unit test to check hybrid pairs are provisioned as linked members and routed to the member with idle nodes
+    """
+    backend = FakeBackend()
+    definition = {"name": "gpu", "compute_type": "amlcluster", "max_nodes": 4, "hybrid": {"dedicated_min_nodes": 1, "max_preemption_rate": 0.1}}
+    members = []
+    for member, pair in get_member_definitions(definition=definition, default_name="default"):
+        compute_target = process_compute_target(backend=backend, parameters=member)
+        link_hybrid_member(backend=backend, compute_target=compute_target, pair=pair)
+        members.append((None, pair, member["vm_priority"], compute_target))
+    assert [compute_target.tags[HYBRID_TAG] for _, _, _, compute_target in members] == ["gpu", "gpu"]
+    assert get_live_parameters(live_state=backend.compute_targets["gpu-d"].serialize())["vm_priority"] == "Dedicated"
+    assert get_live_parameters(live_state=backend.compute_targets["gpu-l"].serialize())["vm_priority"] == "LowPriority"
+
+    routes = route_hybrid_pairs(members=members)
+    assert len(routes) == 1
+    assert routes[0]["target"] == "gpu-d"
+    assert routes[0]["dedicated"]["idle_nodes"] == 1
+    assert routes[0]["lowpriority"]["free_nodes"] == 4
+
+    routes = route_hybrid_pairs(members=members[1:])
+    assert routes[0]["target"] == "gpu-l"
@@ -0,0 +1,88 @@
+import os
+import sys
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from inventory import Inventory, InventoryBackend
+from main import process_compute_target
+from utils import run_in_parallel
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_inventory_index():
+    """
+    Unit test to check the Inventory indexes compute targets by name with a single listing
+    """
+    backend = FakeBackend()
+    backend.create_compute_target(name="cluster", parameters={"compute_type": "amlcluster"})
+    aks = backend.create_compute_target(name="aks", parameters={"compute_type": "akscluster"})
+    backend.update_tags(compute_target=aks, tags={"Attached": "true"})
+    calls = backend.calls
+    inventory = Inventory(backend=backend)
+    assert inventory.contains(name="cluster")
+    assert not inventory.contains(name="missing")
+    assert inventory.get(name="aks")["type"] == "AKS"
+    assert inventory.get(name="aks")["tags"]["Attached"] == "true"
+    assert backend.calls == calls + 1
+
+
+def test_inventory_cache(tmp_path):
+    """
+    Unit test to check the Inventory reuses the listing cached on disk until the ttl passed
+    """
+    clock = FakeClock()
+    backend = FakeBackend()
+    backend.create_compute_target(name="cluster", parameters={})
+    cache_file_path = str(tmp_path / "inventory.json")
+    Inventory(backend=backend, ttl_seconds=60, cache_file_path=cache_file_path, clock=clock).load()
+    calls = backend.calls
+    assert Inventory(backend=backend, ttl_seconds=60, cache_file_path=cache_file_path, clock=clock).contains(name="cluster")
+    assert backend.calls == calls
+    clock.now = 61
+    assert Inventory(backend=backend, ttl_seconds=60, cache_file_path=cache_file_path, clock=clock).contains(name="cluster")
+    assert backend.calls == calls + 1
+
+
+def test_inventory_backend_bulk_lookups():
+    """
+    Unit test to check the InventoryBackend processes many compute targets with one listing instead of one lookup per name
+    """
+    backend = FakeBackend()
+    names = [f"cluster-{index}" for index in range(10)]
+    for name in names[:5]:
+        backend.create_compute_target(name=name, parameters={"compute_type": "amlcluster"})
+    lookups = []
+    get_compute_target = backend.get_compute_target
+    backend.get_compute_target = lambda name: lookups.append(name) or get_compute_target(name=name)
+    inventory_backend = InventoryBackend(backend=backend, inventory=Inventory(backend=backend))
+    results = run_in_parallel(
+        function=lambda name: process_compute_target(backend=inventory_backend, parameters={"name": name, "compute_type": "amlcluster"}),
+        items=names,
+        max_workers=4
+    )
+    assert all([exception is None for _, exception in results])
+    assert lookups == []
+    assert backend.creations == 10
+    assert all([inventory_backend.inventory.contains(name=name) for name in names])
+
+
+def test_inventory_backend_later_lookups_see_changes():
+    """
+    Unit test to check the InventoryBackend looks up names again after the first lookup, e.g. to see deletions
+    """
+    backend = FakeBackend()
+    backend.create_compute_target(name="cluster", parameters={})
+    inventory_backend = InventoryBackend(backend=backend, inventory=Inventory(backend=backend))
+    compute_target = inventory_backend.get_compute_target(name="cluster")
+    compute_target.delete()
+    assert inventory_backend.get_compute_target(name="cluster") is None
+    assert not inventory_backend.inventory.contains(name="cluster")
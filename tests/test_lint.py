@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from lint import ACTION_ERROR_RULES, check_compute_definition, lint_parameters, lint_workspaces, lint_files, report_findings, main
+from schemas import parameters_schema
+from utils import AMLConfigurationException, get_validator
+
+
+def get_rules(findings):
+    return sorted([entry["rule"] for entry in findings])
+
+
+def test_get_validator_cached():
+    """
+    Unit test to check the get_validator function compiles every schema once
+    """
+    assert get_validator(schema=parameters_schema) is get_validator(schema=parameters_schema)
+
+
+def test_lint_parameters_anchored_patterns():
+    """
+    Unit test to check the patterns of the parameters schema only match complete values
+    """
+    assert get_rules(lint_parameters(parameters={"name": "cluster", "compute_type": "xamlclusterx"})) == ["schema"]
+    assert get_rules(lint_parameters(parameters={"name": "cluster", "vm_priority": "lowpriority1"})) == ["schema"]
+    assert lint_parameters(parameters={"name": "cluster", "compute_type": "amlcluster", "vm_priority": "lowpriority"}) == []
+
+
+def test_lint_parameters_schema_errors_point_to_field():
+    """
+    Unit test to check schema errors of single and listed compute targets point to the invalid field
+    """
+    findings = lint_parameters(parameters={"name": "cluster", "max_nodes": 0})
+    assert [entry["path"] for entry in findings] == ["/max_nodes"]
+    assert "is less than the minimum of 1" in findings[0]["message"]
+    findings = lint_parameters(parameters=[{"name": "cluster"}, {"name": "cluster2", "vm_priority": "spot"}])
+    assert [entry["path"] for entry in findings] == ["/1/vm_priority"]
+
+
+def test_check_compute_definition_rules():
+    """
+    Unit test to check the check_compute_definition function finds violations of rules across parameters
+    """
+    assert get_rules(check_compute_definition(definition={"name": "cluster", "min_nodes": 3, "max_nodes": 2})) == ["min-max-nodes"]
+    assert get_rules(check_compute_definition(definition={"name": "cluster", "vnet_name": "vnet"})) == ["vnet-group"]
+    assert get_rules(check_compute_definition(definition={"name": "cluster", "compute_type": "akscluster", "ssl_cname": "test", "load_balancer_subnet": "subnet"})) == ["load-balancer-subnet", "ssl-group"]
+    assert get_rules(check_compute_definition(definition={"name": "cluster", "identity_type": "UserAssigned"})) == ["user-assigned-identity"]
+    assert get_rules(check_compute_definition(definition={"name": "-cluster"})) == ["compute-name"]
+    assert get_rules(check_compute_definition(definition={"name": "cluster", "vm_size": "Standard_NC6", "vm_candidates": [{"vm_size": "Standard_NC6"}], "agent_count": 1, "max_node": 2})) == ["ignored-key", "ignored-key", "unknown-key"]
+    assert check_compute_definition(definition={"name": "cluster", "compute_type": "akscluster", "vm_candidates": [{"vm_size": "Standard_D3_v2"}]}) == []
+    assert get_rules(check_compute_definition(definition={"name": "cluster", "compute_type": "akscluster", "resource_id": "test", "vm_candidates": [{"vm_size": "Standard_D3_v2"}]})) == ["ignored-key"]
+
+
+def test_check_compute_definition_hybrid():
+    """
+    Unit test to check the check_compute_definition function checks the sizing rules and names of hybrid pairs
+    """
+    assert check_compute_definition(definition={"name": "gpu", "hybrid": {"dedicated_min_nodes": 2}}) == []
+    assert get_rules(check_compute_definition(definition={"name": "gpu", "vm_priority": "lowpriority", "hybrid": {"dedicated_min_nodes": 2, "dedicated_max_nodes": 1}})) == ["hybrid-priority", "min-max-nodes"]
+    assert get_rules(check_compute_definition(definition={"name": "gpu", "compute_type": "akscluster", "hybrid": {}})) == ["hybrid-compute-type"]
+    assert get_rules(lint_parameters(parameters=[{"name": "gpu", "hybrid": {}}, {"name": "gpu-l"}])) == ["unique-name", "unique-name"]
+
+
+def test_check_compute_definition_default_name(monkeypatch):
+    """
+    Unit test to check the check_compute_definition function checks the default name derived from GITHUB_REPOSITORY
+    """
+    monkeypatch.setenv("GITHUB_REPOSITORY", "owner/my.repository")
+    assert get_rules(check_compute_definition(definition={})) == ["compute-name"]
+    monkeypatch.setenv("GITHUB_REPOSITORY", "owner/averyverylongrepositoryname")
+    assert check_compute_definition(definition={}) == []
+    assert check_compute_definition(definition={"compute_type": "akscluster"}) == []
+
+
+def test_lint_workspaces_overrides():
+    """
+    Unit test to check the lint_workspaces function reports findings caused by the overrides of a workspace
+    """
+    workspaces = [
+        {"resource_group": "rg", "workspace_name": "ws1"},
+        {"resource_group": "rg", "workspace_name": "ws2", "overrides": {"min_nodes": 8, "vm_priority": "spot"}}
+    ]
+    findings = lint_workspaces(workspaces=workspaces, compute_definitions=[{"name": "cluster", "max_nodes": 4}])
+    assert get_rules(findings) == ["min-max-nodes", "schema"]
+    assert all([entry["path"] == "/1/overrides" for entry in findings])
+
+
+def test_report_findings():
+    """
+    Unit test to check the report_findings function only fails on errors
+    """
+    report_findings(findings=check_compute_definition(definition={"name": "cluster", "max_node": 2}), input_name="PARAMETERS_FILE")
+    with pytest.raises(AMLConfigurationException):
+        assert report_findings(findings=check_compute_definition(definition={"name": "cluster", "min_nodes": 3, "max_nodes": 2}), input_name="PARAMETERS_FILE")
+
+
+def test_report_findings_error_rules(capsys):
+    """
+    Unit test to check the report_findings function reports errors of rules other than error_rules as warnings
+    """
+    report_findings(findings=check_compute_definition(definition={"name": "cluster", "min_nodes": 3, "max_nodes": 2}), input_name="PARAMETERS_FILE", error_rules=ACTION_ERROR_RULES)
+    assert "::warning::PARAMETERS_FILE /min_nodes" in capsys.readouterr().out
+    with pytest.raises(AMLConfigurationException):
+        assert report_findings(findings=check_compute_definition(definition={"name": "gpu", "compute_type": "akscluster", "hybrid": {}}), input_name="PARAMETERS_FILE", error_rules=ACTION_ERROR_RULES)
+
+
+def test_lint_files(tmp_path, capsys):
+    """
+    Unit test to check the lint entry point checks all compute and workspaces files in one pass and skips files of other actions
+    """
+    files = {
+        "compute.json": [{"name": "cpu", "max_nodes": 2}, {"name": "cpu", "min_nodes": 5}],
+        "workspaces.json": [{"resource_group": "rg", "workspace_name": "ws", "overrides": {"max_nodes": 1}}],
+        "workspace.json": {"name": "ws", "resource_group": "rg", "create_workspace": True}
+    }
+    for name, data in files.items():
+        (tmp_path / name).write_text(json.dumps(data))
+    (tmp_path / "broken.json").write_text("{")
+    paths = sorted([str(path) for path in tmp_path.iterdir()])
+    results = {os.path.basename(result["file"]): result for result in lint_files(paths=paths, parameters_file=str(tmp_path / "compute.json"))}
+    assert get_rules(results["compute.json"]["findings"]) == ["min-max-nodes", "unique-name", "unique-name"]
+    assert get_rules(results["workspaces.json"]["findings"]) == ["min-max-nodes"]
+    assert results["workspace.json"]["kind"] is None and results["workspace.json"]["findings"] == []
+    assert get_rules(results["broken.json"]["findings"]) == ["json"]
+
+    assert main(paths + ["--parameters-file", str(tmp_path / "compute.json"), "--format", "json"]) == 1
+    assert len(json.loads(capsys.readouterr().out)) == 4
+
+
+def test_lint_files_fast(tmp_path):
+    """
+    Unit test to check the lint entry point is fast enough for pre-commit hooks
+    """
+    paths = []
+    for index in range(200):
+        path = tmp_path / f"compute{index}.json"
+        path.write_text(json.dumps([{"name": f"cluster{index}-{item}", "compute_type": "amlcluster", "min_nodes": 0, "max_nodes": 4} for item in range(5)]))
+        paths.append(str(path))
+    start = time.monotonic()
+    results = lint_files(paths=paths)
+    assert time.monotonic() - start < 2
+    assert all([result["findings"] == [] for result in results])
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import pytest
+import threading
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from locks import FileCreationLock, run_exclusively
+from utils import AMLComputeException, run_in_parallel
+
+
+def test_file_creation_lock_acquire_and_release(tmp_path):
+    """
+    Unit test to check the FileCreationLock can only be acquired once until it is released
+    """
+    lock = FileCreationLock(directory=str(tmp_path))
+    assert lock.acquire(name="testname")
+    assert not lock.acquire(name="testname")
+    lock.release(name="testname")
+    assert lock.acquire(name="testname")
+
+
+def test_file_creation_lock_expired_lease(tmp_path):
+    """
+    Unit test to check the FileCreationLock can be acquired after the lease of the owner expired
+    """
+    lock = FileCreationLock(directory=str(tmp_path), lease_seconds=0.1)
+    assert lock.acquire(name="testname")
+    time.sleep(0.2)
+    assert lock.acquire(name="testname")
+
+
+def test_file_creation_lock_expired_lease_single_owner(tmp_path, monkeypatch):
+    """
+    Unit test to check exactly one of many concurrent runs acquires a FileCreationLock whose lease expired
+    """
+    lock = FileCreationLock(directory=str(tmp_path), lease_seconds=60)
+    current_time = time.time
+    for attempt in range(20):
+        assert lock.acquire(name="testname")
+        stale_time = current_time() - 120
+        os.utime(lock.get_lock_file_path(name="testname"), (stale_time, stale_time))
+
+        # Letting all runs find the lock stale before any of them breaks it
+        barrier = threading.Barrier(8, timeout=5)
+        checked = threading.local()
+
+        def synchronized_time():
+            if not getattr(checked, "value", False):
+                checked.value = True
+                barrier.wait()
+            return current_time()
+
+        with monkeypatch.context() as context:
+            context.setattr(time, "time", synchronized_time)
+            results = run_in_parallel(
+                function=lambda index: lock.acquire(name="testname"),
+                items=list(range(8)),
+                max_workers=8
+            )
+        assert [result for result, _ in results].count(True) == 1
+        assert os.listdir(tmp_path) == ["testname.lock"]
+        lock.release(name="testname")
+
+
+def test_run_exclusively_single_creator(tmp_path):
+    """
+    Unit test to check the run_exclusively function lets exactly one of many concurrent runs create the compute target
+    """
+    lock = FileCreationLock(directory=str(tmp_path))
+    created = []
+
+    def find():
+        return "found" if len(created) > 0 else None
+
+    def create():
+        # The owner of the lock checks again, because the compute target may have been created by a previous owner
+        if find() is not None:
+            return find()
+        time.sleep(0.1)
+        created.append("testname")
+        return "created"
+
+    def run(_):
+        return run_exclusively(
+            lock=lock,
+            name="testname",
+            function=create,
+            wait_for_other=find,
+            initial_interval=0.01,
+            max_interval=0.02
+        )
+
+    results = run_in_parallel(function=run, items=list(range(20)), max_workers=20)
+    assert len(created) == 1
+    assert sorted([result for result, _ in results]).count("created") == 1
+    assert [exception for _, exception in results] == [None] * 20
+
+
+def test_run_exclusively_timeout(tmp_path):
+    """
+    Unit test to check the run_exclusively function with a lock that is never released
+    """
+    lock = FileCreationLock(directory=str(tmp_path))
+    lock.acquire(name="testname")
+    with pytest.raises(AMLComputeException):
+        assert run_exclusively(
+            lock=lock,
+            name="testname",
+            function=lambda: "created",
+            wait_for_other=lambda: None,
+            timeout_minutes=0.001,
+            initial_interval=0.01,
+            max_interval=0.02
+        )
@@ -1,6 +1,7 @@
 import os
 import sys
 import pytest
+import subprocess
 
 myPath = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(myPath, "..", "code"))
@@ -8,6 +9,8 @@
 from main import main
 from utils import AMLConfigurationException
 
+IMPORT_TIME_BUDGET_SECONDS = 0.5
+
 
 def test_main_no_input():
     """
@@ -33,3 +36,80 @@ def test_main_invalid_parameters_file():
     os.environ["INPUT_PARAMETERS_FILE"] = "wrongfile.json"
     with pytest.raises(AMLConfigurationException):
         assert main()
+
+
+def test_main_invalid_mode():
+    os.environ["INPUT_AZURE_CREDENTIALS"] = """{
+        "clientId": "test",
+        "clientSecret": "test",
+        "subscriptionId": "test",
+        "tenantId": "test"
+    }"""
+    os.environ["INPUT_PARAMETERS_FILE"] = "wrongfile.json"
+    os.environ["INPUT_MODE"] = "wrongmode"
+    with pytest.raises(AMLConfigurationException):
+        assert main()
+    del os.environ["INPUT_MODE"]
+
+
+def test_main_rest_backend_with_blob_lock():
+    os.environ["INPUT_AZURE_CREDENTIALS"] = """{
+        "clientId": "test",
+        "clientSecret": "test",
+        "subscriptionId": "test",
+        "tenantId": "test"
+    }"""
+    os.environ["INPUT_PARAMETERS_FILE"] = "wrongfile.json"
+    os.environ["INPUT_BACKEND"] = "rest"
+    os.environ["INPUT_CREATION_LOCK"] = "blob"
+    with pytest.raises(AMLConfigurationException):
+        assert main()
+    del os.environ["INPUT_BACKEND"]
+    del os.environ["INPUT_CREATION_LOCK"]
+
+
+def test_main_missing_workspaces_file():
+    os.environ["INPUT_AZURE_CREDENTIALS"] = """{
+        "clientId": "test",
+        "clientSecret": "test",
+        "subscriptionId": "test",
+        "tenantId": "test"
+    }"""
+    os.environ["INPUT_PARAMETERS_FILE"] = "wrongfile.json"
+    os.environ["INPUT_WORKSPACES_FILE"] = "wrongfile.json"
+    with pytest.raises(AMLConfigurationException):
+        assert main()
+    del os.environ["INPUT_WORKSPACES_FILE"]
+
+
+def test_main_import_time_budget():
+    """
+    Unit test to check that importing main stays within the import time budget and does not load the Azure ML SDK
+    """
+    code = "import sys, time; start = time.perf_counter(); import main; print(time.perf_counter() - start); print(any(module.split('.')[0] in ['azureml', 'adal', 'msrest'] for module in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.join(myPath, "..", "code"),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    import_time, sdk_imported = result.stdout.split()
+    assert float(import_time) < IMPORT_TIME_BUDGET_SECONDS
+    assert sdk_imported == "False"
+
+
+def test_main_invalid_parameters_before_sdk_import():
+    """
+    Unit test to check that invalid parameters fail before the Azure ML SDK is loaded
+    """
+    code = "import sys, main\ntry:\n    main.main()\nexcept main.AMLConfigurationException:\n    print(any(module.split('.')[0] in ['azureml', 'adal', 'msrest'] for module in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.join(myPath, "..", "code"),
+        env={**os.environ, "INPUT_AZURE_CREDENTIALS": "{}"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    assert result.stdout.strip().split("\n")[-1] == "False"
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from metrics import sample_live_state, collect_samples, summarize_samples, to_prometheus, write_metrics
+
+fixture_path = os.path.join(myPath, "fixtures", "metrics_status.json")
+
+
+class RecordedComputeTarget():
+    # Compute target replaying recorded states, one per refresh
+    def __init__(self, recording):
+        self.name = "gpu"
+        self.recording = recording
+        self.index = -1
+
+    def refresh_state(self):
+        self.index = min(self.index + 1, len(self.recording) - 1)
+
+    def serialize(self):
+        return self.recording[self.index]["state"]
+
+    def clock(self):
+        return self.recording[max(self.index, 0)]["timestamp"]
+
+
+def load_recorded_samples():
+    with open(fixture_path) as f:
+        recording = json.load(f)
+    return [sample_live_state(live_state=entry["state"], timestamp=entry["timestamp"]) for entry in recording]
+
+
+def test_sample_live_state():
+    """
+    Unit test to check the sample_live_state function extracts allocation and node state counts
+    """
+    sample = load_recorded_samples()[2]
+    assert sample["allocation_state"] == "Resizing"
+    assert sample["current_nodes"] == 4
+    assert sample["max_nodes"] == 4
+    assert sample["at_max_nodes"]
+    assert sample["nodes"]["running"] == 2 and sample["nodes"]["preparing"] == 2
+
+
+def test_summarize_samples():
+    """
+    Unit test to check the summarize_samples function derives scale-up latency, preemptions and time at max_nodes from recorded states
+    """
+    summary = summarize_samples(samples=load_recorded_samples())
+    assert summary["scale_up_latencies_seconds"] == [60]
+    assert summary["pending_scale_up_seconds"] is None
+    assert summary["preemptions"] == 1
+    assert summary["seconds_at_max_nodes"] == 120
+    assert summary["node_hours"]["preparing"] == round(6 * 30 / 3600, 4)
+
+
+def test_collect_samples_from_recording():
+    """
+    Unit test to check the collect_samples function samples until the duration passed
+    """
+    with open(fixture_path) as f:
+        compute_target = RecordedComputeTarget(recording=json.load(f))
+    sleeps = []
+    samples = collect_samples(
+        compute_target=compute_target,
+        interval_seconds=30,
+        duration_seconds=150,
+        clock=compute_target.clock,
+        sleep=sleeps.append
+    )
+    assert [sample["timestamp"] for sample in samples] == [1600000000 + 30 * index for index in range(6)]
+    assert sleeps == [30] * 5
+
+
+def test_collect_samples_with_fake_backend():
+    """
+    Unit test to check the collect_samples function observes the scale-up of a fake compute target
+    """
+    backend = FakeBackend(node_allocation_seconds=0.05)
+    compute_target = backend.create_compute_target(name="testname", parameters={"max_nodes": 2})
+    compute_target.update(min_nodes=2)
+    summary = summarize_samples(samples=collect_samples(compute_target=compute_target, interval_seconds=0.01, duration_seconds=0.2))
+    assert len(summary["scale_up_latencies_seconds"]) == 1
+    assert summary["seconds_at_max_nodes"] > 0
+
+
+def test_write_metrics(tmp_path):
+    """
+    Unit test to check the write_metrics function writes Prometheus text format and JSON time series
+    """
+    samples = load_recorded_samples()
+    summary = summarize_samples(samples=samples)
+    prometheus = to_prometheus(name="gpu", samples=samples, summary=summary)
+    assert "# TYPE aml_compute_nodes gauge" in prometheus
+    assert 'aml_compute_nodes{compute="gpu",state="running"} 2 1600000060000' in prometheus
+    assert 'aml_compute_preemptions_total{compute="gpu"} 1' in prometheus
+    assert 'aml_compute_at_max_nodes{compute="gpu"} 1 1600000030000' in prometheus
+    write_metrics(metrics_directory=str(tmp_path), name="gpu", samples=samples, summary=summary)
+    with open(tmp_path / "gpu.json") as f:
+        assert json.load(f)["summary"] == summary
+    assert (tmp_path / "gpu.prom").read_text() == prometheus
@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from outputs import get_compute_details, write_compute_outputs
+
+
+def test_get_compute_details_aml_cluster():
+    """
+    Unit test to check the get_compute_details function extracts the details of an AML cluster
+    """
+    backend = FakeBackend()
+    compute_target = backend.create_compute_target(name="testname", parameters={"vm_priority": "lowpriority", "min_nodes": 1, "max_nodes": 2})
+    details = get_compute_details(compute_target=compute_target)
+    assert details["name"] == "testname"
+    assert details["compute_type"] == "AmlCompute"
+    assert details["vm_size"] == "Standard_DS3_v2"
+    assert details["vm_priority"] == "LowPriority"
+    assert (details["min_nodes"], details["max_nodes"]) == (1, 2)
+    assert details["provisioning_state"] == "Succeeded"
+
+
+def test_get_compute_details_aks_cluster():
+    """
+    Unit test to check the get_compute_details function reports the agent count of an AKS cluster as max_nodes
+    """
+    backend = FakeBackend()
+    compute_target = backend.create_compute_target(name="testname", parameters={"compute_type": "akscluster", "agent_count": 3})
+    details = get_compute_details(compute_target=compute_target)
+    assert details["compute_type"] == "AKS"
+    assert details["max_nodes"] == 3
+    assert details["min_nodes"] is None
+
+
+def test_write_compute_outputs(tmp_path, monkeypatch):
+    """
+    Unit test to check the write_compute_outputs function writes outputs and a handle file for a single compute target
+    """
+    github_output = os.path.join(tmp_path, "github_output")
+    handle_file = os.path.join(tmp_path, "handle", "compute.json")
+    monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+    monkeypatch.setenv("INPUT_HANDLE_FILE", handle_file)
+    backend = FakeBackend()
+    compute_target = backend.create_compute_target(name="testname", parameters={"max_nodes": 2})
+    write_compute_outputs(compute_targets=[compute_target], single_target=True)
+    with open(github_output) as f:
+        outputs = dict([line.rstrip("\n").split("=", 1) for line in f])
+    assert outputs["compute_name"] == "testname"
+    assert outputs["max_nodes"] == "2"
+    assert outputs["handle_file"] == handle_file
+    assert json.loads(outputs["compute_targets"])[0]["name"] == "testname"
+    with open(handle_file) as f:
+        handle = json.load(f)
+    assert handle["compute_targets"][0]["serialized"]["name"] == "testname"
+
+
+def test_write_compute_outputs_list(tmp_path, monkeypatch):
+    """
+    Unit test to check the write_compute_outputs function only writes the list output for several compute targets
+    """
+    github_output = os.path.join(tmp_path, "github_output")
+    monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+    monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+    backend = FakeBackend()
+    compute_targets = [backend.create_compute_target(name=name, parameters={}) for name in ["test1", "test2"]]
+    write_compute_outputs(compute_targets=compute_targets, single_target=False)
+    with open(github_output) as f:
+        outputs = dict([line.rstrip("\n").split("=", 1) for line in f])
+    assert "compute_name" not in outputs
+    assert len(json.loads(outputs["compute_targets"])) == 2
+    assert os.path.isfile(os.path.join(tmp_path, "aml-compute", "compute_targets.json"))
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from locks import FileCreationLock
+from pool import POOL_TAG, LEASE_TAG, LEASE_EXPIRY_TAG, get_pool_member_names, get_lease, lease_pool_member, release_pool_members
+from utils import AMLComputeException
+
+
+def create_member(backend):
+    return lambda name, wait, tags: backend.create_compute_target(name=name, parameters={"max_nodes": 2}, wait=wait, tags=tags)
+
+
+def test_get_pool_member_names():
+    """
+    Unit test to check the get_pool_member_names function keeps member names within 16 characters
+    """
+    assert get_pool_member_names(name="pool", pool_size=2) == ["pool-0", "pool-1"]
+    assert all([len(name) <= 16 for name in get_pool_member_names(name="averyverylongpoolname", pool_size=12)])
+
+
+def test_get_lease():
+    """
+    Unit test to check the get_lease function ignores free members and expired leases
+    """
+    backend = FakeBackend()
+    compute_target = backend.create_compute_target(name="pool-0", parameters={})
+    assert get_lease(compute_target=compute_target) is None
+    compute_target.tags = {LEASE_TAG: "run", LEASE_EXPIRY_TAG: str(time.time() + 60)}
+    assert get_lease(compute_target=compute_target) == "run"
+    compute_target.tags = {LEASE_TAG: "run", LEASE_EXPIRY_TAG: str(time.time() - 60)}
+    assert get_lease(compute_target=compute_target) is None
+
+
+def test_lease_and_release_pool_member(tmp_path):
+    """
+    Unit test to check the lease_pool_member function leases distinct members, refills the pool and waits if all members are leased
+    """
+    backend = FakeBackend()
+    lock = FileCreationLock(directory=str(tmp_path))
+    first = lease_pool_member(backend=backend, pool_name="pool", pool_size=2, lease_id="run1", create_member=create_member(backend), lock=lock)
+    assert first.name == "pool-0"
+    assert backend.get_compute_target(name="pool-1") is not None
+    assert backend.get_compute_target(name="pool-1").tags[POOL_TAG] == "pool"
+    assert backend.get_compute_target(name="pool-1").tags.get(LEASE_TAG, "") == ""
+    second = lease_pool_member(backend=backend, pool_name="pool", pool_size=2, lease_id="run2", create_member=create_member(backend), lock=lock)
+    assert second.name == "pool-1"
+    assert backend.creations == 2
+    with pytest.raises(AMLComputeException):
+        assert lease_pool_member(backend=backend, pool_name="pool", pool_size=2, lease_id="run3", create_member=create_member(backend), timeout_minutes=0)
+
+    assert [member.name for member in release_pool_members(backend=backend, pool_name="pool", pool_size=2, lease_id="run1")] == ["pool-0"]
+    third = lease_pool_member(backend=backend, pool_name="pool", pool_size=2, lease_id="run3", create_member=create_member(backend))
+    assert third.name == "pool-0"
+    assert backend.creations == 2
+
+
+def test_lease_pool_member_expired_lease():
+    """
+    Unit test to check the lease_pool_member function reclaims members with expired leases
+    """
+    backend = FakeBackend()
+    lease_pool_member(backend=backend, pool_name="pool", pool_size=1, lease_id="run1", create_member=create_member(backend), lease_minutes=0)
+    compute_target = lease_pool_member(backend=backend, pool_name="pool", pool_size=1, lease_id="run2", create_member=create_member(backend), timeout_minutes=0)
+    assert compute_target.tags[LEASE_TAG] == "run2"
+
+
+def test_release_pool_members_recycle():
+    """
+    Unit test to check the release_pool_members function deletes recycled members, so the next lease creates them again
+    """
+    backend = FakeBackend()
+    lease_pool_member(backend=backend, pool_name="pool", pool_size=1, lease_id="run1", create_member=create_member(backend))
+    release_pool_members(backend=backend, pool_name="pool", pool_size=1, lease_id="run1", recycle=True)
+    assert backend.get_compute_target(name="pool-0") is None
+    lease_pool_member(backend=backend, pool_name="pool", pool_size=1, lease_id="run2", create_member=create_member(backend))
+    assert backend.creations == 2
@@ -0,0 +1,100 @@
+import os
+import sys
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from main import process_compute_target
+from preflight import FixturePreflightSource, ArmPreflightSource, run_preflight
+from utils import AMLConfigurationException, AMLCapacityException
+
+source = FixturePreflightSource(fixture=os.path.join(myPath, "fixtures", "preflight.json"))
+
+
+def run(parameters):
+    run_preflight(source=source, subscription_id="fake", location="westeurope", parameters={"compute_type": "amlcluster", **parameters})
+
+
+def test_run_preflight_valid_parameters():
+    """
+    Unit test to check the run_preflight function accepts parameters that fit into the remaining quota
+    """
+    run({"vm_size": "standard_ds3_v2", "max_nodes": 4})
+    run({"vnet_resource_group_name": "testrg", "vnet_name": "testvnet", "subnet_name": "testsubnet"})
+    run({"vm_size": "Standard_DS3_v2", "vm_priority": "lowpriority", "max_nodes": 2})
+
+
+def test_run_preflight_unavailable_vm_size():
+    """
+    Unit test to check the run_preflight function fails for VM sizes that are not offered in the location
+    """
+    with pytest.raises(AMLCapacityException) as exception:
+        assert run({"vm_size": "Standard_DS5_v2"})
+    assert "Standard_DS4_v2" in str(exception.value)
+
+
+def test_run_preflight_quota_exceeded():
+    """
+    Unit test to check the run_preflight function fails if the requested cores exceed the remaining family or low priority quota
+    """
+    with pytest.raises(AMLCapacityException):
+        assert run({"vm_size": "Standard_DS4_v2", "max_nodes": 3})
+    with pytest.raises(AMLCapacityException):
+        assert run({"vm_size": "Standard_DS3_v2", "vm_priority": "lowpriority", "max_nodes": 3})
+    with pytest.raises(AMLCapacityException):
+        assert run({"vm_size": "Standard_NC6", "vm_priority": "lowpriority"})
+
+
+def test_run_preflight_invalid_subnet():
+    """
+    Unit test to check the run_preflight function ignores incomplete virtual network settings and fails for missing subnets
+    """
+    run({"vnet_name": "testvnet", "subnet_name": "othersubnet"})
+    with pytest.raises(AMLConfigurationException):
+        assert run({"vnet_resource_group_name": "testrg", "vnet_name": "testvnet", "subnet_name": "othersubnet"})
+
+
+def test_run_preflight_unreadable_source():
+    """
+    Unit test to check the run_preflight function continues if the source cannot be read
+    """
+    def get(path, api_version):
+        raise Exception("AuthorizationFailed (Response Code: 403)")
+
+    run_preflight(source=ArmPreflightSource(get=get, subscription_id="fake"), subscription_id="fake", location="westeurope", parameters={"compute_type": "amlcluster"})
+
+
+def test_process_compute_target_preflight_vm_candidates():
+    """
+    Unit test to check the process_compute_target function skips VM candidates that fail the preflight checks without creating them
+    """
+    backend = FakeBackend(preflight_source=source)
+    parameters = {
+        "name": "testname",
+        "compute_type": "amlcluster",
+        "location": "westeurope",
+        "max_nodes": 2,
+        "vm_candidates": [{"vm_size": "Standard_NC6"}, {"vm_size": "Standard_DS3_v2"}]
+    }
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.serialize()["properties"]["properties"]["vmSize"] == "Standard_DS3_v2"
+    assert backend.creations == 1
+
+
+def test_process_compute_target_preflight_low_priority_candidate():
+    """
+    Unit test to check the process_compute_target function tries the next VM candidate if a VM size does not support low priority VMs
+    """
+    backend = FakeBackend(preflight_source=source)
+    parameters = {
+        "name": "testname",
+        "compute_type": "amlcluster",
+        "location": "westeurope",
+        "max_nodes": 2,
+        "vm_candidates": [{"vm_size": "Standard_NC6", "vm_priority": "lowpriority"}, {"vm_size": "Standard_DS3_v2"}]
+    }
+    compute_target = process_compute_target(backend=backend, parameters=parameters)
+    assert compute_target.serialize()["properties"]["properties"]["vmSize"] == "Standard_DS3_v2"
+    assert backend.creations == 1
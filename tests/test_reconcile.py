@@ -0,0 +1,254 @@
+import os
+import sys
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from reconcile import convert_duration_to_seconds, get_live_parameters, plan_reconcile, reconcile_compute_target
+from utils import AMLComputeException
+
+aml_live_state = {
+    "name": "testname",
+    "tags": {},
+    "properties": {
+        "computeType": "AmlCompute",
+        "provisioningState": "Succeeded",
+        "properties": {
+            "vmSize": "STANDARD_DS3_V2",
+            "vmPriority": "Dedicated",
+            "scaleSettings": {
+                "minNodeCount": 0,
+                "maxNodeCount": 4,
+                "nodeIdleTimeBeforeScaleDown": "PT2M"
+            },
+            "remoteLoginPortPublicAccess": "Enabled"
+        }
+    }
+}
+
+
+class MockBackend():
+    def __init__(self):
+        self.tag_updates = []
+
+    def update_tags(self, compute_target, tags):
+        self.tag_updates.append(tags)
+        return True
+
+
+class MockComputeTarget():
+    def __init__(self, live_state, update_exception=None):
+        self.name = live_state["name"]
+        self.provisioning_state = live_state["properties"]["provisioningState"]
+        self.live_state = live_state
+        self.update_exception = update_exception
+        self.updates = None
+
+    def serialize(self):
+        return self.live_state
+
+    def update(self, **kwargs):
+        if self.update_exception is not None:
+            raise self.update_exception
+        self.updates = kwargs
+
+
+def test_convert_duration_to_seconds():
+    """
+    Unit test to check the convert_duration_to_seconds function with valid and invalid durations
+    """
+    assert convert_duration_to_seconds("PT2M") == 120
+    assert convert_duration_to_seconds("PT1H0M30S") == 3630
+    assert convert_duration_to_seconds(300) == 300
+    assert convert_duration_to_seconds("") is None
+    assert convert_duration_to_seconds("test") is None
+
+
+def test_get_live_parameters_aml_cluster():
+    """
+    Unit test to check the get_live_parameters function with a serialized AML cluster
+    """
+    live_parameters = get_live_parameters(live_state=aml_live_state)
+    assert live_parameters["compute_type"] == "amlcluster"
+    assert live_parameters["max_nodes"] == 4
+    assert live_parameters["idle_seconds_before_scaledown"] == 120
+
+
+def test_plan_reconcile_no_changes():
+    """
+    Unit test to check the plan_reconcile function with parameters matching the live state
+    """
+    parameters = {
+        "name": "testname",
+        "compute_type": "amlcluster",
+        "vm_size": "Standard_DS3_v2",
+        "vm_priority": "dedicated",
+        "max_nodes": 4,
+        "remote_login_port_public_access": "NotSpecified"
+    }
+    assert plan_reconcile(parameters=parameters, live_state=aml_live_state) == []
+
+
+def test_plan_reconcile_update_and_recreate():
+    """
+    Unit test to check the plan_reconcile function with updatable and non-updatable changes
+    """
+    parameters = {
+        "min_nodes": 1,
+        "idle_seconds_before_scaledown": 300,
+        "vm_priority": "lowpriority"
+    }
+    plan = plan_reconcile(parameters=parameters, live_state=aml_live_state)
+    actions = {change["parameter"]: change["action"] for change in plan}
+    assert actions == {
+        "vm_priority": "recreate",
+        "min_nodes": "update",
+        "idle_seconds_before_scaledown": "update"
+    }
+
+
+def test_reconcile_compute_target_applies_updates():
+    """
+    Unit test to check the reconcile_compute_target function only applies updatable changes
+    """
+    backend = MockBackend()
+    compute_target = MockComputeTarget(live_state=aml_live_state)
+    reconcile_compute_target(
+        backend=backend,
+        compute_target=compute_target,
+        parameters={"max_nodes": 8, "vm_size": "Standard_NC6"}
+    )
+    assert compute_target.updates == {"max_nodes": 8}
+    assert backend.tag_updates == []
+
+
+def test_reconcile_compute_target_updates_fingerprint():
+    """
+    Unit test to check the reconcile_compute_target function stamps the fingerprint after a complete reconcile
+    """
+    backend = MockBackend()
+    compute_target = MockComputeTarget(live_state=aml_live_state)
+    reconcile_compute_target(
+        backend=backend,
+        compute_target=compute_target,
+        parameters={"max_nodes": 8}
+    )
+    assert compute_target.updates == {"max_nodes": 8}
+    assert list(backend.tag_updates[0].keys()) == ["Fingerprint"]
+
+
+def test_reconcile_compute_target_update_failure():
+    """
+    Unit test to check the reconcile_compute_target function with a failing update
+    """
+    from azureml.exceptions import ComputeTargetException
+
+    compute_target = MockComputeTarget(live_state=aml_live_state, update_exception=ComputeTargetException("test"))
+    with pytest.raises(AMLComputeException):
+        assert reconcile_compute_target(
+            backend=MockBackend(),
+            compute_target=compute_target,
+            parameters={"max_nodes": 8}
+        )
+
+
+def test_plan_reconcile_vm_candidates():
+    """
+    Unit test to check the plan_reconcile function accepts any of the VM candidates
+    """
+    parameters = {
+        "vm_size": "Standard_NC6",
+        "vm_candidates": [
+            {"vm_size": "Standard_NC6", "vm_priority": "lowpriority"},
+            {"vm_size": "Standard_DS3_v2", "vm_priority": "dedicated"}
+        ]
+    }
+    assert plan_reconcile(parameters=parameters, live_state=aml_live_state) == []
+    parameters["vm_candidates"].pop()
+    assert [change["parameter"] for change in plan_reconcile(parameters=parameters, live_state=aml_live_state)] == ["vm_size", "vm_priority"]
+
+
+def test_plan_reconcile_attached_aks_cluster():
+    """
+    Unit test to check the plan_reconcile function recreates an attached AKS cluster if the resource id changed
+    """
+    live_state = {
+        "name": "testname",
+        "tags": {},
+        "properties": {
+            "computeType": "AKS",
+            "provisioningState": "Succeeded",
+            "resourceId": "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/cluster1",
+            "properties": {}
+        }
+    }
+    parameters = {"resource_id": "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/cluster1"}
+    assert plan_reconcile(parameters=parameters, live_state=live_state) == []
+    parameters = {"resource_id": "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/cluster2"}
+    actions = {change["parameter"]: change["action"] for change in plan_reconcile(parameters=parameters, live_state=live_state)}
+    assert actions == {"resource_id": "recreate"}
+
+
+def test_plan_reconcile_network_and_identity():
+    """
+    Unit test to check the plan_reconcile function compares vnet and identity settings with the live compute target
+    """
+    parameters = {
+        "vnet_resource_group_name": "testgroup",
+        "vnet_name": "testvnet",
+        "subnet_name": "testsubnet",
+        "identity_type": "UserAssigned",
+        "identity_id": ["/subscriptions/test/resourceGroups/test/providers/Microsoft.ManagedIdentity/userAssignedIdentities/testidentity"]
+    }
+    actions = {change["parameter"]: change["action"] for change in plan_reconcile(parameters=parameters, live_state=aml_live_state)}
+    assert actions == {key: "recreate" for key in parameters}
+    live_state = {**aml_live_state, "identity": {"type": "UserAssigned", "userAssignedIdentities": {parameters["identity_id"][0]: {}}}}
+    live_state["properties"] = {**aml_live_state["properties"], "properties": {
+        **aml_live_state["properties"]["properties"],
+        "subnet": {"id": "/subscriptions/test/resourceGroups/testgroup/providers/Microsoft.Network/virtualNetworks/testvnet/subnets/testsubnet"}
+    }}
+    assert plan_reconcile(parameters=parameters, live_state=live_state) == []
+    assert plan_reconcile(parameters={"vnet_name": "testvnet", "identity_type": "SystemAssigned"}, live_state=aml_live_state) == []
+
+
+def test_plan_reconcile_unverifiable_parameters():
+    """
+    Unit test to check the plan_reconcile function reports parameters that the service does not return as unverifiable
+    """
+    live_state = {
+        "name": "testname",
+        "tags": {},
+        "properties": {
+            "computeType": "AKS",
+            "provisioningState": "Succeeded",
+            "properties": {"sslConfiguration": {"status": "Enabled", "cname": "test.example.com"}}
+        }
+    }
+    parameters = {"compute_type": "akscluster", "ssl_cname": "test.example.com", "ssl_cert_pem_file": "cert.pem", "ssl_key_pem_file": "key.pem"}
+    actions = {change["parameter"]: change["action"] for change in plan_reconcile(parameters=parameters, live_state=live_state)}
+    assert actions == {"ssl_cert_pem_file": "unverifiable", "ssl_key_pem_file": "unverifiable"}
+
+
+def test_reconcile_compute_target_keeps_fingerprint_if_unverifiable():
+    """
+    Unit test to check the reconcile_compute_target function does not stamp the fingerprint if parameters could not be compared
+    """
+    backend = MockBackend()
+    live_state = {
+        "name": "testname",
+        "tags": {},
+        "properties": {"computeType": "AKS", "provisioningState": "Succeeded", "properties": {"sslConfiguration": {"cname": "test.example.com"}}}
+    }
+    reconcile_compute_target(
+        backend=backend,
+        compute_target=MockComputeTarget(live_state=live_state),
+        parameters={"compute_type": "akscluster", "ssl_cname": "test.example.com", "ssl_cert_pem_file": "cert.pem", "ssl_key_pem_file": "key.pem"}
+    )
+    assert backend.tag_updates == []
+    reconcile_compute_target(
+        backend=backend,
+        compute_target=MockComputeTarget(live_state=aml_live_state),
+        parameters={"vnet_resource_group_name": "testgroup", "vnet_name": "testvnet", "subnet_name": "testsubnet"}
+    )
+    assert backend.tag_updates == []
@@ -0,0 +1,318 @@
+import os
+import sys
+import json
+import time
+import base64
+import pytest
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+pytest.importorskip("requests")
+
+from main import load_workspace_backends, main
+from auth_cache import save_cache, load_cache
+from rest_backend import RestBackend, build_aml_cluster_payload, build_aks_attach_payload
+from utils import AMLComputeException, AMLConfigurationException
+
+workspace_config = {
+    "subscription_id": "test",
+    "resource_group": "testrg",
+    "workspace_name": "testws"
+}
+workspace_id = "/subscriptions/test/resourceGroups/testrg/providers/Microsoft.MachineLearningServices/workspaces/testws"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Stub of the token endpoint and the Azure Resource Manager endpoints used by the REST backend
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status_code, body, headers={}):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length > 0 else None
+
+    def handle_request(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        server.requests.append((self.command, path))
+        if path.endswith("/oauth2/v2.0/token"):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            return self.send_json(200, {"access_token": "token", "expires_in": 3600})
+        if self.headers.get("Authorization", None) != "Bearer token":
+            return self.send_json(401, {"error": {"code": "InvalidAuthenticationToken"}})
+        if server.throttle > 0:
+            server.throttle -= 1
+            return self.send_json(429, {"error": {"code": "TooManyRequests"}}, headers={"Retry-After": "0"})
+        if path == workspace_id:
+            return self.send_json(200, {"id": workspace_id, "location": "westeurope"})
+        if path.endswith("/providers/Microsoft.Resources/tags/default"):
+            compute_id = path.split("/providers/Microsoft.Resources/tags/default")[0]
+            server.computes[compute_id]["tags"].update(self.read_json()["properties"]["tags"])
+            return self.send_json(200, {})
+        if self.command == "GET" and path == f"{workspace_id}/computes":
+            # Returning one compute target per page to exercise next links
+            skip = int(parse_qs(urlsplit(self.path).query).get("$skipToken", ["0"])[0])
+            computes = list(server.computes.values())
+            next_link = f"http://localhost:{server.server_address[1]}{path}?api-version=2021-04-01&$skipToken={skip + 1}" if skip + 1 < len(computes) else None
+            return self.send_json(200, {"value": computes[skip:skip + 1], "nextLink": next_link})
+        if self.command == "GET":
+            if path not in server.computes:
+                return self.send_json(404, {"error": {"code": "NotFound"}})
+            return self.send_json(200, server.computes[path])
+        if self.command == "PUT":
+            payload = self.read_json()
+            if payload["properties"]["properties"].get("vmSize", None) == "invalid":
+                return self.send_json(400, {"error": {"code": "BadRequest"}})
+            server.computes[path] = {
+                "id": path,
+                "name": path.split("/")[-1],
+                "location": payload["location"],
+                "tags": payload["tags"],
+                "properties": {**payload["properties"], "provisioningState": "Succeeded"}
+            }
+            return self.send_json(201, server.computes[path], headers={"Azure-AsyncOperation": f"http://localhost{path}/operation"})
+        if self.command == "PATCH":
+            payload = self.read_json()
+            server.bodies.append(payload)
+            scale_settings = payload["properties"]["properties"]["scaleSettings"]
+            if payload["properties"]["computeType"] != "AmlCompute" or scale_settings.get("maxNodeCount", None) is None:
+                return self.send_json(400, {"error": {"code": "BadRequest"}})
+            server.computes[path]["properties"]["properties"]["scaleSettings"] = scale_settings
+            return self.send_json(200, server.computes[path])
+        if self.command == "DELETE":
+            action = parse_qs(urlsplit(self.path).query).get("underlyingResourceAction", [None])[0]
+            if action not in ["Delete", "Detach"]:
+                return self.send_json(400, {"error": {"code": "BadRequest"}})
+            server.deletions.append((path.split("/")[-1], action))
+            server.computes.pop(path, None)
+            return self.send_json(202, {})
+        return self.send_json(405, {})
+
+    do_GET = handle_request
+    do_PUT = handle_request
+    do_POST = handle_request
+    do_PATCH = handle_request
+    do_DELETE = handle_request
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("localhost", 0), StubHandler)
+    server.requests = []
+    server.computes = {}
+    server.bodies = []
+    server.deletions = []
+    server.throttle = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_azure_credentials(server):
+    endpoint = f"http://localhost:{server.server_address[1]}"
+    return {
+        "clientId": "test",
+        "clientSecret": "test",
+        "subscriptionId": "test",
+        "tenantId": "test",
+        "resourceManagerEndpointUrl": endpoint,
+        "activeDirectoryEndpointUrl": endpoint
+    }
+
+
+def create_backend(server):
+    return RestBackend(
+        azure_credentials=get_azure_credentials(server=server),
+        workspace_config=workspace_config
+    )
+
+
+def test_build_aml_cluster_payload():
+    """
+    Unit test to check the build_aml_cluster_payload function converts parameters into the ARM request body
+    """
+    payload = build_aml_cluster_payload(
+        subscription_id="test",
+        location="westeurope",
+        parameters={"vm_priority": "lowpriority", "max_nodes": 2, "idle_seconds_before_scaledown": 300}
+    )
+    properties = payload["properties"]["properties"]
+    assert payload["properties"]["computeType"] == "AmlCompute"
+    assert properties["vmPriority"] == "LowPriority"
+    assert properties["scaleSettings"] == {"minNodeCount": 0, "maxNodeCount": 2, "nodeIdleTimeBeforeScaleDown": "PT300S"}
+    assert "Fingerprint" in payload["tags"]
+
+
+def test_build_aks_attach_payload():
+    """
+    Unit test to check the build_aks_attach_payload function references the existing AKS cluster and marks it as attached
+    """
+    resource_id = "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/testcluster"
+    payload = build_aks_attach_payload(
+        subscription_id="test",
+        location="westeurope",
+        parameters={"compute_type": "akscluster", "resource_id": resource_id, "cluster_purpose": "DevTest"}
+    )
+    assert payload["properties"]["computeType"] == "AKS"
+    assert payload["properties"]["resourceId"] == resource_id
+    assert payload["properties"]["properties"] == {"clusterPurpose": "DevTest"}
+    assert "Attached" in payload["tags"]
+    assert "Created" not in payload["tags"]
+
+
+def test_rest_backend_get_missing_compute_target(stub_server):
+    """
+    Unit test to check the RestBackend returns None for a compute target that does not exist
+    """
+    backend = create_backend(server=stub_server)
+    assert backend.get_compute_target(name="missing") is None
+
+
+def test_rest_backend_create_and_get_compute_target(stub_server):
+    """
+    Unit test to check the RestBackend creates, loads, updates and tags a compute target with one token
+    """
+    backend = create_backend(server=stub_server)
+    compute_target = backend.create_compute_target(name="testname", parameters={"compute_type": "amlcluster"}, wait=True)
+    assert compute_target.provisioning_state == "Succeeded"
+    assert compute_target.type == "AmlCompute"
+
+    compute_target = backend.get_compute_target(name="testname")
+    compute_target.update(max_nodes=8)
+    assert compute_target.serialize()["properties"]["properties"]["scaleSettings"]["maxNodeCount"] == 8
+    assert backend.update_tags(compute_target=compute_target, tags={"test": "test"})
+    assert stub_server.computes[compute_target.id]["tags"]["test"] == "test"
+    assert len([path for _, path in stub_server.requests if path.endswith("/token")]) == 1
+
+
+def test_rest_backend_update_sends_complete_scale_settings(stub_server):
+    """
+    Unit test to check the RestBackend sends the complete scale settings in the request body of AmlCompute.update
+    """
+    backend = create_backend(server=stub_server)
+    compute_target = backend.create_compute_target(name="testname", parameters={"compute_type": "amlcluster", "max_nodes": 8, "idle_seconds_before_scaledown": 300})
+    compute_target.update(min_nodes=2)
+    assert stub_server.bodies[-1] == {
+        "properties": {
+            "computeType": "AmlCompute",
+            "properties": {"scaleSettings": {"minNodeCount": 2, "maxNodeCount": 8, "nodeIdleTimeBeforeScaleDown": "PT300S"}}
+        }
+    }
+    compute_target.update(min_nodes=0, idle_seconds_before_scaledown=120)
+    assert stub_server.bodies[-1]["properties"]["properties"]["scaleSettings"] == {"minNodeCount": 0, "maxNodeCount": 8, "nodeIdleTimeBeforeScaleDown": "PT120S"}
+    assert compute_target.serialize()["properties"]["properties"]["scaleSettings"]["minNodeCount"] == 0
+
+
+def test_rest_backend_delete_and_detach(stub_server):
+    """
+    Unit test to check the RestBackend deletes the resources of created compute targets and only detaches attached AKS clusters
+    """
+    backend = create_backend(server=stub_server)
+    backend.create_compute_target(name="created", parameters={"compute_type": "amlcluster"})
+    backend.create_compute_target(name="attached", parameters={
+        "compute_type": "akscluster",
+        "resource_id": "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/testcluster"
+    })
+    backend.get_compute_target(name="created").delete()
+    backend.get_compute_target(name="attached").delete()
+    assert stub_server.deletions == [("created", "Delete"), ("attached", "Detach")]
+    assert backend.get_compute_target(name="created") is None
+
+
+def test_rest_backend_list_compute_targets(stub_server):
+    """
+    Unit test to check the RestBackend follows next links when listing compute targets
+    """
+    backend = create_backend(stub_server)
+    for name in ["test1", "test2", "test3"]:
+        backend.create_compute_target(name=name, parameters={"compute_type": "amlcluster"}, wait=False)
+    assert [compute_target.name for compute_target in backend.list_compute_targets()] == ["test1", "test2", "test3"]
+
+
+def test_rest_backend_retries_throttled_calls(stub_server):
+    """
+    Unit test to check the RestBackend retries throttled calls
+    """
+    stub_server.throttle = 2
+    backend = create_backend(server=stub_server)
+    assert backend.get_compute_target(name="missing") is None
+
+
+def test_rest_backend_invalid_parameters(stub_server):
+    """
+    Unit test to check the RestBackend raises a configuration error if the service rejects the parameters
+    """
+    backend = create_backend(server=stub_server)
+    with pytest.raises(AMLConfigurationException):
+        assert backend.create_compute_target(name="testname", parameters={"vm_size": "invalid"})
+
+
+def test_rest_backend_unauthorized(stub_server):
+    """
+    Unit test to check the RestBackend raises a compute error for rejected tokens
+    """
+    backend = create_backend(server=stub_server)
+    backend.token = "invalid"
+    backend.token_expires_on = float("inf")
+    with pytest.raises(AMLComputeException):
+        assert backend.get_compute_target(name="testname")
+
+
+def test_load_workspace_backends(stub_server):
+    """
+    Unit test to check the load_workspace_backends function shares one token between all workspaces and reports workspaces that cannot be loaded
+    """
+    results = load_workspace_backends(
+        azure_credentials=get_azure_credentials(server=stub_server),
+        backend_type="rest",
+        workspace_configs=[
+            {"resource_group": "testrg", "workspace_name": "testws"},
+            {"resource_group": "testrg", "workspace_name": "missing"}
+        ]
+    )
+    assert results[0][0].get_location() == "westeurope"
+    assert results[1][0] is None and results[1][1] is not None
+    assert len([path for _, path in stub_server.requests if path.endswith("/oauth2/v2.0/token")]) == 1
+
+
+def test_main_invalidates_rejected_cached_token(stub_server, tmp_path, monkeypatch):
+    """
+    Unit test to check the action removes the auth cache if the service rejects the cached token
+    """
+    pytest.importorskip("cryptography")
+    azure_credentials = get_azure_credentials(server=stub_server)
+    (tmp_path / "aml_arm_config.json").write_text(json.dumps(workspace_config))
+    os.makedirs(tmp_path / ".cloud" / ".azure")
+    (tmp_path / ".cloud" / ".azure" / "compute.json").write_text(json.dumps({"name": "testname", "compute_type": "amlcluster"}))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+    monkeypatch.setenv("GITHUB_WORKSPACE", str(tmp_path))
+    monkeypatch.setenv("INPUT_AZURE_CREDENTIALS", json.dumps(azure_credentials))
+    monkeypatch.setenv("INPUT_PARAMETERS_FILE", "compute.json")
+    monkeypatch.setenv("INPUT_BACKEND", "rest")
+    monkeypatch.setenv("INPUT_CACHE_AUTH", "true")
+    stale_token = "header.{}.signature".format(base64.urlsafe_b64encode(json.dumps({"exp": int(time.time()) + 3600}).encode("utf-8")).decode("utf-8").rstrip("="))
+    save_cache(azure_credentials=azure_credentials, workspace_config=workspace_config, token=stale_token, workspace_details={**workspace_config, "location": "westeurope"})
+    assert load_cache(azure_credentials=azure_credentials, workspace_config=workspace_config) is not None
+
+    with pytest.raises(AMLComputeException):
+        assert main()
+    assert ("GET", f"{workspace_id}/computes/testname") in stub_server.requests
+    assert load_cache(azure_credentials=azure_credentials, workspace_config=workspace_config) is None
@@ -0,0 +1,90 @@
+import os
+import sys
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from retry import RetryPolicy, classify_exception, get_retry_after, is_capacity_failure
+
+
+class MockResponse():
+    def __init__(self, status_code, headers={}):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class MockHTTPError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def raise_exception(exception):
+    raise exception
+
+
+def test_classify_exception():
+    """
+    Unit test to check the classify_exception function with SDK and HTTP exceptions
+    """
+    assert classify_exception(Exception("ComputeTargetNotFound: Compute Target with name test not found in provided workspace")) == "not_found"
+    assert classify_exception(Exception("Received bad response from Resource Provider:\nResponse Code: 429\nHeaders: {}")) == "throttled"
+    assert classify_exception(MockHTTPError(MockResponse(503))) == "transient"
+    assert classify_exception(Exception("Response Code: 400")) == "fatal"
+
+
+def test_get_retry_after():
+    """
+    Unit test to check the get_retry_after function with SDK and HTTP exceptions
+    """
+    assert get_retry_after(Exception("Response Code: 429\nHeaders: {'Retry-After': '17', 'Content-Type': 'application/json'}")) == 17
+    assert get_retry_after(MockHTTPError(MockResponse(429, {"Retry-After": "3"}))) == 3
+    assert get_retry_after(Exception("Response Code: 429")) is None
+
+
+def test_retry_policy_retries_throttled_calls():
+    """
+    Unit test to check the RetryPolicy retries throttled calls and reports retries
+    """
+    retry_policy = RetryPolicy(initial_backoff=0.01, max_backoff=0.02)
+    attempts = []
+
+    def function():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise MockHTTPError(MockResponse(429))
+        return "test"
+
+    assert retry_policy.call(function=function, description="test") == "test"
+    assert retry_policy.report()["retries"] == 2
+
+
+def test_retry_policy_does_not_retry_fatal_calls():
+    """
+    Unit test to check the RetryPolicy does not retry fatal errors
+    """
+    retry_policy = RetryPolicy(initial_backoff=0.01, max_backoff=0.02)
+    with pytest.raises(MockHTTPError):
+        assert retry_policy.call(function=lambda: raise_exception(MockHTTPError(MockResponse(400))), description="test")
+    assert retry_policy.report()["retries"] == 0
+
+
+def test_retry_policy_budget_exhausted():
+    """
+    Unit test to check the RetryPolicy stops retrying when the retry budget is exhausted
+    """
+    retry_policy = RetryPolicy(budget_seconds=1)
+    with pytest.raises(MockHTTPError):
+        assert retry_policy.call(function=lambda: raise_exception(MockHTTPError(MockResponse(429, {"Retry-After": "5"}))), description="test")
+    assert retry_policy.report()["retries"] == 0
+
+
+def test_is_capacity_failure():
+    """
+    Unit test to check the is_capacity_failure function detects capacity and quota failures
+    """
+    assert is_capacity_failure(Exception("Received bad response from Resource Provider: Response Code: 400 QuotaExceeded"))
+    assert is_capacity_failure("Allocation failed due to insufficient quota")
+    assert is_capacity_failure({"code": "ZonalAllocationFailed"})
+    assert not is_capacity_failure(Exception("Response Code: 400 InvalidVmSize"))
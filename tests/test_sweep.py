@@ -0,0 +1,79 @@
+import os
+import sys
+
+from datetime import datetime, timedelta, timezone
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from pool import POOL_TAG, LEASE_TAG, LEASE_EXPIRY_TAG
+from sweep import parse_timestamp, sweep_compute_targets, write_sweep_summary
+
+
+def create_compute_targets(backend, now):
+    # Creating a stale, a recent, a foreign, a leased and a free pooled compute target
+    compute_targets = {}
+    for name, age_hours in [("stale", 48), ("recent", 1), ("foreign", 48), ("leased", 48), ("pooled", 48)]:
+        compute_target = backend.create_compute_target(name=name, parameters={"min_nodes": 1, "max_nodes": 2})
+        compute_target.resource["properties"]["createdOn"] = (now - timedelta(hours=age_hours)).isoformat()
+        compute_targets[name] = compute_target
+    compute_targets["foreign"].tags = {}
+    compute_targets["leased"].tags[LEASE_TAG] = "run"
+    compute_targets["leased"].tags[LEASE_EXPIRY_TAG] = str(now.timestamp() + 3600)
+    compute_targets["pooled"].tags.update({POOL_TAG: "pool", LEASE_TAG: "", LEASE_EXPIRY_TAG: ""})
+    return compute_targets
+
+
+def test_parse_timestamp():
+    """
+    Unit test to check the parse_timestamp function parses timestamps of the service
+    """
+    assert parse_timestamp("2021-10-19T12:00:00.1234567Z") == datetime(2021, 10, 19, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    assert parse_timestamp("2021-10-19T12:00:00") == datetime(2021, 10, 19, 12, tzinfo=timezone.utc)
+    assert parse_timestamp("invalid") is None
+    assert parse_timestamp(None) is None
+
+
+def test_sweep_compute_targets_dry_run():
+    """
+    Unit test to check the sweep_compute_targets function only reports stale compute targets created by the action in a dry run
+    """
+    now = datetime.now(timezone.utc)
+    backend = FakeBackend()
+    create_compute_targets(backend=backend, now=now)
+    report = {entry["name"]: entry for entry in sweep_compute_targets(backend=backend, idle_hours=0, dry_run=True, now=now)}
+    assert report["stale"]["status"] == "dry_run"
+    assert report["recent"]["reason"] == "younger than 24 hour(s)"
+    assert report["foreign"]["reason"] == "not created by the action"
+    assert report["leased"]["reason"] == "leased from a pool"
+    assert report["pooled"]["reason"] == "member of a pool"
+    assert len(backend.list_compute_targets()) == 5
+
+
+def test_sweep_compute_targets_delete_and_scale_down():
+    """
+    Unit test to check the sweep_compute_targets function deletes or scales down stale compute targets
+    """
+    now = datetime.now(timezone.utc)
+    backend = FakeBackend()
+    compute_targets = create_compute_targets(backend=backend, now=now)
+    report = {entry["name"]: entry for entry in sweep_compute_targets(backend=backend, action="scale_down", dry_run=False, now=now)}
+    assert report["stale"]["status"] == "scaled_down"
+    assert compute_targets["stale"].serialize()["properties"]["properties"]["scaleSettings"]["minNodeCount"] == 0
+
+    report = {entry["name"]: entry for entry in sweep_compute_targets(backend=backend, action="delete", dry_run=False, now=now)}
+    assert report["stale"]["status"] == "deleted"
+    assert sorted([compute_target.name for compute_target in backend.list_compute_targets()]) == ["foreign", "leased", "pooled", "recent"]
+
+
+def test_write_sweep_summary(tmp_path, monkeypatch):
+    """
+    Unit test to check the write_sweep_summary function writes a table with one row per compute target
+    """
+    summary_file_path = os.path.join(tmp_path, "summary.md")
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", summary_file_path)
+    report = [{"name": "stale", "compute_type": "AmlCompute", "age_hours": 48.0, "unused_hours": 48.0, "status": "deleted", "reason": "stale"}]
+    assert write_sweep_summary(report=report, dry_run=False)
+    with open(summary_file_path) as f:
+        assert "| stale | AmlCompute | 48.0h | 48.0h | deleted | stale |" in f.read()
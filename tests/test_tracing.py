@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import pytest
+import threading
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from main import main
+from tracing import Tracer, write_summary, write_trace
+from utils import AMLConfigurationException
+
+
+def test_tracer_nested_spans():
+    """
+    Unit test to check the Tracer records nested spans and attaches spans of worker threads to the root span
+    """
+    tracer = Tracer()
+
+    def lookup():
+        with tracer.span(name="lookup"):
+            pass
+
+    with tracer.span(name="action", root=True) as root_span:
+        with tracer.span(name="lookup", compute_target="testname") as lookup_span:
+            with tracer.span(name="retry_backoff"):
+                pass
+        worker = threading.Thread(target=lookup)
+        worker.start()
+        worker.join()
+    spans = {span["span_id"]: span for span in tracer.spans}
+    assert [span["parent_span_id"] for span in tracer.spans if span["name"] == "retry_backoff"] == [lookup_span["span_id"]]
+    assert [span["parent_span_id"] for span in tracer.spans if span["name"] == "lookup"] == [root_span["span_id"], root_span["span_id"]]
+    assert spans[root_span["span_id"]]["parent_span_id"] is None
+    assert list(tracer.phase_durations().keys()) == ["retry_backoff", "lookup"]
+    assert tracer.total_duration() >= 0
+
+
+def test_tracer_error_status():
+    """
+    Unit test to check the Tracer marks spans that raised an exception
+    """
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span(name="action", root=True):
+            raise ValueError("test")
+    trace = tracer.to_otlp()
+    span = trace["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["status"]["code"] == "STATUS_CODE_ERROR"
+    assert span["endTimeUnixNano"] >= span["startTimeUnixNano"]
+
+
+def test_write_summary_and_trace(tmp_path, monkeypatch):
+    """
+    Unit test to check the write_summary and write_trace functions write a table and a JSON trace
+    """
+    summary_file_path = os.path.join(tmp_path, "summary.md")
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", summary_file_path)
+    assert write_summary(phase_durations={"lookup": 0.5}, total_duration=1.0)
+    with open(summary_file_path) as f:
+        assert "| lookup | 0.500s |" in f.read()
+
+    trace_file_path = os.path.join(tmp_path, "traces", "trace.json")
+    write_trace(trace_file_path=trace_file_path, trace={"resourceSpans": []})
+    with open(trace_file_path) as f:
+        assert json.load(f) == {"resourceSpans": []}
+
+
+def test_main_reports_timings_on_failure(tmp_path, monkeypatch):
+    """
+    Unit test to check the main function reports phase timings even if the action fails
+    """
+    github_output = os.path.join(tmp_path, "github_output")
+    monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+    monkeypatch.setenv("INPUT_AZURE_CREDENTIALS", "")
+    monkeypatch.setenv("INPUT_TRACE_FILE", os.path.join(tmp_path, "trace.json"))
+    with pytest.raises(AMLConfigurationException):
+        assert main()
+    with open(github_output) as f:
+        outputs = f.read()
+    assert "phase_timings" in outputs
+    assert "duration_seconds" in outputs
+    assert os.path.isfile(os.path.join(tmp_path, "trace.json"))
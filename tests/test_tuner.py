@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+np = pytest.importorskip("numpy")
+
+from tuner import load_runs, build_demand_from_runs, build_demand_from_node_usage, simulate, tune, build_compute_diff
+
+
+def test_build_demand_from_runs():
+    """
+    Unit test to check the build_demand_from_runs function adds up the nodes of overlapping runs per time step
+    """
+    starts, ends, node_counts = load_runs(records=[
+        {"submitted_at": "2021-01-01T00:00:00Z", "ended_at": "2021-01-01T00:03:00Z"},
+        {"submitted_at": "2021-01-01T00:01:00Z", "duration_seconds": "60", "node_count": "2"}
+    ])
+    assert build_demand_from_runs(starts=starts, ends=ends, node_counts=node_counts).tolist() == [1, 3, 1]
+
+
+def test_build_demand_from_node_usage():
+    """
+    Unit test to check the build_demand_from_node_usage function resamples node counts to the time steps
+    """
+    running, idle = build_demand_from_node_usage(records=[
+        {"timestamp": 0, "running": 1, "idle": 0},
+        {"timestamp": 120, "running": 2, "idle": 1},
+        {"timestamp": 180, "running": 0, "idle": 2}
+    ])
+    assert running.tolist() == [1, 1, 2]
+    assert idle.tolist() == [0, 0, 1]
+
+
+def test_simulate():
+    """
+    Unit test to check the simulate function trades idle node hours against waiting node hours
+    """
+    demand = np.array([0.0] * 60 + [2.0] * 60 + [0.0] * 60)
+    cold = simulate(demand=demand, min_nodes=0, max_nodes=2, idle_seconds=60)
+    assert cold["waiting_node_hours"] == round(2 * 5 / 60, 2)
+    warm = simulate(demand=demand, min_nodes=2, max_nodes=2, idle_seconds=60)
+    assert warm["waiting_node_hours"] == 0
+    assert warm["idle_node_hours"] > cold["idle_node_hours"]
+    capped = simulate(demand=demand, min_nodes=1, max_nodes=1, idle_seconds=60)
+    assert capped["waiting_node_hours"] == 1
+
+
+def test_tune_months_of_demand():
+    """
+    Unit test to check the tune function ranks the settings of three months of demand within seconds
+    """
+    rng = np.random.default_rng(0)
+    demand = np.repeat(rng.poisson(1.5, size=90 * 24 * 6).astype(float), 10)
+    start = time.monotonic()
+    evaluations = tune(demand=demand, wait_weight=4.0)
+    assert time.monotonic() - start < 30
+    assert evaluations[0]["score"] == min([evaluation["score"] for evaluation in evaluations])
+
+
+def test_build_compute_diff(tmp_path):
+    """
+    Unit test to check the build_compute_diff function updates the named compute target and returns a diff
+    """
+    parameters_file_path = str(tmp_path / "compute.json")
+    with open(parameters_file_path, "w") as f:
+        json.dump([{"name": "cpu", "max_nodes": 4}, {"name": "gpu", "max_nodes": 2}], f, indent=4)
+    recommendation = {"min_nodes": 1, "max_nodes": 3, "idle_seconds_before_scaledown": 600}
+    updated, diff = build_compute_diff(parameters_file_path=parameters_file_path, recommendation=recommendation, name="gpu")
+    assert json.loads(updated)[1] == {"name": "gpu", **recommendation}
+    assert json.loads(updated)[0] == {"name": "cpu", "max_nodes": 4}
+    assert '+        "idle_seconds_before_scaledown": 600' in diff
+
+
+def test_build_compute_diff_keeps_indentation(tmp_path):
+    """
+    Unit test to check the build_compute_diff function keeps the indentation of the parameters file, so the diff only shows changed settings
+    """
+    parameters_file_path = str(tmp_path / "compute.json")
+    with open(parameters_file_path, "w") as f:
+        f.write(json.dumps({"name": "cpu", "vm_size": "Standard_DS3_v2", "min_nodes": 0, "max_nodes": 4, "idle_seconds_before_scaledown": 120}, indent=2) + "\n")
+    recommendation = {"min_nodes": 0, "max_nodes": 3, "idle_seconds_before_scaledown": 600}
+    updated, diff = build_compute_diff(parameters_file_path=parameters_file_path, recommendation=recommendation)
+    assert updated.endswith("}\n")
+    assert [line for line in diff.splitlines() if line[:1] in ["+", "-"] and line[:3] not in ["+++", "---"]] == [
+        '-  "max_nodes": 4,',
+        '-  "idle_seconds_before_scaledown": 120',
+        '+  "max_nodes": 3,',
+        '+  "idle_seconds_before_scaledown": 600'
+    ]
@@ -5,8 +5,9 @@
 myPath = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(myPath, "..", "code"))
 
-from utils import AMLConfigurationException, validate_json, create_compute_target, create_aml_cluster, create_aks_cluster, required_parameters_provided
-from schemas import azure_credentials_schema
+import utils
+from utils import AMLConfigurationException, AMLProvisioningException, validate_json, create_compute_target, create_aml_cluster, create_aks_cluster, attach_aks_cluster, required_parameters_provided, unique_names_provided, run_in_parallel, wait_for_provisioning, load_integer_input, set_output, AMLComputeException, AMLCapacityException, compute_fingerprint, check_provisioning_state
+from schemas import azure_credentials_schema, parameters_schema
 from azureml.core.compute import AmlCompute
 
 
@@ -188,3 +189,210 @@ def test_required_parameters_provided_invalid_keys():
             parameters=parameters,
             keys=keys
         )
+
+
+def test_validate_json_list_of_compute_targets():
+    """
+    Unit test to check the validate_json function with a list of compute targets
+    """
+    json_object = [
+        {"name": "cpu-cluster", "compute_type": "amlcluster"},
+        {"name": "aks-cluster", "compute_type": "akscluster"}
+    ]
+    validate_json(
+        data=json_object,
+        schema=parameters_schema,
+        input_name="PARAMETERS_FILE"
+    )
+
+
+def test_validate_json_empty_list_of_compute_targets():
+    """
+    Unit test to check the validate_json function with an empty list of compute targets
+    """
+    json_object = []
+    with pytest.raises(AMLConfigurationException):
+        assert validate_json(
+            data=json_object,
+            schema=parameters_schema,
+            input_name="PARAMETERS_FILE"
+        )
+
+
+def test_unique_names_provided_valid_inputs():
+    """
+    Unit test to check the unique_names_provided function with valid inputs
+    """
+    names = ["cpu-cluster", "gpu-cluster"]
+    unique_names_provided(
+        names=names
+    )
+
+
+def test_unique_names_provided_duplicate_names():
+    """
+    Unit test to check the unique_names_provided function with duplicate names
+    """
+    names = ["cpu-cluster", "gpu-cluster", "cpu-cluster"]
+    with pytest.raises(AMLConfigurationException):
+        assert unique_names_provided(
+            names=names
+        )
+
+
+def test_run_in_parallel_collects_results_and_exceptions():
+    """
+    Unit test to check the run_in_parallel function returns results and exceptions in order
+    """
+    def function(item):
+        if item == 2:
+            raise ValueError("test")
+        return item * 10
+
+    results = run_in_parallel(
+        function=function,
+        items=[1, 2, 3],
+        max_workers=2
+    )
+    assert [result for result, _ in results] == [10, None, 30]
+    assert isinstance(results[1][1], ValueError)
+
+
+class MockComputeTarget():
+    def __init__(self, states, provisioning_errors=None):
+        self.name = "testname"
+        self.states = states
+        self.provisioning_state = states.pop(0)
+        self.provisioning_errors = provisioning_errors
+
+    def refresh_state(self):
+        if len(self.states) > 0:
+            self.provisioning_state = self.states.pop(0)
+
+    def serialize(self):
+        return {"properties": {"provisioningState": self.provisioning_state, "provisioningErrors": self.provisioning_errors}}
+
+
+@pytest.mark.parametrize("function, resource_id, tag", [(create_aks_cluster, None, "Created"), (attach_aks_cluster, "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/test", "Attached")])
+def test_aks_cluster_tagged_before_provisioning_fails(monkeypatch, function, resource_id, tag):
+    """
+    Unit test to check the create_aks_cluster and attach_aks_cluster functions tag compute targets before waiting, so failed compute targets can be recovered
+    """
+    compute_target = MockComputeTarget(states=["Failed"])
+    submissions = []
+    tag_updates = []
+    monkeypatch.setattr(utils, "create_compute_target", lambda wait, **kwargs: submissions.append(wait) or compute_target)
+    monkeypatch.setattr(utils, "update_compute_tags", lambda compute_target, tags: tag_updates.append(tags))
+    with pytest.raises(AMLProvisioningException):
+        assert function(
+            workspace=object(),
+            parameters={"name": "testname", "compute_type": "akscluster", "resource_id": resource_id},
+            wait=True
+        )
+    assert submissions == [False]
+    assert tag in tag_updates[0]
+
+
+def test_wait_for_provisioning_succeeded():
+    """
+    Unit test to check the wait_for_provisioning function with a compute target that succeeds
+    """
+    compute_target = MockComputeTarget(states=["Creating", "Creating", "Succeeded"])
+    state = wait_for_provisioning(
+        compute_target=compute_target,
+        initial_interval=0.01,
+        max_interval=0.02
+    )
+    assert state == "Succeeded"
+
+
+def test_wait_for_provisioning_timeout():
+    """
+    Unit test to check the wait_for_provisioning function with a compute target that does not finish in time
+    """
+    compute_target = MockComputeTarget(states=["Creating"])
+    with pytest.raises(AMLComputeException):
+        assert wait_for_provisioning(
+            compute_target=compute_target,
+            timeout_minutes=0.001,
+            initial_interval=0.01,
+            max_interval=0.02
+        )
+
+
+def test_load_integer_input_default():
+    """
+    Unit test to check the load_integer_input function with no input
+    """
+    os.environ.pop("INPUT_TEST_INTEGER", None)
+    assert load_integer_input(input_name="test_integer", default=4) == 4
+
+
+def test_load_integer_input_invalid_value():
+    """
+    Unit test to check the load_integer_input function with invalid value
+    """
+    os.environ["INPUT_TEST_INTEGER"] = "test"
+    with pytest.raises(AMLConfigurationException):
+        assert load_integer_input(input_name="test_integer", default=4)
+
+
+def test_set_output_github_output(tmp_path):
+    """
+    Unit test to check the set_output function writes to the GITHUB_OUTPUT file
+    """
+    github_output = tmp_path / "github_output"
+    os.environ["GITHUB_OUTPUT"] = str(github_output)
+    set_output(name="test", value="value")
+    del os.environ["GITHUB_OUTPUT"]
+    assert github_output.read_text() == "test=value\n"
+
+
+def test_compute_fingerprint_order_independent():
+    """
+    Unit test to check the compute_fingerprint function does not depend on the order of parameters
+    """
+    fingerprint = compute_fingerprint(parameters={"name": "testname", "max_nodes": 4})
+    assert fingerprint == compute_fingerprint(parameters={"max_nodes": 4, "name": "testname"})
+    assert fingerprint != compute_fingerprint(parameters={"name": "testname", "max_nodes": 5})
+
+
+def test_wait_for_provisioning_capacity_error():
+    """
+    Unit test to check the wait_for_provisioning function stops early if capacity or quota errors are reported
+    """
+    compute_target = MockComputeTarget(
+        states=["Creating"] * 100,
+        provisioning_errors=[{"error": {"code": "QuotaExceeded", "message": "Operation results in exceeding quota limits of Core."}}]
+    )
+    state = wait_for_provisioning(
+        compute_target=compute_target,
+        initial_interval=0.01,
+        max_interval=0.02
+    )
+    assert state == "Creating"
+    with pytest.raises(AMLCapacityException):
+        assert check_provisioning_state(compute_target=compute_target)
+
+
+def test_validate_json_aks_resource_id():
+    """
+    Unit test to check the validate_json function only accepts resource ids of AKS clusters
+    """
+    json_object = {
+        "name": "testname",
+        "compute_type": "akscluster",
+        "resource_id": "/subscriptions/test/resourceGroups/test/providers/Microsoft.ContainerService/managedClusters/testcluster"
+    }
+    validate_json(
+        data=json_object,
+        schema=parameters_schema,
+        input_name="PARAMETERS_FILE"
+    )
+    json_object["resource_id"] = "/subscriptions/test/resourceGroups/test/providers/Microsoft.Compute/virtualMachines/testvm"
+    with pytest.raises(AMLConfigurationException):
+        assert validate_json(
+            data=json_object,
+            schema=parameters_schema,
+            input_name="PARAMETERS_FILE"
+        )
@@ -0,0 +1,81 @@
+import os
+import sys
+import pytest
+
+myPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(myPath, "..", "code"))
+
+from fake_backend import FakeBackend
+from utils import AMLConfigurationException, AMLComputeException
+from warmup import WARM_RESTORE_TAG, get_node_state_counts, warm_compute_target, restore_compute_target
+
+
+def test_get_node_state_counts():
+    """
+    Unit test to check the get_node_state_counts function reads node counts serialized by the SDK and the REST API
+    """
+    sdk_live_state = {"properties": {"status": {"nodeStateCounts": {"idleNodeCount": 2, "runningNodeCount": 1}}}}
+    rest_live_state = {"properties": {"properties": {"nodeStateCounts": {"idleNodeCount": 3, "preparingNodeCount": None}}}}
+    assert get_node_state_counts(live_state=sdk_live_state)["idle"] == 2
+    assert get_node_state_counts(live_state=sdk_live_state)["running"] == 1
+    assert get_node_state_counts(live_state=rest_live_state)["idle"] == 3
+    assert get_node_state_counts(live_state=rest_live_state)["preparing"] == 0
+    assert get_node_state_counts(live_state={})["idle"] == 0
+
+
+def test_warm_and_restore_compute_target():
+    """
+    Unit test to check the warm_compute_target function waits for idle nodes and restore_compute_target restores the minimum node count
+    """
+    backend = FakeBackend(node_allocation_seconds=0.05)
+    compute_target = backend.create_compute_target(name="testname", parameters={"min_nodes": 1, "max_nodes": 4})
+    warm_up_seconds = warm_compute_target(backend=backend, compute_target=compute_target, nodes=3, initial_interval=0.01, max_interval=0.01)
+    assert warm_up_seconds >= 0.05
+    assert get_node_state_counts(live_state=compute_target.serialize())["idle"] == 3
+    assert compute_target.tags[WARM_RESTORE_TAG] == '{"min_nodes": 1}'
+
+    # Warming up again keeps the original scale settings
+    warm_compute_target(backend=backend, compute_target=compute_target, nodes=4, initial_interval=0.01, max_interval=0.01)
+    assert compute_target.tags[WARM_RESTORE_TAG] == '{"min_nodes": 1}'
+
+    assert restore_compute_target(backend=backend, compute_target=compute_target)
+    assert compute_target.serialize()["properties"]["properties"]["scaleSettings"]["minNodeCount"] == 1
+    assert compute_target.tags[WARM_RESTORE_TAG] == ""
+    assert not restore_compute_target(backend=backend, compute_target=compute_target)
+
+
+def test_warm_compute_target_timeout():
+    """
+    Unit test to check the warm_compute_target function restores the scale settings if the nodes are not ready in time
+    """
+    backend = FakeBackend(node_allocation_seconds=3600)
+    compute_target = backend.create_compute_target(name="testname", parameters={"max_nodes": 2})
+    with pytest.raises(AMLComputeException):
+        assert warm_compute_target(backend=backend, compute_target=compute_target, nodes=2, timeout_minutes=0)
+    assert compute_target.serialize()["properties"]["properties"]["scaleSettings"]["minNodeCount"] == 0
+    assert compute_target.tags[WARM_RESTORE_TAG] == ""
+
+
+def test_warm_compute_target_invalid_inputs():
+    """
+    Unit test to check the warm_compute_target function only warms AML clusters with enough nodes
+    """
+    backend = FakeBackend()
+    aml_cluster = backend.create_compute_target(name="amlcluster", parameters={"max_nodes": 2})
+    with pytest.raises(AMLConfigurationException):
+        assert warm_compute_target(backend=backend, compute_target=aml_cluster, nodes=3)
+    aks_cluster = backend.create_compute_target(name="akscluster", parameters={"compute_type": "akscluster"})
+    with pytest.raises(AMLConfigurationException):
+        assert warm_compute_target(backend=backend, compute_target=aks_cluster, nodes=1)
+
+
+def test_warm_compute_target_restore_tag_not_stored(monkeypatch):
+    """
+    Unit test to check the warm_compute_target function does not raise the minimum node count if the scale settings could not be stored
+    """
+    backend = FakeBackend()
+    compute_target = backend.create_compute_target(name="testname", parameters={"max_nodes": 2})
+    monkeypatch.setattr(backend, "update_tags", lambda compute_target, tags: False)
+    with pytest.raises(AMLComputeException):
+        assert warm_compute_target(backend=backend, compute_target=compute_target, nodes=2)
+    assert compute_target.serialize()["properties"]["properties"]["scaleSettings"]["minNodeCount"] == 0